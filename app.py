@@ -4,13 +4,21 @@ Serves reports, data, and dashboard endpoints
 """
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask import Flask, jsonify, request, render_template_string
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 # Import project modules
 from src.database.connection import get_engine
+from src.database.table_stats import TableStatistics
+from src.database.matviews import MaterializedViewManager
+from src.database.query_catalog import QueryCatalog
+from src.database.aggregate_navigator import AggregateNavigator
+from src.database.sketches import SketchStore, RELATIVE_ERROR
+from src.database.quantiles import QuantileSketches, RELATIVE_ACCURACY
+from src.analytics.funnel import FunnelEngine
+from src.analytics.market_basket import MarketBasketEngine
 from src.visualization.report_generator import ReportGenerator
 from src.etl.data_generator import (
     generate_users, generate_products, generate_orders,
@@ -25,9 +33,17 @@ CORS(app)
 
 # Initialize engine and loader
 engine = get_engine()
-db_url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-loader = DataLoader(db_url)
+# The loader builds its own connection URL from the same DB_* settings
+loader = DataLoader()
 report_gen = ReportGenerator(engine)
+table_stats = TableStatistics(engine)
+matviews = MaterializedViewManager(engine)
+catalog = QueryCatalog(engine)
+navigator = AggregateNavigator(engine)
+sketches = SketchStore(engine)
+quantile_sketches = QuantileSketches(engine)
+funnel = FunnelEngine(engine)
+basket = MarketBasketEngine(engine)
 
 # ==================== HEALTH & STATUS ENDPOINTS ====================
 
@@ -50,20 +66,18 @@ def health():
 
 @app.route('/api/status', methods=['GET'])
 def status():
-    """Platform status endpoint"""
+    """Platform status endpoint (estimated row counts; ?exact=true runs COUNT(*))"""
     try:
-        with engine.connect() as conn:
-            # Count rows in each table
-            tables = ['users', 'products', 'orders', 'order_items', 'events', 'marketing_campaigns']
-            counts = {}
-            for table in tables:
-                result = conn.execute(f"SELECT COUNT(*) FROM {table}").scalar()
-                counts[table] = result
+        exact = request.args.get('exact', 'false').lower() == 'true'
+        tables = ['users', 'products', 'orders', 'order_items', 'events', 'marketing_campaigns']
+        counts = table_stats.row_counts(tables, exact=exact)
         
         return jsonify({
             "status": "operational",
             "database": "connected",
             "tables": counts,
+            "row_counts": "exact" if exact else "estimated",
+            "materialized_views": matviews.get_status(),
             "timestamp": datetime.utcnow().isoformat()
         }), 200
     except Exception as e:
@@ -79,20 +93,14 @@ def get_users():
     
     try:
         with engine.connect() as conn:
-            query = f"""
-                SELECT user_id, name, email, country, signup_date 
-                FROM users 
-                LIMIT {limit} OFFSET {offset}
-            """
-            result = conn.execute(query)
-            rows = [dict(row) for row in result]
+            rows = catalog.records('api_users_page', {'limit': limit, 'offset': offset}, conn=conn)
             
             # Get total count
-            count = conn.execute("SELECT COUNT(*) FROM users").scalar()
+            count = catalog.scalar('api_users_count', conn=conn)
             
         return jsonify({
             "data": rows,
-            "total": count,
+            "total": int(count),
             "limit": limit,
             "offset": offset
         }), 200
@@ -107,21 +115,13 @@ def get_orders():
     
     try:
         with engine.connect() as conn:
-            query = f"""
-                SELECT o.order_id, o.order_date, o.total_amount, o.status, u.name
-                FROM orders o
-                JOIN users u ON o.user_id = u.user_id
-                ORDER BY o.order_date DESC
-                LIMIT {limit} OFFSET {offset}
-            """
-            result = conn.execute(query)
-            rows = [dict(row) for row in result]
+            rows = catalog.records('api_orders_page', {'limit': limit, 'offset': offset}, conn=conn)
             
-            count = conn.execute("SELECT COUNT(*) FROM orders").scalar()
+            count = catalog.scalar('api_orders_count', conn=conn)
             
         return jsonify({
             "data": rows,
-            "total": count,
+            "total": int(count),
             "limit": limit,
             "offset": offset
         }), 200
@@ -132,26 +132,22 @@ def get_orders():
 
 @app.route('/api/analytics/revenue', methods=['GET'])
 def get_revenue():
-    """Get total revenue and trends"""
+    """Get total revenue and trends (routed to the cheapest exact pre-aggregate)"""
     try:
-        with engine.connect() as conn:
-            # Total revenue
-            total = conn.execute(
-                "SELECT SUM(total_amount)::numeric(12,2) FROM orders WHERE status='completed'"
-            ).scalar()
-            
-            # Daily revenue (last 30 days)
-            daily = conn.execute("""
-                SELECT DATE(order_date) as date, SUM(total_amount)::numeric(12,2) as revenue
-                FROM orders
-                WHERE status='completed' AND order_date >= CURRENT_DATE - INTERVAL '30 days'
-                GROUP BY DATE(order_date)
-                ORDER BY date DESC
-            """)
-            daily_data = [dict(row) for row in daily]
+        completed = {'status': 'completed'}
+        # Total revenue
+        total = navigator.query(['revenue'], filters=completed)['revenue'].iloc[0]
+        
+        # Daily revenue (last 30 days)
+        start_date = datetime.now().date() - timedelta(days=30)
+        daily = navigator.query(['revenue'], grain='day', start_date=start_date, filters=completed)
+        daily_data = [
+            {"date": row.period.strftime('%Y-%m-%d'), "revenue": round(float(row.revenue), 2)}
+            for row in daily.sort_values('period', ascending=False).itertuples()
+        ]
             
         return jsonify({
-            "total_revenue": float(total) if total else 0,
+            "total_revenue": round(float(total), 2),
             "currency": "USD",
             "daily_revenue": daily_data
         }), 200
@@ -162,17 +158,7 @@ def get_revenue():
 def get_top_products():
     """Get top products by revenue"""
     try:
-        with engine.connect() as conn:
-            query = """
-                SELECT p.product_id, p.name, SUM(oi.quantity * oi.price_at_time)::numeric(12,2) as revenue
-                FROM order_items oi
-                JOIN products p ON oi.product_id = p.product_id
-                GROUP BY p.product_id, p.name
-                ORDER BY revenue DESC
-                LIMIT 10
-            """
-            result = conn.execute(query)
-            rows = [dict(row) for row in result]
+        rows = catalog.records('api_top_products', {'limit': 10})
             
         return jsonify({"top_products": rows}), 200
     except Exception as e:
@@ -182,36 +168,135 @@ def get_top_products():
 def get_customer_metrics():
     """Get key customer metrics"""
     try:
-        with engine.connect() as conn:
-            metrics = {}
-            
-            # Total customers
-            metrics['total_customers'] = conn.execute(
-                "SELECT COUNT(DISTINCT user_id) FROM users"
-            ).scalar()
-            
-            # Average order value
-            metrics['avg_order_value'] = float(conn.execute(
-                "SELECT AVG(total_amount)::numeric(12,2) FROM orders WHERE status='completed'"
-            ).scalar() or 0)
-            
-            # Total orders
-            metrics['total_orders'] = conn.execute(
-                "SELECT COUNT(*) FROM orders WHERE status='completed'"
-            ).scalar()
-            
-            # Repeat customer rate
-            repeat = conn.execute("""
-                SELECT COUNT(*) FROM users 
-                WHERE user_id IN (SELECT user_id FROM orders GROUP BY user_id HAVING COUNT(*) > 1)
-            """).scalar()
-            metrics['repeat_customers'] = repeat
-            metrics['repeat_rate'] = (repeat / metrics['total_customers'] * 100) if metrics['total_customers'] > 0 else 0
+        # Customers, AOV, completed orders and repeat customers in one round trip
+        row = catalog.records('api_customer_metrics', {'status': 'completed'})[0]
+        metrics = {
+            'total_customers': int(row['total_customers']),
+            'avg_order_value': float(row['avg_order_value'] or 0),
+            'total_orders': int(row['total_orders']),
+            'repeat_customers': int(row['repeat_customers'])
+        }
+        metrics['repeat_rate'] = (metrics['repeat_customers'] / metrics['total_customers'] * 100) if metrics['total_customers'] > 0 else 0
             
         return jsonify(metrics), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/analytics/active-users', methods=['GET'])
+def get_active_users():
+    """
+    Approximate distinct customers/visitors/sessions from the daily HLL sketches
+    
+    Query args: metric (customers|visitors|sessions), start_date, end_date,
+    grain (day|week|month) or window (trailing days), dimension + value
+    (comma-separated values are unioned)
+    """
+    metric = request.args.get('metric', 'customers')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    grain = request.args.get('grain')
+    window = request.args.get('window', type=int)
+    dimension = request.args.get('dimension')
+    filters = {dimension: request.args.get('value', '').split(',')} if dimension else None
+    
+    try:
+        result = {"metric": metric, "relative_error": round(float(RELATIVE_ERROR), 4)}
+        if window:
+            df = sketches.rolling(metric, window, start_date, end_date, filters)
+            result['series'] = [
+                {"date": row.day.strftime('%Y-%m-%d'), "estimate": round(float(getattr(row, metric)))}
+                for row in df.itertuples()
+            ]
+        elif grain:
+            df = sketches.series(metric, grain, start_date, end_date, filters)
+            result['series'] = [
+                {"period": row.period.strftime('%Y-%m-%d'), "estimate": round(float(getattr(row, metric)))}
+                for row in df.itertuples()
+            ]
+        else:
+            result['estimate'] = round(sketches.count(metric, start_date, end_date, filters))
+        return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analytics/percentiles', methods=['GET'])
+def get_percentiles():
+    """
+    Approximate percentiles from the daily quantile sketches
+    
+    Query args: metric (order_value|basket_size|item_price), q (comma-separated,
+    default 0.5,0.9,0.95,0.99), start_date, end_date, dimension + value
+    (comma-separated values are merged), bins (also return a histogram)
+    """
+    metric = request.args.get('metric', 'order_value')
+    dimension = request.args.get('dimension')
+    filters = {dimension: request.args.get('value', '').split(',')} if dimension else None
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    bins = request.args.get('bins', type=int)
+    
+    try:
+        qs = [float(q) for q in request.args.get('q', '0.5,0.9,0.95,0.99').split(',')]
+        result = quantile_sketches.quantiles(metric, qs, start_date, end_date, filters)
+        response = {
+            "metric": metric,
+            "count": result['count'],
+            "relative_accuracy": RELATIVE_ACCURACY,
+            "percentiles": {f"p{q * 100:g}": result[q] for q in qs}
+        }
+        if bins:
+            hist = quantile_sketches.histogram(metric, bins, start_date, end_date, filters)
+            response['histogram'] = hist.to_dict(orient='records')
+        return jsonify(response), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analytics/funnel', methods=['GET'])
+def get_funnel():
+    """
+    Ordered product_view -> add_to_cart -> checkout -> purchase funnel
+    
+    Query args: start_date (default 30 days ago), end_date (exclusive, default
+    tomorrow), breakdown (channel|country|category)
+    """
+    today = datetime.now().date()
+    start_date = request.args.get('start_date', str(today - timedelta(days=30)))
+    end_date = request.args.get('end_date', str(today + timedelta(days=1)))
+    breakdown = request.args.get('breakdown') or None
+    
+    try:
+        df = funnel.run(start_date, end_date, breakdown=breakdown)
+        rows = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+        return jsonify({"start_date": start_date, "end_date": end_date, "breakdown": breakdown, "funnel": rows}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analytics/product-affinity', methods=['GET'])
+def get_product_affinity():
+    """
+    Products most often bought together with a product, ranked by lift
+    
+    Query args: product_id (required), limit (default 10)
+    """
+    product_id = request.args.get('product_id')
+    if not product_id:
+        return jsonify({"error": "product_id is required"}), 400
+    limit = request.args.get('limit', 10, type=int)
+    
+    try:
+        df = basket.related(product_id, limit)
+        df['related_product_id'] = df['related_product_id'].astype(str)
+        rows = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+        return jsonify({"product_id": product_id, "related": rows}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ==================== ETL ENDPOINTS ====================
 
 @app.route('/api/etl/generate-data', methods=['POST'])
@@ -362,7 +447,7 @@ def dashboard():
                     <tr style="border-bottom: 1px solid #eee;">
                         <td style="padding: 10px;"><code>/api/status</code></td>
                         <td style="padding: 10px;">GET</td>
-                        <td style="padding: 10px;">Platform status and table counts</td>
+                        <td style="padding: 10px;">Platform status and estimated table counts (<code>?exact=true</code> for COUNT(*))</td>
                     </tr>
                     <tr style="border-bottom: 1px solid #eee;">
                         <td style="padding: 10px;"><code>/api/data/users</code></td>
@@ -389,6 +474,26 @@ def dashboard():
                         <td style="padding: 10px;">GET</td>
                         <td style="padding: 10px;">Customer KPIs</td>
                     </tr>
+                    <tr style="border-bottom: 1px solid #eee;">
+                        <td style="padding: 10px;"><code>/api/analytics/active-users</code></td>
+                        <td style="padding: 10px;">GET</td>
+                        <td style="padding: 10px;">Approximate distinct customers, visitors and sessions</td>
+                    </tr>
+                    <tr style="border-bottom: 1px solid #eee;">
+                        <td style="padding: 10px;"><code>/api/analytics/percentiles</code></td>
+                        <td style="padding: 10px;">GET</td>
+                        <td style="padding: 10px;">Order value, basket size and item price percentiles</td>
+                    </tr>
+                    <tr style="border-bottom: 1px solid #eee;">
+                        <td style="padding: 10px;"><code>/api/analytics/funnel</code></td>
+                        <td style="padding: 10px;">GET</td>
+                        <td style="padding: 10px;">Ordered session funnel with optional breakdown</td>
+                    </tr>
+                    <tr style="border-bottom: 1px solid #eee;">
+                        <td style="padding: 10px;"><code>/api/analytics/product-affinity</code></td>
+                        <td style="padding: 10px;">GET</td>
+                        <td style="padding: 10px;">Products bought together (<code>?product_id=</code>)</td>
+                    </tr>
                     <tr style="border-bottom: 1px solid #eee;">
                         <td style="padding: 10px;"><code>/api/etl/generate-data</code></td>
                         <td style="padding: 10px;">POST</td>
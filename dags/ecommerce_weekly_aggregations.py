@@ -31,27 +31,50 @@ def calculate_weekly_kpis(**context):
     """Calculate weekly KPIs"""
     try:
         from src.database.connection import db
+        from src.database.rollups import RollupManager
         
         execution_date = context['execution_date']
         week_start = execution_date - timedelta(days=7)
         
         print(f"📊 Calculating weekly KPIs for week starting {week_start.date()}...")
         
+        # Pick up any days loaded since the last rollup refresh
+        RollupManager(db.get_engine()).refresh_dirty(['sales'])
+        
+        # Order and revenue totals come from the daily sales rollup; distinct
+        # customer counts are not additive and still read orders
         query = """
+        WITH sales AS (
+            SELECT 
+                DATE_TRUNC('week', day) as week_start,
+                SUM(order_count) as total_orders,
+                SUM(revenue) as total_revenue
+            FROM daily_sales_rollup
+            WHERE day >= %s AND day < %s
+            GROUP BY DATE_TRUNC('week', day)
+        ),
+        customers AS (
+            SELECT 
+                DATE_TRUNC('week', order_date) as week_start,
+                COUNT(DISTINCT o.user_id) as active_users,
+                COUNT(DISTINCT CASE WHEN u.signup_date >= DATE_TRUNC('week', order_date) 
+                    AND u.signup_date < DATE_TRUNC('week', order_date) + INTERVAL '7 days' 
+                    THEN u.user_id END) as new_customers
+            FROM orders o
+            JOIN users u ON o.user_id = u.user_id
+            WHERE order_date >= %s AND order_date < %s
+            GROUP BY DATE_TRUNC('week', order_date)
+        )
         INSERT INTO weekly_kpis (week_start, active_users, total_orders, total_revenue, avg_order_value, new_customers)
         SELECT 
-            DATE_TRUNC('week', order_date) as week_start,
-            COUNT(DISTINCT user_id) as active_users,
-            COUNT(DISTINCT order_id) as total_orders,
-            SUM(total_amount) as total_revenue,
-            AVG(total_amount) as avg_order_value,
-            COUNT(DISTINCT CASE WHEN u.signup_date >= DATE_TRUNC('week', order_date) 
-                AND u.signup_date < DATE_TRUNC('week', order_date) + INTERVAL '7 days' 
-                THEN u.user_id END) as new_customers
-        FROM orders o
-        JOIN users u ON o.user_id = u.user_id
-        WHERE order_date >= %s AND order_date < %s
-        GROUP BY DATE_TRUNC('week', order_date)
+            s.week_start,
+            COALESCE(c.active_users, 0),
+            s.total_orders,
+            s.total_revenue,
+            s.total_revenue / NULLIF(s.total_orders, 0),
+            COALESCE(c.new_customers, 0)
+        FROM sales s
+        LEFT JOIN customers c ON c.week_start = s.week_start
         ON CONFLICT (week_start) DO UPDATE SET
             active_users = EXCLUDED.active_users,
             total_orders = EXCLUDED.total_orders,
@@ -63,7 +86,11 @@ def calculate_weekly_kpis(**context):
         
         with db.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(query, (week_start, week_start + timedelta(days=7)))
+                # Whole days for both CTEs: execution_date is Monday 03:00, and
+                # raw timestamps would shift the customer window by 3 hours
+                week_end = week_start + timedelta(days=7)
+                bounds = (week_start.date(), week_end.date())
+                cur.execute(query, bounds + bounds)
                 conn.commit()
         
         print("✅ Weekly KPIs calculated")
@@ -94,31 +121,26 @@ def generate_weekly_report(**context):
         raise
 
 def cleanup_old_data(**context):
-    """Cleanup old data (keep 90 days)"""
+    """Cleanup old data (keep 90 days) by dropping whole monthly partitions"""
     try:
         from src.database.connection import db
+        from src.database.partitions import PartitionManager
         
         print("🧹 Cleaning up old data...")
         
         cutoff_date = datetime.now() - timedelta(days=90)
+        partitions = PartitionManager(db.get_engine())
         
-        with db.get_connection() as conn:
-            with conn.cursor() as cur:
-                # Archive old events (in production, you might archive instead of delete)
-                cur.execute("""
-                DELETE FROM events 
-                WHERE timestamp < %s 
-                """, (cutoff_date,))
-                
-                events_deleted = cur.rowcount
-                
-                # Update statistics
-                cur.execute("ANALYZE events;")
-                
-                conn.commit()
+        # Retention is month-granular: a partition goes once its whole month
+        # is older than the cutoff, so no row-by-row DELETE or ANALYZE needed.
+        # Expired rows in events_default are moved into dated partitions first
+        dropped = partitions.drop_partitions_before('events', cutoff_date)
+        
+        # Keep the next few months pre-created so loads never hit the default partition
+        created = partitions.ensure_future_partitions(months_ahead=3)
         
-        print(f"✅ Cleaned up {events_deleted} old event records")
-        return f"Cleaned up {events_deleted} records"
+        print(f"✅ Dropped {len(dropped)} old event partitions, created {len(created)} future partitions")
+        return f"Dropped {len(dropped)} partitions"
         
     except Exception as e:
         print(f"❌ Error cleaning up data: {e}")
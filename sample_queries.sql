@@ -13,28 +13,20 @@ GROUP BY DATE_TRUNC('month', order_date)
 ORDER BY month DESC;
 
 -- 2. Customer Retention (Cohort Analysis)
+-- Reads the per-user month activity table instead of re-joining all orders
 WITH user_cohorts AS (
     SELECT 
         user_id,
         DATE_TRUNC('month', signup_date) as cohort_month
     FROM users
-),
-monthly_orders AS (
-    SELECT 
-        u.user_id,
-        u.cohort_month,
-        DATE_TRUNC('month', o.order_date) as order_month,
-        COUNT(DISTINCT o.order_id) as orders
-    FROM user_cohorts u
-    LEFT JOIN orders o ON u.user_id = o.user_id
-    GROUP BY 1, 2, 3
 )
 SELECT 
-    cohort_month,
-    order_month,
-    COUNT(DISTINCT user_id) as active_users
-FROM monthly_orders
-GROUP BY cohort_month, order_month
+    u.cohort_month,
+    a.month as order_month,
+    COUNT(u.user_id) as active_users
+FROM user_cohorts u
+LEFT JOIN user_month_activity a ON u.user_id = a.user_id
+GROUP BY u.cohort_month, a.month
 ORDER BY cohort_month, order_month;
 
 -- 3. Product Category Performance
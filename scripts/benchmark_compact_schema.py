@@ -0,0 +1,196 @@
+# scripts/benchmark_compact_schema.py
+"""
+Heap and index size of the standard vs compact fact layouts at scale.
+
+Builds scratch copies of users, orders and events in both layouts
+(schema_ddl.sql vs schema_compact.sql: VARCHAR vs enum columns, text vs uuid
+session_id, declared vs padding-free column order) with the same indexes, fills
+them server side with identical synthetic rows, and reports heap size, index
+size and bytes per row for each. Scratch objects are dropped afterwards unless
+--keep.
+
+Usage:
+    python scripts/benchmark_compact_schema.py --rows 10000000 --batch 1000000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from sqlalchemy import text
+from src.database.connection import db
+
+SCRATCH_TYPES = """
+DROP TYPE IF EXISTS bench_order_status, bench_event_type, bench_channel, bench_country CASCADE;
+CREATE TYPE bench_order_status AS ENUM ('pending', 'shipped', 'completed', 'cancelled', 'returned');
+CREATE TYPE bench_event_type AS ENUM ('session_start', 'page_view', 'product_view', 'add_to_cart', 'checkout', 'purchase');
+CREATE TYPE bench_channel AS ENUM ('organic', 'google_ads', 'facebook', 'instagram', 'email', 'referral');
+CREATE TYPE bench_country AS ENUM ('USA', 'UK', 'Canada', 'Australia', 'Germany', 'France', 'Japan', 'Brazil');
+"""
+
+# Label pools indexed by i % n (arrays are 1-based)
+STATUSES = "(ARRAY['completed','completed','completed','shipped','cancelled'])[1 + i % 5]"
+EVENT_TYPES = "(ARRAY['product_view','product_view','add_to_cart','checkout','purchase','session_start'])[1 + i % 6]"
+CHANNELS = "(ARRAY['organic','google_ads','facebook','instagram','email','referral'])[1 + i % 6]"
+COUNTRIES = "(ARRAY['USA','UK','Canada','Australia','Germany','France','Japan','Brazil'])[1 + i % 8]"
+
+# table -> layout -> (CREATE TABLE columns, INSERT columns, SELECT expressions)
+TABLES = {
+    'users': {
+        'wide': (
+            """user_id UUID PRIMARY KEY, email VARCHAR(255) UNIQUE NOT NULL, first_name VARCHAR(100),
+               last_name VARCHAR(100), signup_date DATE NOT NULL, country VARCHAR(100), city VARCHAR(100),
+               acquisition_channel VARCHAR(50), created_at TIMESTAMP, updated_at TIMESTAMP, loaded_at TIMESTAMP""",
+            "user_id, email, first_name, last_name, signup_date, country, city, acquisition_channel, "
+            "created_at, updated_at, loaded_at",
+            f"""md5(i::text)::uuid, 'user' || i || '@example.com', 'First', 'Last',
+                DATE '2023-01-01' + i % 700, {COUNTRIES}, 'City', {CHANNELS}, now(), now(), now()""",
+        ),
+        'compact': (
+            """user_id UUID PRIMARY KEY, created_at TIMESTAMP, updated_at TIMESTAMP, loaded_at TIMESTAMP,
+               signup_date DATE NOT NULL, country bench_country, acquisition_channel bench_channel,
+               email VARCHAR(255) UNIQUE NOT NULL, first_name VARCHAR(100), last_name VARCHAR(100),
+               city VARCHAR(100)""",
+            "user_id, created_at, updated_at, loaded_at, signup_date, country, acquisition_channel, "
+            "email, first_name, last_name, city",
+            f"""md5(i::text)::uuid, now(), now(), now(), DATE '2023-01-01' + i % 700,
+                {COUNTRIES}::bench_country, {CHANNELS}::bench_channel,
+                'user' || i || '@example.com', 'First', 'Last', 'City'""",
+        ),
+        'indexes': ['signup_date', 'acquisition_channel'],
+    },
+    'orders': {
+        'wide': (
+            """order_id UUID NOT NULL, user_id UUID NOT NULL, order_date TIMESTAMP NOT NULL,
+               total_amount DECIMAL(10,2) NOT NULL, status VARCHAR(50), shipping_country VARCHAR(100),
+               shipping_city VARCHAR(100), created_at TIMESTAMP, updated_at TIMESTAMP, loaded_at TIMESTAMP,
+               PRIMARY KEY (order_id, order_date)""",
+            "order_id, user_id, order_date, total_amount, status, shipping_country, shipping_city, "
+            "created_at, updated_at, loaded_at",
+            f"""uuid_generate_v7(), md5((i % 100000)::text)::uuid, TIMESTAMP '2024-01-01' + i * INTERVAL '1 second',
+                (i % 50000) / 100.0, {STATUSES}, {COUNTRIES}, 'City', now(), now(), now()""",
+        ),
+        'compact': (
+            """order_id UUID NOT NULL, user_id UUID NOT NULL, order_date TIMESTAMP NOT NULL,
+               created_at TIMESTAMP, updated_at TIMESTAMP, loaded_at TIMESTAMP, status bench_order_status,
+               shipping_country bench_country, total_amount DECIMAL(10,2) NOT NULL, shipping_city VARCHAR(100),
+               PRIMARY KEY (order_id, order_date)""",
+            "order_id, user_id, order_date, created_at, updated_at, loaded_at, status, shipping_country, "
+            "total_amount, shipping_city",
+            f"""uuid_generate_v7(), md5((i % 100000)::text)::uuid, TIMESTAMP '2024-01-01' + i * INTERVAL '1 second',
+                now(), now(), now(), {STATUSES}::bench_order_status, {COUNTRIES}::bench_country,
+                (i % 50000) / 100.0, 'City'""",
+        ),
+        'indexes': ['user_id', 'order_date', 'status'],
+    },
+    'events': {
+        'wide': (
+            """event_id UUID NOT NULL, user_id UUID NOT NULL, event_type VARCHAR(50) NOT NULL, product_id UUID,
+               timestamp TIMESTAMP NOT NULL, session_id VARCHAR(100), created_at TIMESTAMP, loaded_at TIMESTAMP,
+               PRIMARY KEY (event_id, timestamp)""",
+            "event_id, user_id, event_type, product_id, timestamp, session_id, created_at, loaded_at",
+            f"""uuid_generate_v7(), md5((i % 100000)::text)::uuid, {EVENT_TYPES},
+                CASE WHEN i % 3 = 0 THEN md5((i % 5000)::text)::uuid END,
+                TIMESTAMP '2024-01-01' + i * INTERVAL '1 second', md5((i / 8)::text)::uuid::text, now(), now()""",
+        ),
+        'compact': (
+            """event_id UUID NOT NULL, user_id UUID NOT NULL, product_id UUID, session_id UUID,
+               timestamp TIMESTAMP NOT NULL, created_at TIMESTAMP, loaded_at TIMESTAMP,
+               event_type bench_event_type NOT NULL, PRIMARY KEY (event_id, timestamp)""",
+            "event_id, user_id, product_id, session_id, timestamp, created_at, loaded_at, event_type",
+            f"""uuid_generate_v7(), md5((i % 100000)::text)::uuid,
+                CASE WHEN i % 3 = 0 THEN md5((i % 5000)::text)::uuid END, md5((i / 8)::text)::uuid,
+                TIMESTAMP '2024-01-01' + i * INTERVAL '1 second', now(), now(), {EVENT_TYPES}::bench_event_type""",
+        ),
+        'indexes': ['user_id', 'timestamp', 'event_type', 'session_id'],
+    },
+}
+
+SIZE_QUERY = """
+SELECT pg_relation_size(:table) AS heap_bytes,
+       pg_indexes_size(:table) AS index_bytes,
+       (SELECT AVG(pg_column_size(t.*)) FROM (SELECT * FROM {table} LIMIT 10000) t) AS avg_row_bytes
+"""
+
+
+def build(engine, table: str, layout: str, rows: int, batch: int) -> dict:
+    """Create one scratch table, fill it in batches, index it and measure it"""
+    name = f"bench_{layout}_{table}"
+    columns, insert_columns, select = TABLES[table][layout]
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        conn.execute(text(f"CREATE TABLE {name} ({columns})"))
+
+    insert = text(f"INSERT INTO {name} ({insert_columns}) SELECT {select} "
+                  f"FROM generate_series(:first, :last) AS i")
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        for first in range(1, rows + 1, batch):
+            conn.execute(insert, {'first': first, 'last': min(first + batch - 1, rows)})
+            conn.commit()
+            print(f"  {name}: {min(first + batch - 1, rows):>12,} rows", end='\r')
+        for column in TABLES[table]['indexes']:
+            conn.execute(text(f"CREATE INDEX {name}_{column} ON {name}({column})"))
+        conn.execute(text(f"ANALYZE {name}"))
+        sizes = conn.execute(text(SIZE_QUERY.format(table=name)), {'table': name}).one()
+        conn.commit()
+    print()
+    return {
+        'seconds': time.perf_counter() - start,
+        'heap_mb': sizes.heap_bytes / 1e6,
+        'index_mb': sizes.index_bytes / 1e6,
+        'total_mb': (sizes.heap_bytes + sizes.index_bytes) / 1e6,
+        'heap_bytes_per_row': sizes.heap_bytes / rows,
+        'avg_row_bytes': float(sizes.avg_row_bytes or 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare storage of the standard and compact fact layouts")
+    parser.add_argument('--rows', type=int, default=10_000_000, help="Rows per table")
+    parser.add_argument('--batch', type=int, default=1_000_000)
+    parser.add_argument('--tables', nargs='+', default=list(TABLES), choices=list(TABLES))
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch tables and types")
+    args = parser.parse_args()
+
+    engine = db.get_engine()
+    with engine.begin() as conn:
+        for statement in SCRATCH_TYPES.strip().split(';'):
+            if statement.strip():
+                conn.execute(text(statement))
+
+    results = {}
+    for table in args.tables:
+        for layout in ('wide', 'compact'):
+            print(f"\n⏱️  Building {layout} {table} with {args.rows:,} rows...")
+            results[(table, layout)] = build(engine, table, layout, args.rows, args.batch)
+
+    metrics = [
+        ('heap_mb', 'heap (MB)', '{:,.1f}'),
+        ('index_mb', 'indexes (MB)', '{:,.1f}'),
+        ('total_mb', 'total (MB)', '{:,.1f}'),
+        ('heap_bytes_per_row', 'heap bytes/row', '{:,.1f}'),
+        ('avg_row_bytes', 'tuple data bytes/row', '{:,.1f}'),
+    ]
+    print(f"\n📊 Standard vs compact layout ({args.rows:,} rows per table)")
+    for table in args.tables:
+        wide, compact = results[(table, 'wide')], results[(table, 'compact')]
+        print(f"\n{table}")
+        print("-" * 64)
+        print(f"{'metric':22} | {'standard':>12} | {'compact':>12} | saved")
+        for key, label, fmt in metrics:
+            saved = 1 - compact[key] / wide[key] if wide[key] else float('nan')
+            print(f"{label:22} | {fmt.format(wide[key]):>12} | {fmt.format(compact[key]):>12} | {saved:6.1%}")
+
+    if not args.keep:
+        with engine.begin() as conn:
+            for table in args.tables:
+                for layout in ('wide', 'compact'):
+                    conn.execute(text(f"DROP TABLE IF EXISTS bench_{layout}_{table}"))
+            conn.execute(text("DROP TYPE IF EXISTS bench_order_status, bench_event_type, "
+                              "bench_channel, bench_country CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# scripts/benchmark_copy_encoding.py
+"""
+Benchmark DataLoader encodings: to_sql INSERTs vs text COPY vs binary COPY.
+
+Loads the same generated dataset once per encoding (truncating in between) and
+reports load time and throughput for the typed fact tables.
+
+WARNING: truncates users, products, orders, order_items and events.
+
+Usage:
+    python scripts/benchmark_copy_encoding.py --orders 20000 --events 200000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from src.etl.data_generator import EcommerceDataGenerator
+from src.etl.data_loader import DataLoader
+from src.etl.pgcopy import COPY_ENCODINGS, encode_binary_copy
+
+TIMED_TABLES = ['orders', 'order_items', 'events']
+LOAD_ORDER = ['users', 'products', 'orders', 'order_items', 'events']
+
+
+def benchmark_encoding(loader: DataLoader, data: dict, encoding: str) -> dict:
+    """Load every table with one encoding and time the fact tables"""
+    timings = {}
+    for table_name in reversed(LOAD_ORDER):
+        loader.truncate_table(table_name)
+
+    for table_name in LOAD_ORDER:
+        df = data[table_name].copy()
+        start = time.perf_counter()
+        if not loader.load_dataframe(df, table_name, chunk_size=1000, encoding=encoding):
+            raise RuntimeError(f"{encoding} load failed for {table_name}")
+        timings[table_name] = time.perf_counter() - start
+    return timings
+
+
+def benchmark_encoder_only(loader: DataLoader, data: dict) -> dict:
+    """Time the client-side binary encoding alone"""
+    timings = {}
+    for table_name in TIMED_TABLES:
+        df = data[table_name]
+        column_types = loader.get_column_types(table_name)
+        start = time.perf_counter()
+        payload = encode_binary_copy(df, column_types)
+        timings[table_name] = (time.perf_counter() - start, len(payload))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark COPY encodings")
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--events', type=int, default=200000)
+    args = parser.parse_args()
+
+    print("🧪 Generating benchmark dataset...")
+    generator = EcommerceDataGenerator(seed=42)
+    data = generator.generate_all_data(args.users, args.products, args.orders, args.events)
+
+    loader = DataLoader()
+
+    print("\n⏱️  Binary encoder only (client side):")
+    for table_name, (elapsed, size) in benchmark_encoder_only(loader, data).items():
+        rows = len(data[table_name])
+        print(f"  {table_name:12} | {rows:>9,} rows | {elapsed:7.3f}s | {size / 1e6:8.1f} MB | {rows / elapsed:>12,.0f} rows/s")
+
+    results = {}
+    for encoding in COPY_ENCODINGS:
+        print(f"\n⏱️  Loading with '{encoding}'...")
+        results[encoding] = benchmark_encoding(loader, data, encoding)
+
+    print("\n📊 Load Time by Encoding (seconds)")
+    print("-" * 60)
+    print(f"{'table':12} | " + " | ".join(f"{e:>9}" for e in COPY_ENCODINGS) + " | speedup")
+    for table_name in TIMED_TABLES:
+        row = [results[e][table_name] for e in COPY_ENCODINGS]
+        speedup = results['to_sql'][table_name] / results['binary'][table_name]
+        print(f"{table_name:12} | " + " | ".join(f"{t:9.2f}" for t in row) + f" | {speedup:6.1f}x")
+
+    for encoding in COPY_ENCODINGS:
+        total_rows = sum(len(data[t]) for t in TIMED_TABLES)
+        total_time = sum(results[encoding][t] for t in TIMED_TABLES)
+        print(f"  {encoding:8}: {total_rows / total_time:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# scripts/benchmark_indexes.py
+"""
+Benchmark the analytics index pack (src/database/indexes.py).
+
+Runs every query in sample_queries.sql plus the KPICalculator / ReportGenerator
+query shapes twice: with the pack dropped (baseline B-trees restored) and with
+the pack built. For each query it prints the median execution time from
+EXPLAIN ANALYZE, buffers hit/read, and the scan nodes (with index names) the
+planner chose, so plan changes are visible next to the latency change.
+
+WARNING: drops and rebuilds the pack indexes (non-concurrently).
+
+Usage:
+    python scripts/benchmark_indexes.py --runs 5
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import re
+import json
+import argparse
+import statistics
+from sqlalchemy import text
+from src.database.connection import db
+from src.database.indexes import IndexManager
+
+SAMPLE_QUERIES_PATH = os.path.join(os.path.dirname(__file__), '..', 'sample_queries.sql')
+
+# Query shapes from KPICalculator, ReportGenerator and the dashboards that hit raw tables
+APP_QUERIES = {
+    'report: completed orders in range': """
+        SELECT COALESCE(SUM(total_amount), 0), COUNT(*), COUNT(DISTINCT user_id)
+        FROM orders
+        WHERE order_date BETWEEN CURRENT_DATE - 30 AND CURRENT_DATE AND status = 'completed'
+    """,
+    'report: top products': """
+        SELECT p.name, p.category,
+               COALESCE(SUM(oi.quantity * oi.price_at_time), 0) as revenue,
+               COALESCE(SUM(oi.quantity), 0) as units_sold
+        FROM order_items oi
+        JOIN products p ON oi.product_id = p.product_id
+        JOIN orders o ON oi.order_id = o.order_id
+        WHERE o.order_date BETWEEN CURRENT_DATE - 30 AND CURRENT_DATE
+        AND o.status = 'completed'
+        GROUP BY p.product_id, p.name, p.category
+        ORDER BY revenue DESC
+        LIMIT 10
+    """,
+    'kpi: inventory turnover': """
+        SELECT p.category, AVG(p.stock_quantity), SUM(oi.quantity)
+        FROM products p
+        LEFT JOIN order_items oi ON p.product_id = oi.product_id
+        GROUP BY p.category
+    """,
+    'kpi: product sales lookup': """
+        SELECT SUM(quantity), SUM(quantity * price_at_time)
+        FROM order_items
+        WHERE product_id = (SELECT product_id FROM products LIMIT 1)
+    """,
+    'kpi: channel roi': """
+        SELECT u.acquisition_channel, COUNT(DISTINCT u.user_id), COUNT(DISTINCT o.order_id), SUM(o.total_amount)
+        FROM users u
+        LEFT JOIN orders o ON u.user_id = o.user_id
+        GROUP BY u.acquisition_channel
+    """,
+    'events: last 7 days by type': """
+        SELECT event_type, COUNT(*)
+        FROM events
+        WHERE timestamp >= CURRENT_DATE - 7
+        GROUP BY event_type
+    """,
+    'events: one day of sessions': """
+        SELECT COUNT(DISTINCT session_id)
+        FROM events
+        WHERE timestamp >= CURRENT_DATE - 1 AND timestamp < CURRENT_DATE
+    """,
+}
+
+
+def load_sample_queries(path: str) -> dict:
+    """Parse sample_queries.sql into {'sample: <title>': sql}"""
+    with open(path, 'r') as f:
+        content = f.read()
+
+    queries = {}
+    for statement in content.split(';'):
+        title_match = re.search(r'--\s*\d+\.\s*(.+)', statement)
+        sql = '\n'.join(line for line in statement.splitlines() if not line.strip().startswith('--')).strip()
+        if sql.upper().startswith(('SELECT', 'WITH')):
+            title = title_match.group(1).strip() if title_match else sql[:40]
+            queries[f"sample: {title}"] = sql
+    return queries
+
+
+def _scan_nodes(plan: dict) -> list:
+    """Flatten a JSON plan into 'Node Type (index)' strings for scan nodes"""
+    nodes = []
+    if 'Scan' in plan['Node Type']:
+        label = plan['Node Type']
+        if plan.get('Index Name'):
+            label += f" ({plan['Index Name']})"
+        nodes.append(label)
+    for child in plan.get('Plans', []):
+        nodes.extend(_scan_nodes(child))
+    return nodes
+
+
+def explain(conn, sql: str, runs: int) -> dict:
+    """Median execution time over runs, plus buffers and scan nodes of the last run"""
+    times = []
+    for _ in range(runs + 1):  # first run warms the cache
+        result = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")).scalar()
+        plan = (json.loads(result) if isinstance(result, str) else result)[0]
+        times.append(plan['Execution Time'])
+    root = plan['Plan']
+    nodes = sorted(set(_scan_nodes(root)))
+    return {
+        'ms': statistics.median(times[1:]),
+        'hit': root.get('Shared Hit Blocks', 0),
+        'read': root.get('Shared Read Blocks', 0),
+        'nodes': nodes,
+    }
+
+
+def run_phase(engine, queries: dict, runs: int) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in queries.items():
+            try:
+                results[name] = explain(conn, sql, runs)
+            except Exception as e:
+                conn.rollback()
+                results[name] = {'error': str(e).splitlines()[0]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analytics index pack")
+    parser.add_argument('--runs', type=int, default=5, help="Timed runs per query (after one warm-up)")
+    args = parser.parse_args()
+
+    engine = db.get_engine()
+    manager = IndexManager(engine)
+    queries = {**load_sample_queries(SAMPLE_QUERIES_PATH), **APP_QUERIES}
+
+    print("⏱️  Baseline (index pack dropped)...")
+    manager.drop_indexes(restore_replaced=True)
+    baseline = run_phase(engine, queries, args.runs)
+
+    print("⏱️  With index pack...")
+    manager.ensure_indexes(concurrently=False)
+    packed = run_phase(engine, queries, args.runs)
+
+    print("\n📊 Index pack: latency and plan per query")
+    print("=" * 80)
+    for name in queries:
+        before, after = baseline[name], packed[name]
+        print(f"\n{name}")
+        if 'error' in before or 'error' in after:
+            print(f"  ❌ {before.get('error') or after.get('error')}")
+            continue
+        speedup = before['ms'] / after['ms'] if after['ms'] else float('inf')
+        print(f"  latency : {before['ms']:9.2f} ms -> {after['ms']:9.2f} ms  ({speedup:5.1f}x)")
+        print(f"  buffers : {before['hit'] + before['read']:>9,} -> {after['hit'] + after['read']:>9,}")
+        print(f"  before  : {', '.join(before['nodes']) or '-'}")
+        print(f"  after   : {', '.join(after['nodes']) or '-'}")
+
+    print("\n📦 Pack index sizes")
+    for status in manager.get_status():
+        print(f"  {status['index_name']:34} {status['table_name']:12} {status['bytes'] / 1e6:8.1f} MB"
+              + ("" if status['is_valid'] else "  (INVALID)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# scripts/benchmark_key_metrics.py
+"""
+Benchmark KPICalculator.calculate_key_metrics: four legacy queries vs one scan.
+
+The legacy path is the four queries the method used to issue (AOV over
+daily_kpis, new users, the month-1 retention CTE with its correlated cohort-size
+subquery, CLV over customer_lifetime_value). The new path is the catalog's
+kpi_key_metrics query. Both run against a scratch schema holding synthetic
+users and orders (plus the two materialized views the legacy path reads), so
+the comparison runs at any scale without touching real data; --live runs them
+against the current schema instead. Results are checked to agree.
+
+Usage:
+    python scripts/benchmark_key_metrics.py --orders 1000000
+    python scripts/benchmark_key_metrics.py --live
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from sqlalchemy import text
+from src.database.connection import db
+from src.database.query_catalog import QUERIES
+
+SCRATCH_SCHEMA = 'kpi_bench'
+
+LEGACY_QUERIES = {
+    'aov': "SELECT ROUND(SUM(total_revenue) / NULLIF(SUM(total_orders), 0), 2) as aov FROM daily_kpis",
+    'new_users': "SELECT COUNT(*) as new_users FROM users WHERE signup_date >= CURRENT_DATE - 30",
+    'retention_rate_pct': """
+        WITH cohort_periods AS (
+            SELECT
+                u.user_id,
+                DATE_TRUNC('month', u.signup_date) as cohort_month,
+                DATE_TRUNC('month', o.order_date) as activity_month
+            FROM users u
+            JOIN orders o ON u.user_id = o.user_id
+            GROUP BY 1, 2, 3
+        ),
+        cohort_analysis AS (
+            SELECT
+                cohort_month,
+                activity_month,
+                (EXTRACT(YEAR FROM activity_month) - EXTRACT(YEAR FROM cohort_month)) * 12 +
+                (EXTRACT(MONTH FROM activity_month) - EXTRACT(MONTH FROM cohort_month)) AS period
+            FROM cohort_periods
+            GROUP BY 1, 2
+        ),
+        cohort_metrics AS (
+            SELECT
+                ca.cohort_month,
+                ca.period,
+                COUNT(DISTINCT cp.user_id) AS retained_users,
+                (SELECT COUNT(user_id) FROM users WHERE DATE_TRUNC('month', signup_date) = ca.cohort_month) AS initial_size
+            FROM cohort_analysis ca
+            JOIN cohort_periods cp ON ca.cohort_month = cp.cohort_month AND ca.activity_month = cp.activity_month
+            GROUP BY 1, 2
+        )
+        SELECT AVG(CAST(retained_users AS NUMERIC) / initial_size * 100) as retention_rate_pct
+        FROM cohort_metrics
+        WHERE period = 1 AND initial_size > 0
+    """,
+    'clv': "SELECT ROUND(AVG(total_spent), 2) as clv FROM customer_lifetime_value WHERE total_spent > 0",
+}
+
+# Same shapes as schema_ddl.sql, without partitions/foreign keys; two years of
+# signups and orders so there are ~24 cohorts with month-1 activity
+SCRATCH_SETUP = [
+    f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE",
+    f"CREATE SCHEMA {SCRATCH_SCHEMA}",
+    f"""CREATE TABLE {SCRATCH_SCHEMA}.users AS
+        SELECT md5(i::text)::uuid AS user_id,
+               CURRENT_DATE - (i % 730) AS signup_date
+        FROM generate_series(1, :users) AS i""",
+    f"""CREATE TABLE {SCRATCH_SCHEMA}.orders AS
+        SELECT uuid_generate_v4() AS order_id,
+               u.user_id,
+               u.signup_date + (random() * (CURRENT_DATE - u.signup_date)) * INTERVAL '1 day' AS order_date,
+               ROUND((10 + random() * 490)::numeric, 2)::numeric(10,2) AS total_amount
+        FROM generate_series(1, :orders) AS i
+        JOIN {SCRATCH_SCHEMA}.users u ON u.user_id = md5((1 + (i * 7919) % :users)::text)::uuid""",
+    f"CREATE INDEX ON {SCRATCH_SCHEMA}.users(user_id)",
+    f"CREATE INDEX ON {SCRATCH_SCHEMA}.users(signup_date)",
+    f"CREATE INDEX ON {SCRATCH_SCHEMA}.orders(user_id)",
+    f"""CREATE MATERIALIZED VIEW {SCRATCH_SCHEMA}.daily_kpis AS
+        SELECT DATE(o.order_date) as date,
+               COUNT(DISTINCT o.order_id) as total_orders,
+               SUM(o.total_amount) as total_revenue
+        FROM {SCRATCH_SCHEMA}.orders o
+        JOIN {SCRATCH_SCHEMA}.users u ON o.user_id = u.user_id
+        GROUP BY DATE(o.order_date)""",
+    f"""CREATE MATERIALIZED VIEW {SCRATCH_SCHEMA}.customer_lifetime_value AS
+        SELECT u.user_id, SUM(o.total_amount) as total_spent
+        FROM {SCRATCH_SCHEMA}.users u
+        LEFT JOIN {SCRATCH_SCHEMA}.orders o ON u.user_id = o.user_id
+        GROUP BY u.user_id""",
+    f"ANALYZE {SCRATCH_SCHEMA}.users",
+    f"ANALYZE {SCRATCH_SCHEMA}.orders",
+]
+
+
+def run_legacy(conn) -> tuple:
+    """The four round trips, one after another; returns (values, seconds)"""
+    start = time.perf_counter()
+    values = {name: conn.execute(text(sql)).scalar() for name, sql in LEGACY_QUERIES.items()}
+    return values, time.perf_counter() - start
+
+
+def run_single_scan(conn) -> tuple:
+    """kpi_key_metrics as one plain statement; returns (values, seconds)"""
+    start = time.perf_counter()
+    row = conn.execute(text(QUERIES['kpi_key_metrics']['sql']), {'days': 30}).mappings().one()
+    return dict(row), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy vs single-scan key metrics")
+    parser.add_argument('--orders', type=int, default=1_000_000, help="Synthetic orders")
+    parser.add_argument('--users', type=int, help="Synthetic users (default: orders / 5)")
+    parser.add_argument('--runs', type=int, default=3, help="Timed runs (after one warm-up)")
+    parser.add_argument('--live', action='store_true', help="Use the current schema instead of synthetic data")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch schema")
+    args = parser.parse_args()
+
+    engine = db.get_engine()
+    if not args.live:
+        users = args.users or max(1, args.orders // 5)
+        print(f"\n🔧 Building {SCRATCH_SCHEMA}: {users:,} users, {args.orders:,} orders...")
+        with engine.begin() as conn:
+            for statement in SCRATCH_SETUP:
+                conn.execute(text(statement), {'users': users, 'orders': args.orders})
+
+    with engine.connect() as conn:
+        if not args.live:
+            conn.execute(text(f"SET search_path TO {SCRATCH_SCHEMA}, public"))
+        orders = conn.execute(text("SELECT COUNT(*) FROM orders")).scalar()
+        if orders < 1_000_000:
+            print(f"⚠️ Only {orders:,} orders; the gap widens with scale (try --orders 1000000 or more)")
+
+        print(f"\n⏱️  Key metrics over {orders:,} orders (best of {args.runs})")
+        results = {}
+        for label, runner in (('legacy (4 queries)', run_legacy), ('single scan', run_single_scan)):
+            runner(conn)
+            times = []
+            for _ in range(args.runs):
+                values, seconds = runner(conn)
+                times.append(seconds)
+            results[label] = (values, min(times))
+            print(f"  {label:20} | {min(times) * 1000:10,.0f} ms")
+        conn.rollback()
+
+    legacy, single = results['legacy (4 queries)'], results['single scan']
+    print(f"\n📊 Speedup: {legacy[1] / single[1]:.1f}x")
+    print("\nValues (legacy -> single scan):")
+    for name in LEGACY_QUERIES:
+        old, new = legacy[0][name], single[0][name]
+        same = (old is None and new is None) or (
+            old is not None and new is not None and abs(float(old) - float(new)) < 0.01)
+        print(f"  {name:20} {str(old):>16} -> {str(new):<16} {'✅' if same else '❌'}")
+
+    if not args.live and not args.keep:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCRATCH_SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
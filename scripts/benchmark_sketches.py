@@ -0,0 +1,74 @@
+# scripts/benchmark_sketches.py
+"""
+Accuracy and latency of the daily HLL sketches vs exact COUNT(DISTINCT).
+
+For a set of date ranges (last day/week/month/quarter/year and everything),
+counts distinct customers with COUNT(DISTINCT user_id) over orders and with
+the union of the stored sketches, and reports both timings and the relative
+error against the documented standard error. --rebuild recomputes the
+sketches from orders first (needed once for data loaded before sketches
+existed).
+
+Usage:
+    python scripts/benchmark_sketches.py --rebuild
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from datetime import timedelta
+from sqlalchemy import text
+from src.database.connection import db
+from src.database.sketches import SketchStore, RELATIVE_ERROR
+
+EXACT_QUERY = """
+SELECT COUNT(DISTINCT user_id) FROM orders
+WHERE order_date >= :start_date AND order_date < :end_date
+"""
+
+RANGES = [('1 day', 1), ('7 days', 7), ('30 days', 30), ('90 days', 90), ('365 days', 365), ('all', None)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sketch distinct counts with exact counts")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the orders sketches first")
+    parser.add_argument('--runs', type=int, default=3, help="Timed runs per range (best is reported)")
+    args = parser.parse_args()
+
+    engine = db.get_engine()
+    sketches = SketchStore(engine)
+    if args.rebuild:
+        start = time.perf_counter()
+        sketches.rebuild(['orders'])
+        print(f"🔧 Rebuilt orders sketches in {time.perf_counter() - start:.1f} s")
+
+    with engine.connect() as conn:
+        first, last = conn.execute(text("SELECT MIN(order_date)::date, MAX(order_date)::date FROM orders")).one()
+    if first is None:
+        print("⚠️ No orders loaded")
+        return
+
+    print(f"\n📊 Distinct customers, exact vs sketch (standard error {RELATIVE_ERROR:.2%})")
+    print("-" * 84)
+    print(f"{'range':10} | {'exact':>10} | {'sketch':>10} | {'error':>7} | {'exact ms':>10} | {'sketch ms':>10}")
+    for label, days in RANGES:
+        start_date = first if days is None else last - timedelta(days=days - 1)
+        params = {'start_date': start_date, 'end_date': last + timedelta(days=1)}
+        exact_times, sketch_times = [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            with engine.connect() as conn:
+                exact = conn.execute(text(EXACT_QUERY), params).scalar()
+            exact_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            approx = sketches.count('customers', start_date, last)
+            sketch_times.append(time.perf_counter() - start)
+        error = approx / exact - 1 if exact else 0.0
+        print(f"{label:10} | {exact:>10,} | {approx:>10,.0f} | {error:>+7.2%} | "
+              f"{min(exact_times) * 1000:>10,.1f} | {min(sketch_times) * 1000:>10,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# scripts/benchmark_uuid_keys.py
+"""
+Benchmark uuid4 vs UUIDv7 primary keys: insert throughput, index size and WAL.
+
+Creates two scratch tables shaped like events (UUID primary key plus a few
+columns), appends the same number of rows to each in batches with keys
+generated server side, and reports rows/s, heap and primary key index size
+and WAL written. Scratch tables are dropped afterwards unless --keep.
+
+Usage:
+    python scripts/benchmark_uuid_keys.py --rows 10000000 --batch 500000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from sqlalchemy import text
+from src.database.connection import db
+
+KEY_FUNCTIONS = {
+    'uuid4': 'uuid_generate_v4()',
+    'uuid7': 'uuid_generate_v7()',
+}
+
+CREATE_TABLE = """
+CREATE TABLE {table} (
+    event_id UUID PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    timestamp TIMESTAMP NOT NULL
+)
+"""
+
+INSERT_BATCH = """
+INSERT INTO {table} (event_id, user_id, event_type, timestamp)
+SELECT {key_function}, (random() * 100000)::int, 'product_view', clock_timestamp()
+FROM generate_series(1, :n)
+"""
+
+SIZE_QUERY = """
+SELECT pg_relation_size(:table) AS table_bytes,
+       pg_relation_size(:index) AS index_bytes
+"""
+
+
+def benchmark_key_format(engine, key_format: str, rows: int, batch: int, keep: bool) -> dict:
+    """Append rows in batches and measure time, sizes and WAL volume"""
+    table = f"bench_keys_{key_format}"
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(text(CREATE_TABLE.format(table=table)))
+
+    insert = text(INSERT_BATCH.format(table=table, key_function=KEY_FUNCTIONS[key_format]))
+    batch_times = []
+    with engine.connect() as conn:
+        wal_start = conn.execute(text("SELECT pg_current_wal_lsn()")).scalar()
+        start = time.perf_counter()
+        loaded = 0
+        while loaded < rows:
+            n = min(batch, rows - loaded)
+            batch_start = time.perf_counter()
+            conn.execute(insert, {'n': n})
+            conn.commit()
+            batch_times.append(n / (time.perf_counter() - batch_start))
+            loaded += n
+            print(f"  {key_format}: {loaded:>12,} rows | {batch_times[-1]:>10,.0f} rows/s", end='\r')
+        elapsed = time.perf_counter() - start
+        wal_bytes = conn.execute(
+            text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), :start)"), {'start': wal_start}
+        ).scalar()
+        print()
+
+        conn.execute(text(f"ANALYZE {table}"))
+        sizes = conn.execute(text(SIZE_QUERY), {'table': table, 'index': f"{table}_pkey"}).fetchone()
+        conn.commit()
+
+    if not keep:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE {table}"))
+
+    return {
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed,
+        'last_batch_rows_per_sec': batch_times[-1],
+        'table_mb': sizes[0] / 1e6,
+        'index_mb': sizes[1] / 1e6,
+        'index_bytes_per_row': sizes[1] / rows,
+        'wal_mb': float(wal_bytes) / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark uuid4 vs UUIDv7 primary keys")
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--batch', type=int, default=500_000)
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch tables")
+    args = parser.parse_args()
+
+    engine = db.get_engine()
+    results = {}
+    for key_format in KEY_FUNCTIONS:
+        print(f"\n⏱️  Inserting {args.rows:,} rows with {key_format} keys...")
+        results[key_format] = benchmark_key_format(engine, key_format, args.rows, args.batch, args.keep)
+
+    print("\n📊 uuid4 vs UUIDv7")
+    print("-" * 60)
+    metrics = [
+        ('seconds', 'load time (s)', '{:,.1f}'),
+        ('rows_per_sec', 'rows/s (overall)', '{:,.0f}'),
+        ('last_batch_rows_per_sec', 'rows/s (last batch)', '{:,.0f}'),
+        ('table_mb', 'heap size (MB)', '{:,.1f}'),
+        ('index_mb', 'pkey index size (MB)', '{:,.1f}'),
+        ('index_bytes_per_row', 'index bytes/row', '{:,.1f}'),
+        ('wal_mb', 'WAL written (MB)', '{:,.1f}'),
+    ]
+    print(f"{'metric':22} | {'uuid4':>14} | {'uuid7':>14} | ratio")
+    for key, label, fmt in metrics:
+        v4, v7 = results['uuid4'][key], results['uuid7'][key]
+        ratio = v4 / v7 if v7 else float('nan')
+        print(f"{label:22} | {fmt.format(v4):>14} | {fmt.format(v7):>14} | {ratio:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
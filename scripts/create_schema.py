@@ -1,39 +1,84 @@
 # scripts/create_schema.py
 import os
+import re
 import sys
+import argparse
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.database.connection import db
+from src.database.partitions import PartitionManager
+from src.database.indexes import IndexManager
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def create_schema():
-    """Create database schema by executing the DDL file"""
+DATABASE_DIR = os.path.join(os.path.dirname(__file__), '..', 'src', 'database')
+
+CREATE_TABLE_RE = re.compile(r'^CREATE TABLE (\w+) \(', re.MULTILINE)
+
+# Line comments are dropped before splitting, so a ';' in a comment cannot cut a statement
+COMMENT_RE = re.compile(r'--[^\n]*')
+
+
+def read_commands(file_name: str) -> list:
+    """Split a DDL file into its statements (comments removed)"""
+    with open(os.path.join(DATABASE_DIR, file_name), 'r') as f:
+        ddl = COMMENT_RE.sub('', f.read())
+    return [command.strip() for command in ddl.split(';') if command.strip()]
+
+
+def compact_commands(commands: list) -> list:
+    """
+    Swap in the compact fact tables (schema_compact.sql)
     
-    # Read the SQL file
-    sql_file_path = os.path.join(os.path.dirname(__file__), '..', 'src', 'database', 'schema_ddl.sql')
+    Its types are created just before the first replaced table, after the
+    DROP TABLE statements that release the old types.
+    """
+    types, tables = [], {}
+    for command in read_commands('schema_compact.sql'):
+        match = CREATE_TABLE_RE.search(command)
+        if match:
+            tables[match.group(1)] = command
+        else:
+            types.append(command)
     
-    with open(sql_file_path, 'r') as f:
-        sql_commands = f.read()
+    result = []
+    for command in commands:
+        match = CREATE_TABLE_RE.search(command)
+        if match and match.group(1) in tables:
+            result.extend(types)
+            types = []
+            command = tables[match.group(1)]
+        result.append(command)
+    return result
+
+
+def create_schema(compact: bool = False):
+    """Create database schema by executing the DDL file"""
     
-    logger.info("Creating database schema...")
+    # Statements one by one
+    commands = read_commands('schema_ddl.sql')
+    if compact:
+        commands = compact_commands(commands)
     
-    # Split by semicolon to execute commands one by one
-    commands = sql_commands.split(';')
+    logger.info(f"Creating database schema ({'compact' if compact else 'standard'} fact tables)...")
     
     with db.get_connection() as conn:
         conn.autocommit = True
         with conn.cursor() as cur:
             for command in commands:
-                command = command.strip()
-                if command:  # Skip empty commands
-                    try:
-                        cur.execute(command)
-                        logger.info(f"Executed: {command[:50]}...")
-                    except Exception as e:
-                        logger.error(f"Error executing command: {e}\nCommand: {command[:100]}...")
+                try:
+                    cur.execute(command)
+                    logger.info(f"Executed: {command[:50]}...")
+                except Exception as e:
+                    logger.error(f"Error executing command: {e}\nCommand: {command[:100]}...")
+    
+    # Monthly partitions for orders/events: current month plus the next three
+    PartitionManager(db.get_engine()).ensure_future_partitions(months_ahead=3)
+    
+    # Analytics index pack (tables are empty, no need to build concurrently)
+    IndexManager(db.get_engine()).ensure_indexes(concurrently=False)
     
     logger.info("✅ Schema created successfully!")
 
@@ -52,11 +97,16 @@ def test_schema():
                 logger.info(f"Test result: {result}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the database schema")
+    parser.add_argument('--compact', action='store_true',
+                        help="Compact fact tables: enum columns, uuid session ids, padding-free column order")
+    args = parser.parse_args()
+    
     # First, create the database if it doesn't exist
     print("🔧 Setting up database schema...")
     
     if db.test_connection():
-        create_schema()
+        create_schema(compact=args.compact)
         test_schema()
         print("🎉 Database setup complete!")
     else:
@@ -0,0 +1,48 @@
+# scripts/export_powerbi_views.py
+"""
+Export the Power BI views (src/database/powerbi_views.sql) to CSV for import mode.
+
+Each view is streamed through a server-side cursor in fixed-size batches, so
+memory stays flat however large the view is.
+
+Usage:
+    python scripts/export_powerbi_views.py --output powerbi/exports --batch-size 50000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from src.database.connection import db
+from src.database.streaming import StreamingReader
+
+POWERBI_VIEWS = [
+    'sales_summary',
+    'customer_lifetime_value_view',
+    'product_performance_view',
+    'daily_kpi_view',
+    'geographic_performance_view',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the Power BI views to CSV")
+    parser.add_argument('--output', default=os.path.join('powerbi', 'exports'))
+    parser.add_argument('--batch-size', type=int, default=50000)
+    parser.add_argument('--views', nargs='+', default=POWERBI_VIEWS)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    reader = StreamingReader(db.get_engine(), batch_size=args.batch_size)
+
+    print(f"📤 Exporting {len(args.views)} Power BI views to {args.output}/")
+    for view in args.views:
+        start = time.perf_counter()
+        rows = reader.export_csv(f"SELECT * FROM {view}", os.path.join(args.output, f"{view}.csv"))
+        print(f"  {view:32} {rows:>12,} rows  {time.perf_counter() - start:7.2f}s")
+    print("✅ Export complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,8 @@ st.title("🚀 E-commerce Analytics Platform Dashboard")
 st.sidebar.title("Navigation")
 section = st.sidebar.selectbox("Choose section", ["Overview", "Forecasting", "KPIs", "Channels & Inventory"])
 
+# Cheap to rebuild on every rerun: results come from the process-wide KPI cache
+# until the loader commits new data
 calculator = KPICalculator()
 forecaster = SalesForecaster()
 
@@ -61,10 +63,19 @@ elif section == "Forecasting":
 elif section == "KPIs":
     st.header("📈 Advanced KPIs")
     st.subheader("Customer Lifetime Value Distribution")
-    ltv_df = calculator.get_customer_ltv()
-    fig_hist = px.histogram(ltv_df, x='total_spent', nbins=20, title="CLV Distribution")
+    # Every paying customer, binned while streaming (not a 500-row sample)
+    ltv_hist = calculator.customer_ltv_histogram()
+    fig_hist = px.bar(ltv_hist, x=(ltv_hist['bin_start'] + ltv_hist['bin_end']) / 2, y='customers',
+                      title="CLV Distribution", labels={'x': 'total_spent'})
     st.plotly_chart(fig_hist, use_container_width=True)
 
+    st.subheader("Order Value Distribution (Last 90 Days, Completed Orders)")
+    value_hist = calculator.order_value_distribution()
+    fig_value = px.bar(value_hist, x=(value_hist['bin_start'] + value_hist['bin_end']) / 2, y='count',
+                       title="Order Value Distribution", labels={'x': 'order value ($)'})
+    st.plotly_chart(fig_value, use_container_width=True)
+    st.dataframe(calculator.calculate_value_percentiles(), use_container_width=True)
+
     st.subheader("Retention Cohort Heatmap")
     cohort_df = calculator.calculate_retention_cohort()
     cohort_pivot = cohort_df.pivot_table(index='cohort_month', columns='period', values='retention_rate', aggfunc='mean').fillna(0) * 100
@@ -88,5 +99,9 @@ elif section == "Channels & Inventory":
 st.sidebar.markdown("---")
 st.sidebar.info("Powered by Prophet, Plotly, and PostgreSQL")
 
+cache_stats = calculator.cache.stats()
+st.sidebar.caption(f"KPI cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                   f"({cache_stats['entries']} entries, data version {cache_stats['version']})")
+
 if st.sidebar.button("Refresh Data"):
-    st.rerun()
\ No newline at end of file
+    st.rerun()
@@ -3,6 +3,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.database.connection import db 
+from src.database.batch_executor import BatchQueryExecutor
 import pandas as pd
 from tabulate import tabulate
 
@@ -13,96 +14,27 @@ def run_verification_queries():
     print("=" * 60)
     
     queries = [
-        ("📊 User Statistics", """
-        SELECT 
-            COUNT(*) as total_users,
-            COUNT(DISTINCT country) as countries_represented,
-            -- FINAL FIX: Direct date subtraction returns days (an integer), which can be averaged. 
-            -- DATE_PART is not needed for DATE - DATE difference in PostgreSQL.
-            ROUND(AVG(CURRENT_DATE - signup_date), 1) as avg_account_age_days, 
-            MIN(signup_date) as earliest_signup,
-            MAX(signup_date) as latest_signup
-        FROM users;
-        """),
-        
-        ("💰 Product Statistics", """
-        SELECT 
-            COUNT(*) as total_products,
-            COUNT(DISTINCT category) as categories,
-            ROUND(AVG(price), 2) as avg_price,
-            ROUND(MIN(price), 2) as min_price,
-            ROUND(MAX(price), 2) as max_price
-        FROM products;
-        """),
-        
-        ("🛒 Order Statistics", """
-        SELECT 
-            COUNT(*) as total_orders,
-            ROUND(SUM(total_amount), 2) as total_revenue,
-            ROUND(AVG(total_amount), 2) as avg_order_value,
-            MIN(order_date) as first_order,
-            MAX(order_date) as last_order
-        FROM orders;
-        """),
-        
-        ("📈 Daily Revenue (Last 7 Days)", """
-        SELECT 
-            DATE(order_date) as order_day,
-            COUNT(*) as orders,
-            ROUND(SUM(total_amount), 2) as daily_revenue,
-            ROUND(AVG(total_amount), 2) as avg_order_value
-        FROM orders
-        WHERE order_date >= CURRENT_DATE - INTERVAL '7 days'
-        GROUP BY DATE(order_date)
-        ORDER BY order_day DESC;
-        """),
-        
-        ("🏆 Top 5 Products by Revenue", """
-        SELECT 
-            p.name,
-            p.category,
-            COUNT(oi.order_item_id) as units_sold,
-            ROUND(SUM(oi.quantity * oi.price_at_time), 2) as total_revenue
-        FROM order_items oi
-        JOIN products p ON oi.product_id = p.product_id
-        GROUP BY p.product_id, p.name, p.category
-        ORDER BY total_revenue DESC
-        LIMIT 5;
-        """),
-        
-        ("🌍 User Geography", """
-        SELECT 
-            country,
-            COUNT(*) as user_count,
-            ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER(), 1) as percentage
-        FROM users
-        GROUP BY country
-        ORDER BY user_count DESC;
-        """),
-        
-        ("📱 Acquisition Channels", """
-        SELECT 
-            acquisition_channel,
-            COUNT(*) as users,
-            COUNT(DISTINCT o.order_id) as orders,
-            ROUND(SUM(o.total_amount), 2) as revenue
-        FROM users u
-        LEFT JOIN orders o ON u.user_id = o.user_id
-        GROUP BY acquisition_channel
-        ORDER BY revenue DESC NULLS LAST;
-        """)
+        ("📊 User Statistics", 'verify_user_statistics', None),
+        ("💰 Product Statistics", 'verify_product_statistics', None),
+        ("🛒 Order Statistics", 'verify_order_statistics', None),
+        ("📈 Daily Revenue (Last 7 Days)", 'verify_daily_revenue', {'days': 7}),
+        ("🏆 Top 5 Products by Revenue", 'verify_top_products', {'limit': 5}),
+        ("🌍 User Geography", 'verify_user_geography', None),
+        ("📱 Acquisition Channels", 'verify_acquisition_channels', None)
     ]
     
-    with db.get_connection() as conn:
-        for title, query in queries:
-            print(f"\n{title}")
-            print("-" * len(title))
-            
-            try:
-                df = pd.read_sql_query(query, conn)
-                print(tabulate(df, headers='keys', tablefmt='psql', showindex=False))
-            except Exception as e:
-                print(f"❌ Query failed: {e}")
+    # Run every query concurrently, then print in order
+    batch = BatchQueryExecutor(db.get_engine())
+    results = batch.run({name: (name, params) for _, name, params in queries}, raise_errors=False)
+    
+    for title, name, params in queries:
+        print(f"\n{title}")
+        print("-" * len(title))
+        
+        if name in results:
+            print(tabulate(results[name], headers='keys', tablefmt='psql', showindex=False))
+        else:
+            print(f"❌ Query failed: see log for {name}")
     
     print("\n" + "=" * 60)
     print("✅ Verification Complete!")
@@ -111,24 +43,17 @@ def run_verification_queries():
     print("\n🔬 Data Quality Checks:")
     
     quality_queries = [
-        ("Check for NULL emails in users", "SELECT COUNT(*) FROM users WHERE email IS NULL", 0),
-        ("Check for negative prices", "SELECT COUNT(*) FROM products WHERE price < 0", 0),
-        ("Check for future orders", "SELECT COUNT(*) FROM orders WHERE order_date > NOW()", 0),
-        ("Check order consistency (orders without items)", """
-        SELECT COUNT(*) FROM orders o
-        WHERE NOT EXISTS (
-            SELECT 1 FROM order_items oi 
-            WHERE oi.order_id = o.order_id
-        )
-        """, 0)
+        ("Check for NULL emails in users", 'verify_null_emails', 0),
+        ("Check for negative prices", 'verify_negative_prices', 0),
+        ("Check for future orders", 'verify_future_orders', 0),
+        ("Check order consistency (orders without items)", 'verify_orders_without_items', 0)
     ]
     
-    with db.get_connection() as conn:
-        for check_name, query, expected in quality_queries:
-            result = pd.read_sql_query(query, conn)
-            count = result.iloc[0, 0]
-            status = "✅ PASS" if count == expected else f"❌ FAIL ({count} found)"
-            print(f"  {check_name}: {status}")
+    checks = batch.run({name: name for _, name, _ in quality_queries})
+    for check_name, name, expected in quality_queries:
+        count = checks[name].iloc[0, 0]
+        status = "✅ PASS" if count == expected else f"❌ FAIL ({count} found)"
+        print(f"  {check_name}: {status}")
 
 def generate_sample_queries_file():
     """Generate a file with sample queries for analysis"""
@@ -0,0 +1,257 @@
+# src/analytics/clustering.py
+"""
+RFM customer segmentation with mini-batch k-means.
+
+Stages, each timed and logged:
+
+    features   one aggregate over orders into the customer_rfm feature table
+               (recency in days before as_of, order count, total spend)
+    scaling    mean / std of log1p(feature) per column, computed in SQL
+    fit        MiniBatchKMeans: fit on the first streamed chunk (k-means++),
+               then partial_fit over every chunk in mini-batches
+    assign     predict chunk by chunk and COPY the per-user assignments into
+               customer_segments; per-segment totals go to
+               customer_segment_summary
+
+Only one chunk (batch_size rows of three features) is held at a time, so
+memory is bounded whatever the customer count. Clusters are relabelled by
+value (high frequency and spend, low recency first), so segment 0 is always
+the best customers and ids stay comparable across runs.
+"""
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sklearn.cluster import MiniBatchKMeans
+import logging
+from src.database.data_version import BUMP_DATA_VERSION_PYFORMAT
+from src.database.streaming import StreamingReader
+from src.etl.pgcopy import copy_dataframe
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURES = ['recency_days', 'frequency', 'monetary']
+
+# Best to worst; k segments take k evenly spaced names
+SEGMENT_NAMES = ('Champions', 'Loyal', 'Promising', 'Needs Attention', 'At Risk', 'Hibernating', 'Lost')
+
+ASSIGNMENT_COLUMN_TYPES = {
+    'user_id': 'uuid', 'segment_id': 'smallint', 'segment': 'character varying',
+    'recency_days': 'double precision', 'frequency': 'integer', 'monetary': 'double precision',
+}
+
+# as_of defaults to the latest order, so recency is meaningful on historical data
+REFRESH_RFM_QUERY = """
+INSERT INTO customer_rfm (user_id, recency_days, frequency, monetary, first_order_date, last_order_date, as_of)
+SELECT
+    o.user_id,
+    EXTRACT(EPOCH FROM (r.as_of - MAX(o.order_date))) / 86400.0,
+    COUNT(*),
+    SUM(o.total_amount),
+    MIN(o.order_date),
+    MAX(o.order_date),
+    r.as_of
+FROM orders o
+CROSS JOIN (SELECT COALESCE(CAST(:as_of AS timestamp), MAX(order_date)) AS as_of FROM orders) r
+WHERE o.status::text = ANY(:statuses) AND o.order_date <= r.as_of
+GROUP BY o.user_id, r.as_of
+"""
+
+RFM_STATS_QUERY = """
+SELECT
+    COUNT(*) AS customers,
+    MAX(as_of) AS as_of,
+    AVG(ln(1 + GREATEST(recency_days, 0))) AS recency_days_mean,
+    STDDEV_POP(ln(1 + GREATEST(recency_days, 0))) AS recency_days_std,
+    AVG(ln(1 + frequency)) AS frequency_mean,
+    STDDEV_POP(ln(1 + frequency)) AS frequency_std,
+    AVG(ln(1 + GREATEST(monetary, 0))) AS monetary_mean,
+    STDDEV_POP(ln(1 + GREATEST(monetary, 0))) AS monetary_std
+FROM customer_rfm
+"""
+
+RFM_FEATURES_QUERY = "SELECT user_id, recency_days, frequency, monetary FROM customer_rfm"
+
+INSERT_SUMMARY_QUERY = """
+INSERT INTO customer_segment_summary
+    (run_at, as_of, segment_id, segment, customers, avg_recency_days, avg_frequency, avg_monetary)
+VALUES (%(run_at)s, %(as_of)s, %(segment_id)s, %(segment)s, %(customers)s,
+        %(avg_recency_days)s, %(avg_frequency)s, %(avg_monetary)s)
+"""
+
+
+def segment_names(n_clusters: int) -> list:
+    """Names for segments 0 (best) .. n_clusters - 1"""
+    if n_clusters > len(SEGMENT_NAMES):
+        return [f"Segment {i + 1}" for i in range(n_clusters)]
+    picks = np.round(np.linspace(0, len(SEGMENT_NAMES) - 1, n_clusters)).astype(int)
+    return [SEGMENT_NAMES[i] for i in picks]
+
+
+class CustomerSegmenter:
+    def __init__(self, engine, n_clusters: int = 5, batch_size: int = 500_000,
+                 minibatch_size: int = 10_000, statuses=('completed',), random_state: int = 42):
+        self.engine = engine
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.minibatch_size = minibatch_size
+        self.statuses = list(statuses)
+        self.random_state = random_state
+        self.stream = StreamingReader(engine, batch_size=batch_size)
+        self.timings = {}
+
+    def _timed(self, stage: str, started: float):
+        self.timings[stage] = time.perf_counter() - started
+        logger.info(f"⏱️ Segmentation {stage}: {self.timings[stage]:.2f} s")
+
+    def _scale(self, batch: pd.DataFrame, stats: dict) -> np.ndarray:
+        X = np.log1p(np.maximum(batch[FEATURES].to_numpy(dtype=np.float64), 0))
+        return (X - stats['mean']) / stats['std']
+
+    def refresh_features(self, as_of=None) -> dict:
+        """
+        Rebuild customer_rfm and read the scaling statistics
+
+        Returns:
+            dict: customers, as_of, mean and std (log1p space, FEATURES order)
+        """
+        started = time.perf_counter()
+        with self.engine.begin() as conn:
+            conn.execute(text("TRUNCATE customer_rfm"))
+            conn.execute(text(REFRESH_RFM_QUERY), {'as_of': as_of, 'statuses': self.statuses})
+        self._timed('features', started)
+
+        started = time.perf_counter()
+        with self.engine.connect() as conn:
+            row = conn.execute(text(RFM_STATS_QUERY)).mappings().one()
+        std = np.array([float(row[f'{f}_std'] or 0) for f in FEATURES])
+        stats = {
+            'customers': int(row['customers']),
+            'as_of': row['as_of'],
+            'mean': np.array([float(row[f'{f}_mean'] or 0) for f in FEATURES]),
+            # A constant feature carries no information; leave it unscaled
+            'std': np.where(std > 0, std, 1.0),
+        }
+        self._timed('scaling', started)
+        return stats
+
+    def fit(self, stats: dict, epochs: int = 1) -> MiniBatchKMeans:
+        """Mini-batch k-means over the streamed, scaled features"""
+        started = time.perf_counter()
+        model = MiniBatchKMeans(n_clusters=self.n_clusters, batch_size=self.minibatch_size,
+                                n_init=3, random_state=self.random_state)
+        fitted = False
+        for _ in range(epochs):
+            for batch in self.stream.iter_batches(RFM_FEATURES_QUERY):
+                X = self._scale(batch, stats)
+                if not fitted:
+                    # k-means++ seeding on the first chunk (customers arrive in no particular order)
+                    model.fit(X)
+                    fitted = True
+                    continue
+                for start in range(0, len(X), self.minibatch_size):
+                    model.partial_fit(X[start:start + self.minibatch_size])
+        self._timed('fit', started)
+        return model
+
+    @staticmethod
+    def rank_clusters(centers: np.ndarray) -> np.ndarray:
+        """Cluster -> segment id, best (frequent, high-spend, recent) first"""
+        recency, frequency, monetary = centers.T
+        order = np.argsort(-(frequency + monetary - recency), kind='stable')
+        label_map = np.empty(len(order), dtype=np.int64)
+        label_map[order] = np.arange(len(order))
+        return label_map
+
+    def assign(self, model: MiniBatchKMeans, stats: dict) -> pd.DataFrame:
+        """
+        Label every customer and replace customer_segments (one transaction)
+
+        Returns:
+            pd.DataFrame: The per-segment summary written for this run
+        """
+        started = time.perf_counter()
+        label_map = self.rank_clusters(model.cluster_centers_)
+        names = np.array(segment_names(self.n_clusters), dtype=object)
+        customers = np.zeros(self.n_clusters, dtype=np.int64)
+        sums = np.zeros((self.n_clusters, len(FEATURES)))
+
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cur:
+                cur.execute("TRUNCATE customer_segments")
+                for batch in self.stream.iter_batches(RFM_FEATURES_QUERY):
+                    labels = label_map[model.predict(self._scale(batch, stats))]
+                    customers += np.bincount(labels, minlength=self.n_clusters)
+                    for j, feature in enumerate(FEATURES):
+                        sums[:, j] += np.bincount(labels, weights=batch[feature].to_numpy(dtype=np.float64),
+                                                  minlength=self.n_clusters)
+                    assignments = pd.DataFrame({
+                        'user_id': batch['user_id'],
+                        'segment_id': labels,
+                        'segment': names[labels],
+                        **{feature: batch[feature] for feature in FEATURES},
+                    })
+                    copy_dataframe(cur, assignments, 'customer_segments', 'binary', ASSIGNMENT_COLUMN_TYPES)
+
+                means = sums / np.maximum(customers, 1)[:, None]
+                summary = pd.DataFrame({
+                    'run_at': pd.Timestamp.now().floor('s').to_pydatetime(),
+                    'as_of': stats['as_of'],
+                    'segment_id': np.arange(self.n_clusters),
+                    'segment': names,
+                    'customers': customers,
+                    **{f'avg_{feature}': means[:, j] for j, feature in enumerate(FEATURES)},
+                })
+                cur.executemany(INSERT_SUMMARY_QUERY, summary.astype(object).to_dict(orient='records'))
+                cur.execute(BUMP_DATA_VERSION_PYFORMAT, {'source': 'customer_segments'})
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+        self._timed('assign', started)
+        return summary
+
+    def run(self, as_of=None, epochs: int = 1) -> pd.DataFrame:
+        """
+        Full segmentation: features, scaling, fit, assign
+
+        Args:
+            as_of: Recency reference time (default: the latest order)
+            epochs: Passes of partial_fit over all customers
+
+        Returns:
+            pd.DataFrame: segment_id, segment, customers and average R/F/M per segment
+        """
+        self.timings = {}
+        stats = self.refresh_features(as_of)
+        if stats['customers'] < self.n_clusters:
+            raise ValueError(f"{stats['customers']} customers with orders, need at least {self.n_clusters} "
+                             f"for {self.n_clusters} segments")
+        model = self.fit(stats, epochs)
+        summary = self.assign(model, stats)
+        logger.info(f"✅ Segmented {stats['customers']:,} customers into {self.n_clusters} segments "
+                    f"in {sum(self.timings.values()):.1f} s")
+        return summary
+
+
+def segment_customers(engine=None, n_clusters: int = 5, batch_size: int = 500_000, as_of=None) -> pd.DataFrame:
+    """
+    Segment all customers by RFM and store per-user assignments
+
+    Args:
+        engine: SQLAlchemy engine (default: the shared connection's)
+        n_clusters: Number of segments
+        batch_size: Customers per streamed chunk (bounds memory)
+        as_of: Recency reference time (default: the latest order)
+
+    Returns:
+        pd.DataFrame: Per-segment summary (see CustomerSegmenter.run)
+    """
+    if engine is None:
+        from src.database.connection import db
+        engine = db.get_engine()
+    return CustomerSegmenter(engine, n_clusters=n_clusters, batch_size=batch_size).run(as_of)
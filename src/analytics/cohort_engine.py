@@ -0,0 +1,185 @@
+# src/analytics/cohort_engine.py
+"""
+In-memory cohort retention engine.
+
+Loads users and user_month_activity once and keeps, per user, a bitmap of the
+calendar months they ordered in (uint64 words, bit k = k-th month since the
+first month in the data), one for any order and one for completed orders.
+Retention matrices are then pure NumPy bit operations over those bitmaps:
+
+    cohort      'signup' (signup month) or 'first_order' (lowest set bit)
+    periods     months since the cohort month, 0 = the cohort month itself
+    segment     user attribute filters, e.g. {'country': 'USA'}
+
+Periods are calendar months, and (cohort, period) cells after the last month
+with data are left out rather than reported as zero retention. The bitmaps are
+rebuilt whenever the data version (src/database/data_version.py) has moved
+since they were loaded.
+"""
+import numpy as np
+import pandas as pd
+import logging
+from src.database.extract import CopyExtractor
+from src.database.data_version import current_data_version
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COHORT_TYPES = ('signup', 'first_order')
+SEGMENT_COLUMNS = ('country', 'acquisition_channel')
+WORD_BITS = 64
+
+
+def _month_index(values) -> np.ndarray:
+    """Dates -> months since year 0 (year * 12 + month - 1)"""
+    dates = pd.DatetimeIndex(pd.to_datetime(values))
+    return (dates.year * 12 + dates.month - 1).to_numpy(dtype=np.int64)
+
+
+def _lowest_set_bit(bitmap: np.ndarray) -> np.ndarray:
+    """Index of each row's lowest set bit across its words (-1 for empty rows)"""
+    nonzero = bitmap != 0
+    has_bits = nonzero.any(axis=1)
+    word = nonzero.argmax(axis=1)
+    value = bitmap[np.arange(len(bitmap)), word]
+    # value & -value isolates the lowest bit; log2 of a power of two is exact
+    lowest = value & (~value + np.uint64(1))
+    bit = np.log2(np.where(lowest == 0, 1, lowest).astype(np.float64)).astype(np.int64)
+    return np.where(has_bits, word * WORD_BITS + bit, -1)
+
+
+class CohortEngine:
+    def __init__(self, engine):
+        self.engine = engine
+        self.extractor = CopyExtractor(engine)
+        self.users = None
+        self._bitmaps = {}
+        self._signup = None
+        self._base_month = 0
+        self._n_months = 0
+        self.version = None
+
+    # ---------- loading ----------
+
+    def load(self):
+        """(Re)load users and their month activity and rebuild the bitmaps"""
+        # Read before extracting, so a write landing mid-load triggers another reload
+        version = current_data_version(self.engine)
+        users = self.extractor.extract_query('cohort_users')
+        activity = self.extractor.extract_query('cohort_activity')
+
+        signup = _month_index(users['signup_date'])
+        rows = pd.Index(users['user_id']).get_indexer(activity['user_id'])
+        known = rows >= 0
+        rows = rows[known]
+        months = _month_index(activity['month'][known])
+        completed = activity['completed'][known].to_numpy(dtype=bool)
+
+        all_months = np.concatenate([signup, months])
+        self._base_month = int(all_months.min()) if len(all_months) else 0
+        self._n_months = int(all_months.max()) - self._base_month + 1 if len(all_months) else 0
+        n_words = max(1, -(-self._n_months // WORD_BITS))
+
+        bits = months - self._base_month
+        words, shifts = bits // WORD_BITS, (bits % WORD_BITS).astype(np.uint64)
+        masks = np.left_shift(np.uint64(1), shifts)
+        for name, selected in (('any', np.ones(len(rows), dtype=bool)), ('completed', completed)):
+            bitmap = np.zeros((len(users), n_words), dtype=np.uint64)
+            np.bitwise_or.at(bitmap, (rows[selected], words[selected]), masks[selected])
+            self._bitmaps[name] = bitmap
+
+        self._signup = signup - self._base_month
+        self.users = users[['user_id'] + [c for c in SEGMENT_COLUMNS if c in users.columns]].reset_index(drop=True)
+        self.version = version
+        logger.info(f"✅ Cohort engine loaded {len(users):,} users, {len(rows):,} active user-months "
+                    f"over {self._n_months} months")
+        return self
+
+    def _ensure_loaded(self):
+        if self.users is None:
+            self.load()
+            return
+        version = current_data_version(self.engine)
+        if version is None or version != self.version:
+            self.load()
+
+    # ---------- retention ----------
+
+    def _month_start(self, index: np.ndarray) -> pd.DatetimeIndex:
+        absolute = index + self._base_month
+        return pd.to_datetime(pd.DataFrame({'year': absolute // 12, 'month': absolute % 12 + 1, 'day': 1}))
+
+    def _segment_mask(self, segment: dict) -> np.ndarray:
+        mask = np.ones(len(self.users), dtype=bool)
+        for column, values in (segment or {}).items():
+            if column not in self.users.columns:
+                raise ValueError(f"Unknown segment column '{column}', expected one of {SEGMENT_COLUMNS}")
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            mask &= self.users[column].isin(values).to_numpy()
+        return mask
+
+    def retention(self, cohort: str = 'signup', periods: int = 12, status: str = None,
+                  start_month=None, end_month=None, segment: dict = None) -> pd.DataFrame:
+        """
+        Retention by cohort and period
+
+        Args:
+            cohort: 'signup' or 'first_order'
+            periods: Periods per cohort, including period 0 (the cohort month)
+            status: None (any order) or 'completed' (completed orders only)
+            start_month: First cohort month (inclusive, optional)
+            end_month: Last cohort month (inclusive, optional)
+            segment: Column -> value or list of values (country, acquisition_channel)
+
+        Returns:
+            pd.DataFrame: cohort_month, period, activity_month, cohort_size,
+                          retained_users, retention_rate (0-1)
+        """
+        if cohort not in COHORT_TYPES:
+            raise ValueError(f"Unknown cohort type '{cohort}', expected one of {COHORT_TYPES}")
+        self._ensure_loaded()
+        bitmap = self._bitmaps['completed' if status == 'completed' else 'any']
+
+        cohort_idx = self._signup if cohort == 'signup' else _lowest_set_bit(bitmap)
+        mask = (cohort_idx >= 0) & self._segment_mask(segment)
+        if start_month is not None:
+            mask &= cohort_idx >= _month_index([start_month])[0] - self._base_month
+        if end_month is not None:
+            mask &= cohort_idx <= _month_index([end_month])[0] - self._base_month
+
+        users = np.flatnonzero(mask)
+        cohorts, inverse = np.unique(cohort_idx[users], return_inverse=True)
+        sizes = np.bincount(inverse, minlength=len(cohorts))
+
+        frames = []
+        for period in range(periods):
+            month = cohorts + period
+            valid = month < self._n_months
+            if not valid.any():
+                break
+            bit = cohort_idx[users] + period
+            in_range = bit < self._n_months
+            rows, bit = users[in_range], bit[in_range]
+            active = (bitmap[rows, bit // WORD_BITS] >> (bit % WORD_BITS).astype(np.uint64)) & np.uint64(1)
+            retained = np.bincount(inverse[in_range], weights=active.astype(np.float64), minlength=len(cohorts))
+            frames.append(pd.DataFrame({
+                'cohort': cohorts[valid],
+                'period': period,
+                'cohort_size': sizes[valid],
+                'retained_users': retained[valid].astype(np.int64),
+            }))
+
+        if not frames:
+            return pd.DataFrame(columns=['cohort_month', 'period', 'activity_month', 'cohort_size',
+                                         'retained_users', 'retention_rate'])
+        df = pd.concat(frames, ignore_index=True)
+        df['cohort_month'] = self._month_start(df['cohort'].to_numpy())
+        df['activity_month'] = self._month_start(df['cohort'].to_numpy() + df['period'].to_numpy())
+        df['retention_rate'] = df['retained_users'] / df['cohort_size']
+        df = df.sort_values(['cohort_month', 'period']).reset_index(drop=True)
+        return df[['cohort_month', 'period', 'activity_month', 'cohort_size', 'retained_users', 'retention_rate']]
+
+    def matrix(self, **kwargs) -> pd.DataFrame:
+        """retention() pivoted to cohort_month x period (retention rate, 0-1)"""
+        df = self.retention(**kwargs)
+        return df.pivot(index='cohort_month', columns='period', values='retention_rate')
@@ -0,0 +1,304 @@
+# src/analytics/experiments.py
+"""
+A/B test analysis for every running experiment in one pass.
+
+Experiments are rows of the experiments table: an id, a window, the variants
+(the first is the control) and optionally the event type that counts as
+exposure. Assignment and outcomes are derived from the raw tables:
+
+    exposure    the user's first (exposure) event inside the window
+    variant     md5(experiment_id:user_id) bucketed over the variants, so a
+                user keeps the same variant in every run
+    outcome     completed orders from exposure to the end of the window:
+                converted (any order) and revenue (their total)
+
+One grouped query returns, per experiment and variant, the number of users at
+each distinct (converted, revenue) outcome. That distribution is all the
+analysis needs:
+
+    conversion   two-proportion z-test (pooled) vs control
+    revenue      Welch t-test on revenue per user vs control
+    intervals    Poisson bootstrap of the treatment - control differences:
+                 each distribution row gets a Poisson(users) weight per
+                 replicate, and one sparse product per chunk of rows sums all
+                 experiments' replicates at once (replicates x rows matrices)
+
+Every statistic is vectorized across experiments, so hundreds of concurrent
+experiments cost one query and a few array operations.
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy import stats
+from sqlalchemy import text
+import logging
+from src.database.extract import CopyExtractor
+from src.etl.pgcopy import copy_dataframe
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ANALYZED_STATUSES = ('running', 'completed')
+ORDER_STATUSES = ('completed',)
+
+# Poisson draws per bootstrap chunk (replicates x distribution rows)
+BOOTSTRAP_CHUNK_DRAWS = 20_000_000
+
+EXPERIMENTS_QUERY = """
+SELECT experiment_id, name, variants
+FROM experiments
+WHERE status = ANY(CAST(:statuses AS text[]))
+AND (CAST(:experiment_ids AS text[]) IS NULL OR experiment_id = ANY(CAST(:experiment_ids AS text[])))
+ORDER BY experiment_id
+"""
+
+OUTCOME_DISTRIBUTION_QUERY = """
+WITH x AS (
+    SELECT experiment_id, variants, start_date, COALESCE(end_date, CURRENT_TIMESTAMP) AS end_date, exposure_event
+    FROM experiments
+    WHERE status = ANY(CAST(%(statuses)s AS text[]))
+    AND (CAST(%(experiment_ids)s AS text[]) IS NULL OR experiment_id = ANY(CAST(%(experiment_ids)s AS text[])))
+),
+exposures AS (
+    SELECT x.experiment_id, e.user_id, MIN(e."timestamp") AS exposed_at
+    FROM x
+    JOIN events e ON e."timestamp" >= x.start_date AND e."timestamp" < x.end_date
+     AND (x.exposure_event IS NULL OR e.event_type::text = x.exposure_event)
+    WHERE e.user_id IS NOT NULL
+    GROUP BY x.experiment_id, e.user_id
+),
+outcomes AS (
+    SELECT
+        x.experiment_id,
+        x.variants[1 + mod(('x' || substr(md5(x.experiment_id || ':' || a.user_id::text), 1, 8))::bit(32)::bigint,
+                           cardinality(x.variants))::int] AS variant,
+        COUNT(o.order_id) > 0 AS converted,
+        COALESCE(SUM(o.total_amount), 0) AS revenue
+    FROM exposures a
+    JOIN x ON x.experiment_id = a.experiment_id
+    LEFT JOIN orders o ON o.user_id = a.user_id
+     AND o.order_date >= a.exposed_at AND o.order_date < x.end_date
+     AND o.status::text = ANY(CAST(%(order_statuses)s AS text[]))
+    GROUP BY x.experiment_id, x.variants, a.user_id
+)
+SELECT experiment_id, variant, converted, revenue::float8 AS revenue, COUNT(*) AS users
+FROM outcomes
+GROUP BY experiment_id, variant, converted, revenue
+"""
+
+RESULT_COLUMN_TYPES = {
+    'run_at': 'timestamp', 'experiment_id': 'character varying', 'test_name': 'character varying',
+    'variant': 'character varying', 'control_variant': 'character varying',
+    'users': 'bigint', 'control_users': 'bigint',
+    'conversion_rate': 'double precision', 'control_conversion_rate': 'double precision',
+    'conversion_diff': 'double precision', 'conversion_diff_low': 'double precision',
+    'conversion_diff_high': 'double precision', 'z_stat': 'double precision', 'p_value': 'double precision',
+    'revenue_per_user': 'double precision', 'control_revenue_per_user': 'double precision',
+    'revenue_diff': 'double precision', 'revenue_diff_low': 'double precision',
+    'revenue_diff_high': 'double precision', 't_stat': 'double precision', 'welch_df': 'double precision',
+    'revenue_p_value': 'double precision', 'significant': 'boolean', 'revenue_significant': 'boolean',
+}
+
+
+def variant_stats(distribution: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sufficient statistics per experiment and variant
+
+    Args:
+        distribution: experiment_id, variant, converted, revenue, users
+
+    Returns:
+        pd.DataFrame: indexed by (experiment_id, variant): users, conversions, revenue, revenue_sq
+    """
+    users = distribution['users'].to_numpy(dtype=np.float64)
+    revenue = distribution['revenue'].to_numpy(dtype=np.float64)
+    weighted = pd.DataFrame({
+        'experiment_id': distribution['experiment_id'],
+        'variant': distribution['variant'],
+        'users': users,
+        'conversions': users * distribution['converted'].to_numpy(dtype=bool),
+        'revenue': users * revenue,
+        'revenue_sq': users * revenue ** 2,
+    })
+    return weighted.groupby(['experiment_id', 'variant']).sum()
+
+
+def proportion_ztest(conversions, users, control_conversions, control_users) -> tuple:
+    """Pooled two-proportion z-test, vectorized. Returns (z, two-sided p)"""
+    pooled = (conversions + control_conversions) / (users + control_users)
+    se = np.sqrt(pooled * (1 - pooled) * (1 / users + 1 / control_users))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (conversions / users - control_conversions / control_users) / se
+    return z, 2 * stats.norm.sf(np.abs(z))
+
+
+def welch_ttest(mean, var, n, control_mean, control_var, control_n) -> tuple:
+    """Welch's unequal-variance t-test, vectorized. Returns (t, df, two-sided p)"""
+    a, b = var / n, control_var / control_n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (mean - control_mean) / np.sqrt(a + b)
+        df = (a + b) ** 2 / (a ** 2 / (n - 1) + b ** 2 / (control_n - 1))
+    return t, df, 2 * stats.t.sf(np.abs(t), df)
+
+
+def poisson_bootstrap(groups: np.ndarray, users: np.ndarray, converted: np.ndarray, revenue: np.ndarray,
+                      n_groups: int, n_replicates: int, rng: np.random.Generator) -> tuple:
+    """
+    Bootstrap replicates of every group's totals at once
+
+    Each distribution row stands for `users` identical users; resampling each
+    user Poisson(1) times makes the row's replicate weight Poisson(users).
+
+    Args:
+        groups: Group index of each distribution row
+
+    Returns:
+        (users, conversions, revenue): n_groups x n_replicates replicate totals
+    """
+    totals = np.zeros((3 * n_groups, n_replicates))
+    chunk = max(1, BOOTSTRAP_CHUNK_DRAWS // n_replicates)
+    for start in range(0, len(groups), chunk):
+        rows = slice(start, start + chunk)
+        g, n = groups[rows], len(groups[rows])
+        # rows x (users | conversions | revenue) blocks of group columns
+        values = sp.csr_matrix((
+            np.concatenate([np.ones(n), converted[rows].astype(np.float64), revenue[rows]]),
+            (np.tile(np.arange(n), 3), np.concatenate([g, g + n_groups, g + 2 * n_groups])),
+        ), shape=(n, 3 * n_groups))
+        weights = rng.poisson(users[rows], size=(n_replicates, n))
+        totals += (values.T @ weights.T)
+    return totals[:n_groups], totals[n_groups:2 * n_groups], totals[2 * n_groups:]
+
+
+class ExperimentAnalyzer:
+    def __init__(self, engine, n_bootstrap: int = 1000, alpha: float = 0.05, seed: int = 42):
+        self.engine = engine
+        self.n_bootstrap = n_bootstrap
+        self.alpha = alpha
+        self.seed = seed
+        self.extractor = CopyExtractor(engine)
+
+    def load(self, experiment_ids: list = None) -> tuple:
+        """
+        Experiments and their outcome distribution
+
+        Returns:
+            (experiments, distribution): experiment_id, name, variants / experiment_id,
+            variant, converted, revenue, users
+        """
+        ids = list(experiment_ids) if experiment_ids else None
+        with self.engine.connect() as conn:
+            result = conn.execute(text(EXPERIMENTS_QUERY), {'statuses': list(ANALYZED_STATUSES), 'experiment_ids': ids})
+            experiments = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        distribution = self.extractor.extract(OUTCOME_DISTRIBUTION_QUERY, {
+            'statuses': list(ANALYZED_STATUSES), 'experiment_ids': ids, 'order_statuses': list(ORDER_STATUSES),
+        })
+        return experiments, distribution
+
+    def analyze(self, experiments: pd.DataFrame, distribution: pd.DataFrame) -> pd.DataFrame:
+        """
+        Every treatment variant against its experiment's control
+
+        Returns:
+            pd.DataFrame: One row per (experiment, treatment variant), RESULT_COLUMN_TYPES columns
+        """
+        columns = list(RESULT_COLUMN_TYPES)
+        if experiments.empty or distribution.empty:
+            return pd.DataFrame(columns=columns)
+        distribution = distribution.astype({'experiment_id': str, 'variant': str})
+        groups = variant_stats(distribution)
+        group_index = groups.index
+
+        # Treatment groups and the position of their control
+        controls = dict(zip(experiments['experiment_id'].astype(str), experiments['variants'].map(lambda v: str(v[0]))))
+        names = dict(zip(experiments['experiment_id'].astype(str), experiments['name']))
+        experiment_of = group_index.get_level_values(0)
+        control_pos = group_index.get_indexer(pd.MultiIndex.from_arrays([
+            experiment_of, experiment_of.map(controls)
+        ]))
+        treatment = np.flatnonzero((control_pos >= 0) & (control_pos != np.arange(len(group_index))))
+        control = control_pos[treatment]
+
+        n = groups['users'].to_numpy()
+        conversions = groups['conversions'].to_numpy()
+        revenue = groups['revenue'].to_numpy()
+        mean = revenue / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = (groups['revenue_sq'].to_numpy() - revenue * mean) / (n - 1)
+
+        z, p = proportion_ztest(conversions[treatment], n[treatment], conversions[control], n[control])
+        t, df, revenue_p = welch_ttest(mean[treatment], var[treatment], n[treatment],
+                                       mean[control], var[control], n[control])
+
+        # Bootstrap: replicate totals for every group, then treatment - control per replicate
+        rng = np.random.default_rng(self.seed)
+        row_group = group_index.get_indexer(pd.MultiIndex.from_frame(distribution[['experiment_id', 'variant']]))
+        boot_n, boot_conv, boot_rev = poisson_bootstrap(
+            row_group, distribution['users'].to_numpy(dtype=np.float64),
+            distribution['converted'].to_numpy(dtype=bool), distribution['revenue'].to_numpy(dtype=np.float64),
+            len(group_index), self.n_bootstrap, rng,
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            boot_rate, boot_rpu = boot_conv / boot_n, boot_rev / boot_n
+        tails = [100 * self.alpha / 2, 100 * (1 - self.alpha / 2)]
+        conversion_ci = np.nanpercentile(boot_rate[treatment] - boot_rate[control], tails, axis=1)
+        revenue_ci = np.nanpercentile(boot_rpu[treatment] - boot_rpu[control], tails, axis=1)
+
+        rate = conversions / n
+        results = pd.DataFrame({
+            'run_at': pd.Timestamp.now().floor('s'),
+            'experiment_id': experiment_of[treatment],
+            'test_name': experiment_of[treatment].map(names),
+            'variant': group_index.get_level_values(1)[treatment],
+            'control_variant': group_index.get_level_values(1)[control],
+            'users': n[treatment].astype(np.int64),
+            'control_users': n[control].astype(np.int64),
+            'conversion_rate': rate[treatment],
+            'control_conversion_rate': rate[control],
+            'conversion_diff': rate[treatment] - rate[control],
+            'conversion_diff_low': conversion_ci[0],
+            'conversion_diff_high': conversion_ci[1],
+            'z_stat': z,
+            'p_value': p,
+            'revenue_per_user': mean[treatment],
+            'control_revenue_per_user': mean[control],
+            'revenue_diff': mean[treatment] - mean[control],
+            'revenue_diff_low': revenue_ci[0],
+            'revenue_diff_high': revenue_ci[1],
+            't_stat': t,
+            'welch_df': df,
+            'revenue_p_value': revenue_p,
+        })
+        results['significant'] = results['p_value'] < self.alpha
+        results['revenue_significant'] = results['revenue_p_value'] < self.alpha
+        return results[columns].reset_index(drop=True)
+
+    def save(self, results: pd.DataFrame) -> int:
+        """Append results to ab_test_results with binary COPY"""
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cur:
+                copy_dataframe(cur, results, 'ab_test_results', 'binary', RESULT_COLUMN_TYPES)
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+        return len(results)
+
+    def run(self, experiment_ids: list = None, save: bool = True) -> pd.DataFrame:
+        """
+        Analyze running and completed experiments (or the given ids) and store the results
+
+        Returns:
+            pd.DataFrame: See analyze()
+        """
+        experiments, distribution = self.load(experiment_ids)
+        results = self.analyze(experiments, distribution)
+        if save and not results.empty:
+            self.save(results)
+        logger.info(f"✅ Analyzed {results['experiment_id'].nunique() if len(results) else 0} experiments "
+                    f"({len(results)} comparisons, {int(results['significant'].sum()) if len(results) else 0} "
+                    f"significant at alpha={self.alpha})")
+        return results
@@ -4,6 +4,7 @@ from prophet import Prophet
 from sqlalchemy import create_engine
 import os
 from dotenv import load_dotenv
+from src.database.extract import CopyExtractor
 import logging
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
@@ -19,22 +20,22 @@ class SalesForecaster:
     def __init__(self):
         self.db_url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?sslmode=require"
         self.engine = create_engine(self.db_url)
+        self.extractor = CopyExtractor(self.engine)
         self.model = None
         self.forecast = None
     
     def load_historical_data(self):
-        """Load daily revenue data from database"""
+        """Load daily revenue data from the daily sales rollup"""
         query = """
         SELECT 
-            DATE(order_date) as ds,
-            SUM(total_amount) as y
-        FROM orders
-        GROUP BY DATE(order_date)
+            day as ds,
+            SUM(revenue) as y
+        FROM daily_sales_rollup
+        GROUP BY day
         ORDER BY ds;
         """
-        df = pd.read_sql_query(query, self.engine)
-        df['ds'] = pd.to_datetime(df['ds'])
-        df['y'] = pd.to_numeric(df['y'])
+        # COPY extraction returns ds as datetime64 and y as float64 directly
+        df = self.extractor.extract(query)
         logger.info(f"Loaded {len(df)} days of historical data")
         return df
     
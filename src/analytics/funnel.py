@@ -0,0 +1,266 @@
+# src/analytics/funnel.py
+"""
+Ordered funnel analysis over the events table.
+
+Events of a date range are streamed in (user, timestamp) order over a
+server-side cursor; the server also ships a new-session flag and each event's
+step index, so no ids travel. Sessions are the sessionization stage's
+(src/etl/sessionization.py): a new one starts with each user and after every
+inactivity gap longer than SESSION_GAP_MINUTES, measured over all of the
+user's events in the range, not just funnel steps. Each batch is processed
+with NumPy segment operations:
+
+    step 0    first step-0 event of the session (the funnel entry)
+    step k    first step-k event at or after the time step k-1 was reached
+
+Sessions that never hit step 0 are not in the funnel. The session's segment
+(breakdown value) is that of its entry event: the user's acquisition channel
+or country, or the category of the product first viewed. Only per-segment
+counters and log-bucketed time-between-steps histograms (1% relative accuracy,
+src/database/quantiles.py) are kept across batches, so memory is bounded by
+the batch size whatever the range. Sessions crossing a batch boundary are
+carried into the next batch; sessions crossing the range boundary are cut at
+it.
+"""
+import numpy as np
+import pandas as pd
+import logging
+from src.database.streaming import StreamingReader
+from src.database.quantiles import LOG_GAMMA, bucket_value
+from src.etl.sessionization import SESSION_GAP_MINUTES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FUNNEL_STEPS = ('product_view', 'add_to_cart', 'checkout', 'purchase')
+
+# breakdown -> (join, segment expression)
+BREAKDOWNS = {
+    None: ("", "NULL::text"),
+    'channel': ("LEFT JOIN users u ON u.user_id = e.user_id", "u.acquisition_channel::text"),
+    'country': ("LEFT JOIN users u ON u.user_id = e.user_id", "u.country::text"),
+    'category': ("LEFT JOIN products p ON p.product_id = e.product_id", "p.category::text"),
+}
+
+# Session numbers are computed over every event, then non-step events are dropped
+FUNNEL_EVENTS_QUERY = """
+WITH numbered AS (
+    SELECT
+        e.user_id,
+        e."timestamp",
+        e.event_type,
+        e.product_id,
+        COUNT(*) FILTER (WHERE e.boundary) OVER (ORDER BY e.user_id, e."timestamp"
+                                                 ROWS UNBOUNDED PRECEDING) AS session
+    FROM (
+        SELECT e.*,
+               (e.user_id IS DISTINCT FROM LAG(e.user_id) OVER w
+                OR e."timestamp" - LAG(e."timestamp") OVER w > make_interval(mins => %(gap_minutes)s)) AS boundary
+        FROM events e
+        WHERE e."timestamp" >= %(start_date)s AND e."timestamp" < %(end_date)s
+        WINDOW w AS (ORDER BY e.user_id, e."timestamp")
+    ) e
+)
+SELECT
+    (e.session IS DISTINCT FROM LAG(e.session) OVER (ORDER BY e.session, e."timestamp")) AS new_session,
+    e."timestamp" AS ts,
+    array_position(CAST(%(steps)s AS text[]), e.event_type::text) - 1 AS step,
+    {segment} AS segment
+FROM numbered e
+{join}
+WHERE e.event_type::text = ANY(%(steps)s)
+ORDER BY e.session, e."timestamp"
+"""
+
+
+def session_steps(new_session: np.ndarray, ts: np.ndarray, step: np.ndarray, n_steps: int) -> tuple:
+    """
+    Ordered step completion for a batch of whole sessions
+
+    Args:
+        new_session: True on each session's first event (events sorted by session, time)
+        ts: Event times as int64 nanoseconds
+        step: Step index of each event (0 .. n_steps - 1)
+        n_steps: Number of funnel steps
+
+    Returns:
+        (reached, times, entry): per-session bool (sessions x steps), int64 ns
+        times (valid where reached) and the index of each session's entry event (-1 if none)
+    """
+    session = np.cumsum(new_session) - 1
+    n_sessions = int(session[-1]) + 1 if len(session) else 0
+    reached = np.zeros((n_sessions, n_steps), dtype=bool)
+    times = np.zeros((n_sessions, n_steps), dtype=np.int64)
+    entry = np.full(n_sessions, -1, dtype=np.int64)
+    for k in range(n_steps):
+        candidate = step == k
+        if k > 0:
+            candidate &= reached[session, k - 1] & (ts >= times[session, k - 1])
+        events = np.flatnonzero(candidate)
+        # Events are sorted within a session, so the first candidate is the earliest
+        sessions, first = np.unique(session[events], return_index=True)
+        reached[sessions, k] = True
+        times[sessions, k] = ts[events[first]]
+        if k == 0:
+            entry[sessions] = events[first]
+    return reached, times, entry
+
+
+class FunnelAccumulator:
+    """Per-segment step counters and time-between-steps histograms across batches"""
+
+    def __init__(self, n_steps: int):
+        self.n_steps = n_steps
+        self.counts = []
+        self.durations = []
+
+    def add(self, reached: np.ndarray, times: np.ndarray, segments: np.ndarray):
+        """Fold one batch of funnel sessions (rows with step 0 reached) into the totals"""
+        segments = pd.Series(segments, dtype=object).fillna('(unknown)').to_numpy()
+        counts = pd.DataFrame(reached, columns=range(self.n_steps))
+        counts['segment'] = segments
+        self.counts.append(counts.groupby('segment').sum())
+
+        for k in range(1, self.n_steps):
+            done = reached[:, k]
+            if not done.any():
+                continue
+            seconds = (times[done, k] - times[done, k - 1]) / 1e9
+            # Zero-duration steps (same timestamp) go to the NaN bucket
+            buckets = np.where(seconds > 0, np.ceil(np.log(np.maximum(seconds, 1e-9)) / LOG_GAMMA), np.nan)
+            frame = pd.DataFrame({'segment': segments[done], 'step': k, 'bucket': buckets, 'seconds': seconds})
+            self.durations.append(
+                frame.groupby(['segment', 'step', 'bucket'], dropna=False)['seconds'].agg(['size', 'sum'])
+            )
+        # Keep the partials small: collapse them every few batches
+        if len(self.counts) >= 16:
+            self._collapse()
+
+    def _collapse(self):
+        if self.counts:
+            self.counts = [pd.concat(self.counts).groupby(level=0).sum()]
+        if self.durations:
+            self.durations = [pd.concat(self.durations).groupby(level=[0, 1, 2], dropna=False).sum()]
+
+    def result(self, step_names) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: segment, step, step_name, sessions, conversion_from_previous,
+                          conversion_from_start, median_seconds, p90_seconds, mean_seconds
+                          (time from the previous step)
+        """
+        self._collapse()
+        columns = ['segment', 'step', 'step_name', 'sessions', 'conversion_from_previous',
+                   'conversion_from_start', 'median_seconds', 'p90_seconds', 'mean_seconds']
+        if not self.counts:
+            return pd.DataFrame(columns=columns)
+        counts = self.counts[0]
+        histograms = {}
+        if self.durations:
+            for (segment, k), hist in self.durations[0].groupby(level=[0, 1]):
+                histograms[(segment, k)] = self._duration_stats(
+                    hist.index.get_level_values(2).to_numpy(dtype=np.float64),
+                    hist['size'].to_numpy(), hist['sum'].sum())
+        empty = {'median_seconds': None, 'p90_seconds': None, 'mean_seconds': None}
+
+        rows = []
+        for segment, row in counts.iterrows():
+            sessions = row.to_numpy(dtype=np.int64)
+            for k in range(self.n_steps):
+                previous = sessions[k - 1] if k else sessions[0]
+                rows.append({
+                    'segment': segment,
+                    'step': k,
+                    'step_name': step_names[k],
+                    'sessions': int(sessions[k]),
+                    'conversion_from_previous': sessions[k] / previous if previous else 0.0,
+                    'conversion_from_start': sessions[k] / sessions[0] if sessions[0] else 0.0,
+                    **histograms.get((segment, k), empty),
+                })
+        return pd.DataFrame(rows, columns=columns)
+
+    @staticmethod
+    def _duration_stats(buckets: np.ndarray, sizes: np.ndarray, total_seconds: float) -> dict:
+        values = np.where(np.isnan(buckets), 0.0, bucket_value(np.nan_to_num(buckets)))
+        order = np.argsort(values)
+        values, sizes = values[order], sizes[order]
+        cumulative = np.cumsum(sizes)
+        n = int(cumulative[-1])
+
+        def quantile(q):
+            return float(values[np.searchsorted(cumulative, q * (n - 1), side='right')])
+
+        return {'median_seconds': quantile(0.5), 'p90_seconds': quantile(0.9), 'mean_seconds': total_seconds / n}
+
+
+class FunnelEngine:
+    def __init__(self, engine, batch_size: int = 1_000_000):
+        self.engine = engine
+        self.stream = StreamingReader(engine, batch_size=batch_size)
+
+    def _batches(self, start_date, end_date, steps, breakdown):
+        if breakdown not in BREAKDOWNS:
+            raise ValueError(f"Unknown breakdown '{breakdown}', expected one of {list(BREAKDOWNS)}")
+        join, segment = BREAKDOWNS[breakdown]
+        sql = FUNNEL_EVENTS_QUERY.format(join=join, segment=segment)
+        params = {
+            'steps': list(steps),
+            'gap_minutes': SESSION_GAP_MINUTES,
+            'start_date': pd.Timestamp(start_date),
+            'end_date': pd.Timestamp(end_date),
+        }
+        return self.stream.iter_batches(sql, params)
+
+    def run(self, start_date, end_date, steps=FUNNEL_STEPS, breakdown: str = None) -> pd.DataFrame:
+        """
+        Ordered funnel over [start_date, end_date)
+
+        Args:
+            start_date: Range start (inclusive)
+            end_date: Range end (exclusive)
+            steps: Event types in funnel order
+            breakdown: None, 'channel', 'country' or 'category'
+
+        Returns:
+            pd.DataFrame: One row per segment and step (see FunnelAccumulator.result)
+        """
+        df, events = self.run_batches(self._batches(start_date, end_date, steps, breakdown), steps)
+        if breakdown is None:
+            df = df.drop(columns='segment')
+        logger.info(f"✅ Funnel over {events:,} events ({start_date} .. {end_date}, breakdown={breakdown})")
+        return df
+
+    def run_batches(self, batches, steps=FUNNEL_STEPS) -> tuple:
+        """
+        Funnel over an iterable of event frames (new_session, ts, step, segment),
+        sorted by session and time as FUNNEL_EVENTS_QUERY returns them
+
+        Returns:
+            (pd.DataFrame, int): Funnel rows and the number of events read
+        """
+        accumulator = FunnelAccumulator(len(steps))
+        carry = None
+        events = 0
+        for batch in batches:
+            events += len(batch)
+            if carry is not None:
+                batch = pd.concat([carry, batch], ignore_index=True)
+            # Hold back the last session: its remaining events may be in the next batch
+            starts = np.flatnonzero(batch['new_session'].to_numpy(dtype=bool))
+            cut = starts[-1] if len(starts) else 0
+            carry = batch.iloc[cut:]
+            self._add(accumulator, batch.iloc[:cut], len(steps))
+        if carry is not None:
+            self._add(accumulator, carry, len(steps))
+        return accumulator.result(list(steps)), events
+
+    @staticmethod
+    def _add(accumulator: FunnelAccumulator, batch: pd.DataFrame, n_steps: int):
+        if batch.empty:
+            return
+        new_session = batch['new_session'].to_numpy(dtype=bool).copy()
+        new_session[0] = True
+        ts = batch['ts'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        reached, times, entry = session_steps(new_session, ts, batch['step'].to_numpy(dtype=np.int64), n_steps)
+        funnel = entry >= 0
+        accumulator.add(reached[funnel], times[funnel], batch['segment'].to_numpy(dtype=object)[entry[funnel]])
@@ -1,7 +1,15 @@
 import pandas as pd
+import numpy as np
 from sqlalchemy import create_engine
 import os
 from dotenv import load_dotenv
+from src.database.query_catalog import QueryCatalog
+from src.database.batch_executor import BatchQueryExecutor
+from src.database.extract import CopyExtractor
+from src.database.streaming import StreamingReader
+from src.database.quantiles import QuantileSketches, DEFAULT_QUANTILES
+from src.analytics.cohort_engine import CohortEngine
+from src.analytics.result_cache import ResultCache, versioned
 import logging
 import plotly.express as px
 import plotly.graph_objects as go
@@ -12,180 +20,144 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Shared by every calculator in the process, so a calculator rebuilt on each
+# dashboard rerun still hits results computed at the same data version
+KPI_CACHE = ResultCache(
+    max_entries=int(os.getenv('KPI_CACHE_MAX_ENTRIES', '128')),
+    max_bytes=int(os.getenv('KPI_CACHE_MAX_MB', '256')) * 1024 * 1024
+)
+
 class KPICalculator:
-    def __init__(self):
+    def __init__(self, cache: ResultCache = None):
         self.db_url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?sslmode=require"
         self.engine = create_engine(self.db_url)
+        self.catalog = QueryCatalog(self.engine)
+        self.batch = BatchQueryExecutor(self.engine, catalog=self.catalog)
+        # Row-level fetches go through COPY (typed columns, no per-row Decimals)
+        self.extractor = CopyExtractor(self.engine)
+        # Full-population scans stream in batches over a server-side cursor
+        self.stream = StreamingReader(self.engine)
+        # Retention matrices from per-user month bitmaps (reloaded when the data version moves)
+        self.cohorts = CohortEngine(self.engine)
+        # Order value / basket size / item price distributions from per-day sketches
+        self.quantiles = QuantileSketches(self.engine)
+        # Results memoized per (method, arguments, data version)
+        self.cache = cache or KPI_CACHE
     
-    def get_daily_kpis(self):
-        """Fetch daily KPIs from view"""
-        query = "SELECT * FROM daily_kpis ORDER BY date DESC LIMIT 90;"
-        df = pd.read_sql_query(query, self.engine)
-        df['date'] = pd.to_datetime(df['date'])
+    @versioned
+    def get_daily_kpis(self, days=90):
+        """Fetch daily KPIs from the materialized view (index scan on date)"""
+        df = self.extractor.extract_query('kpi_daily_kpis', {'limit': days})
         logger.info(f"Loaded {len(df)} daily KPIs")
         return df
     
-    def get_customer_ltv(self):
-        """Fetch customer lifetime value from view"""
-        query = "SELECT * FROM customer_lifetime_value WHERE total_spent > 0 ORDER BY total_spent DESC LIMIT 500;"
-        df = pd.read_sql_query(query, self.engine)
-        df['signup_date'] = pd.to_datetime(df['signup_date'])
-        if 'first_order_date' in df.columns:
-            df['first_order_date'] = pd.to_datetime(df['first_order_date'])
+    @versioned
+    def get_customer_ltv(self, limit=500):
+        """Fetch customer lifetime value from the materialized view (index scan on total_spent)"""
+        df = self.extractor.extract_query('kpi_customer_ltv', {'limit': limit})
         logger.info(f"Loaded {len(df)} customer LTV records")
         return df
     
-    def calculate_retention_cohort(self, periods=12):
-        """Calculate monthly retention cohort analysis"""
-        cohort_query = """
-        WITH user_cohorts AS (
-            SELECT 
-                user_id,
-                DATE_TRUNC('month', signup_date) as cohort_month
-            FROM users
-        ),
-        monthly_activity AS (
-            SELECT 
-                o.user_id,
-                uc.cohort_month,
-                DATE_TRUNC('month', o.order_date) as activity_month
-            FROM orders o
-            JOIN user_cohorts uc ON o.user_id = uc.user_id
-            GROUP BY 1, 2, 3
-        )
-        SELECT 
-            cohort_month,
-            activity_month,
-            COUNT(DISTINCT user_id) as retained_users
-        FROM monthly_activity
-        GROUP BY cohort_month, activity_month
-        ORDER BY cohort_month, activity_month;
+    def iter_customer_ltv(self, batch_size=50000):
+        """Stream every paying customer's lifetime value in typed batches (bounded memory)"""
+        return self.stream.iter_query('kpi_customer_ltv_all', batch_size=batch_size)
+    
+    @versioned
+    def customer_ltv_histogram(self, bins=20):
         """
-        df = pd.read_sql_query(cohort_query, self.engine)
-        df['cohort_month'] = pd.to_datetime(df['cohort_month'])
-        df['activity_month'] = pd.to_datetime(df['activity_month'])
-        
-        # Remove timezone localization to ensure compatibility for subtraction
-        df['cohort_month'] = df['cohort_month'].dt.tz_localize(None)
-        df['activity_month'] = df['activity_month'].dt.tz_localize(None)
+        CLV distribution over all paying customers, accumulated batch by batch
         
-        # Calculate the month index (period) since signup
-        df['period'] = (df['activity_month'] - df['cohort_month']).dt.days // 30 
+        Returns:
+            pd.DataFrame: bin_start, bin_end, customers
+        """
+        bounds = self.catalog.execute('kpi_customer_ltv_range')
+        low, high = bounds.iloc[0]['min_spent'], bounds.iloc[0]['max_spent']
+        if pd.isna(low):
+            return pd.DataFrame(columns=['bin_start', 'bin_end', 'customers'])
+        edges = np.linspace(float(low), float(high), bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+        for batch in self.iter_customer_ltv():
+            counts += np.histogram(batch['total_spent'].to_numpy(), bins=edges)[0]
+        logger.info(f"CLV histogram over {counts.sum()} customers")
+        return pd.DataFrame({'bin_start': edges[:-1], 'bin_end': edges[1:], 'customers': counts})
+    
+    @versioned
+    def calculate_value_percentiles(self, days=90, status='completed'):
+        """
+        Percentiles of order value and basket size (and item price) over the last `days` days,
+        merged from the daily quantile sketches (1% relative accuracy)
         
-        # Calculate initial cohort size for each month
-        cohort_sizes = df[df['period'] == 0].groupby('cohort_month')['retained_users'].sum().rename('initial_size')
-        df = df.merge(cohort_sizes, on='cohort_month')
+        Returns:
+            pd.DataFrame: metric, orders/units counted, p50, p90, p95, p99
+        """
+        start_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=days - 1)
+        rows = []
+        for metric in ('order_value', 'basket_size', 'item_price'):
+            filters = {'status': status} if status and metric != 'item_price' else None
+            q = self.quantiles.quantiles(metric, DEFAULT_QUANTILES, start_date=start_date, filters=filters)
+            rows.append({'metric': metric, 'count': q['count'],
+                         **{f"p{int(p * 100)}": q[p] for p in DEFAULT_QUANTILES}})
+        logger.info(f"Value percentiles over the last {days} days")
+        return pd.DataFrame(rows)
+    
+    @versioned
+    def order_value_distribution(self, days=90, bins=30, status='completed'):
+        """
+        Order value histogram over the last `days` days from the daily quantile sketches
         
-        # Calculate retention rate
-        df['retention_rate'] = df['retained_users'] / df['initial_size']
+        Returns:
+            pd.DataFrame: bin_start, bin_end, count
+        """
+        start_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=days - 1)
+        filters = {'status': status} if status else None
+        return self.quantiles.histogram('order_value', bins=bins, start_date=start_date, filters=filters)
+    
+    @versioned
+    def calculate_retention_cohort(self, periods=12):
+        """Calculate monthly retention cohort analysis (signup cohorts, calendar-month periods)"""
+        df = self.cohorts.retention(cohort='signup', periods=periods)
+        df = df.rename(columns={'cohort_size': 'initial_size'})
         logger.info(f"Calculated retention for {len(df)} cohort periods")
         return df
 
+    @versioned
     def calculate_channel_roi(self):
         """Calculate ROI per acquisition channel"""
-        query = """
-        SELECT 
-            u.acquisition_channel,
-            COUNT(DISTINCT u.user_id) as users,
-            COUNT(DISTINCT o.order_id) as orders,
-            ROUND(SUM(o.total_amount), 2) as revenue,
-            ROUND(SUM(o.total_amount) / NULLIF(COUNT(DISTINCT u.user_id), 0), 2) as revenue_per_user,
-            ROUND((SUM(o.total_amount) / NULLIF(COUNT(DISTINCT u.user_id), 0)) / 10, 2) as roi
-        FROM users u
-        LEFT JOIN orders o ON u.user_id = o.user_id
-        GROUP BY u.acquisition_channel
-        ORDER BY revenue DESC;
-        """
-        df = pd.read_sql_query(query, self.engine)
+        df = self.extractor.extract_query('kpi_channel_roi')
         logger.info(f"Channel ROI: {len(df)} channels")
         return df
 
+    @versioned
     def calculate_inventory_turnover(self):
         """
         Calculate inventory turnover rate.
         FIXED: Uses the new 'stock_quantity' column.
         """
-        query = """
-        SELECT 
-            p.category,
-            -- Calculate Average Inventory based on the current stock quantity
-            AVG(p.stock_quantity) as avg_inventory, 
-            -- Calculate Units Sold from order_items
-            SUM(oi.quantity) as units_sold,
-            -- Calculate Turnover Rate: Units Sold / Average Inventory
-            ROUND(SUM(oi.quantity) / NULLIF(AVG(p.stock_quantity), 0), 2) as turnover_rate
-        FROM products p
-        LEFT JOIN order_items oi ON p.product_id = oi.product_id
-        GROUP BY p.category
-        ORDER BY turnover_rate DESC;
-        """
-        df = pd.read_sql_query(query, self.engine)
+        df = self.extractor.extract_query('kpi_inventory_turnover')
         logger.info(f"Inventory turnover: {len(df)} categories")
         return df
     
+    @versioned
     def calculate_key_metrics(self):
         """
         Calculate core KPIs.
         FIXED: Robust error checking for None/NaN values.
         """
+        # All four KPIs from one pass over orders and one over users
+        row = self.catalog.execute('kpi_key_metrics', {'days': 30}).iloc[0]
         
-        # AOV from orders
-        aov_query = "SELECT ROUND(AVG(total_amount), 2) as aov FROM orders;"
-        aov_result = pd.read_sql_query(aov_query, self.engine)
-        # Check if the result is valid or default to 0.00
-        aov = aov_result.iloc[0, 0] if not aov_result.empty and aov_result.iloc[0, 0] is not None else 0.00
+        # Check if each result is valid or default to 0.00
+        aov = row['aov'] if pd.notna(row['aov']) else 0.00
         
         # CAC (simple: marketing budget / new users – assume budget $10k/month)
-        new_users_query = "SELECT COUNT(*) as new_users FROM users WHERE signup_date >= CURRENT_DATE - INTERVAL '30 days';"
-        new_users = pd.read_sql_query(new_users_query, self.engine).iloc[0, 0]
-        # CAC calculation already handles division by zero, but ensure the new_users count is valid.
-        new_users = new_users if new_users is not None else 0
+        new_users = row['new_users'] if pd.notna(row['new_users']) else 0
         cac = 10000 / new_users if new_users > 0 else 0.00
         
         # Retention Rate (Avg Month 1 Retention)
-        retention_query = """
-        WITH cohort_periods AS (
-            SELECT 
-                u.user_id,
-                DATE_TRUNC('month', u.signup_date) as cohort_month,
-                DATE_TRUNC('month', o.order_date) as activity_month
-            FROM users u
-            JOIN orders o ON u.user_id = o.user_id
-            GROUP BY 1, 2, 3
-        ),
-        cohort_analysis AS (
-            SELECT
-                cohort_month,
-                activity_month,
-                (EXTRACT(YEAR FROM activity_month) - EXTRACT(YEAR FROM cohort_month)) * 12 +
-                (EXTRACT(MONTH FROM activity_month) - EXTRACT(MONTH FROM cohort_month)) AS period
-            FROM cohort_periods
-            GROUP BY 1, 2
-        ),
-        cohort_metrics AS (
-            SELECT
-                ca.cohort_month,
-                ca.period,
-                COUNT(DISTINCT cp.user_id) AS retained_users,
-                (SELECT COUNT(user_id) FROM users WHERE DATE_TRUNC('month', signup_date) = ca.cohort_month) AS initial_size
-            FROM cohort_analysis ca
-            JOIN cohort_periods cp ON ca.cohort_month = cp.cohort_month AND ca.activity_month = cp.activity_month
-            GROUP BY 1, 2
-        )
-        SELECT
-            AVG(CAST(retained_users AS NUMERIC) / initial_size * 100) as retention_rate_pct
-        FROM cohort_metrics
-        WHERE period = 1 AND initial_size > 0;
-        """
-        result = pd.read_sql_query(retention_query, self.engine)
-        # Check if the result is valid or default to 0.00
-        retention = result.iloc[0, 0] if result.shape[0] > 0 and result.iloc[0, 0] is not None else 0.00
+        retention = row['retention_rate_pct'] if pd.notna(row['retention_rate_pct']) else 0.00
         
         # CLV (avg total_spent)
-        clv_query = "SELECT ROUND(AVG(total_spent), 2) as clv FROM customer_lifetime_value WHERE total_spent > 0;"
-        clv_result = pd.read_sql_query(clv_query, self.engine)
-        # Check if the result is valid or default to 0.00
-        clv = clv_result.iloc[0, 0] if not clv_result.empty and clv_result.iloc[0, 0] is not None else 0.00
+        clv = row['clv'] if pd.notna(row['clv']) else 0.00
         
         metrics = {
             'AOV': aov,
@@ -198,21 +170,24 @@ class KPICalculator:
     
     def create_kpi_dashboard(self):
         """Create interactive Plotly dashboard for KPIs"""
-        # Get data
-        daily_df = self.get_daily_kpis()
-        ltv_df = self.get_customer_ltv()
-        cohort_df = self.calculate_retention_cohort()
-        metrics = self.calculate_key_metrics()
-        
-        # Run turnover calculation here, it should work after schema update
-        turnover_df = self.calculate_inventory_turnover()
+        # Get data (independent fetches, run concurrently)
+        data = self.batch.run_tasks({
+            'daily': self.get_daily_kpis,
+            'ltv': self.customer_ltv_histogram,
+            'cohort': self.calculate_retention_cohort,
+            'metrics': self.calculate_key_metrics,
+            # Run turnover calculation here, it should work after schema update
+            'turnover': self.calculate_inventory_turnover
+        })
+        daily_df, ltv_hist, cohort_df = data['daily'], data['ltv'], data['cohort']
+        metrics, turnover_df = data['metrics'], data['turnover']
         
         # Subplots dashboard layout
         fig = make_subplots(
             rows=2, cols=2,
             subplot_titles=('Daily Revenue Trend (Last 90 Days)', 'Retention Cohort Heatmap', 'CLV Distribution', 'Key Metrics'),
             specs=[[{"type": "scatter"}, {"type": "heatmap"}],
-                   [{"type": "histogram"}, {"type": "table"}]]
+                   [{"type": "bar"}, {"type": "table"}]]
         )
         
         # 1. Daily Revenue
@@ -242,9 +217,10 @@ class KPICalculator:
         fig.update_xaxes(title_text="Months Since Signup (Period)", row=1, col=2)
         fig.update_yaxes(title_text="Cohort Month", row=1, col=2)
         
-        # 3. CLV Histogram
+        # 3. CLV Histogram (all paying customers, binned while streaming)
         fig.add_trace(
-            go.Histogram(x=ltv_df['total_spent'], nbinsx=20, name='CLV Distribution', marker_color='#4682B4'),
+            go.Bar(x=(ltv_hist['bin_start'] + ltv_hist['bin_end']) / 2, y=ltv_hist['customers'],
+                   width=(ltv_hist['bin_end'] - ltv_hist['bin_start']), name='CLV Distribution', marker_color='#4682B4'),
             row=2, col=1
         )
         fig.update_xaxes(title_text="Total Spent (CLV)", row=2, col=1)
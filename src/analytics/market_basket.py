@@ -0,0 +1,308 @@
+# src/analytics/market_basket.py
+"""
+Market-basket ("bought together") engine on sparse matrices.
+
+order_items becomes a binary order x product incidence matrix X (scipy.sparse
+CSR, one row per order with items). Its Gram matrix C = X^T X holds every
+product pair's co-occurrence count off the diagonal and each product's order
+count on it, so one sparse product gives, for a pair (a, b) over N orders:
+
+    support     C[a, b] / N
+    confidence  C[a, b] / C[a, a]           (a -> b)
+    lift        C[a, b] * N / (C[a, a] * C[b, b])
+
+Pair counts (upper triangle), product order counts and N are stored, and the
+top-k partners of every product by lift (pairs seen in at least
+min_co_orders orders) are kept in product_affinity.
+
+Loads update incrementally, inside the load's transaction (the counts are
+additive, so an update must apply exactly once with its rows). For the
+orders an order_items frame touches, the engine takes their item sets before
+and after the load and adds X_after^T X_after - X_before^T X_before to the
+stored counts, so items arriving after their order are counted exactly. Top-k lists are recomputed for the
+products whose counts changed. Lists of untouched products keep the lift they
+had when last ranked until the next rebuild().
+"""
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sqlalchemy import text
+import logging
+from src.database.data_version import bump_data_version, BUMP_DATA_VERSION_PYFORMAT
+from src.database.extract import CopyExtractor
+from src.etl.pgcopy import copy_dataframe
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AFFINITY_COLUMNS = ['product_id', 'related_product_id', 'rank', 'co_orders', 'support', 'confidence', 'lift']
+
+COLUMN_TYPES = {
+    'product_id': 'uuid', 'related_product_id': 'uuid', 'product_a': 'uuid', 'product_b': 'uuid',
+    'rank': 'smallint', 'co_orders': 'integer', 'orders': 'integer',
+    'support': 'double precision', 'confidence': 'double precision', 'lift': 'double precision',
+}
+
+ORDER_ITEMS_QUERY = "SELECT order_id, product_id FROM order_items"
+
+AFFECTED_ITEMS_QUERY = """
+SELECT order_id, product_id FROM order_items WHERE order_id = ANY(CAST(:order_ids AS uuid[]))
+"""
+
+ADD_PAIR_COUNTS_QUERY = """
+INSERT INTO product_pair_counts (product_a, product_b, co_orders)
+SELECT * FROM unnest(CAST(:product_a AS uuid[]), CAST(:product_b AS uuid[]), CAST(:delta AS integer[]))
+ON CONFLICT (product_a, product_b) DO UPDATE
+SET co_orders = product_pair_counts.co_orders + EXCLUDED.co_orders
+"""
+
+ADD_PRODUCT_COUNTS_QUERY = """
+INSERT INTO product_order_counts (product_id, orders)
+SELECT * FROM unnest(CAST(:product_id AS uuid[]), CAST(:delta AS integer[]))
+ON CONFLICT (product_id) DO UPDATE
+SET orders = product_order_counts.orders + EXCLUDED.orders
+"""
+
+ADD_BASKET_ORDERS_QUERY = """
+UPDATE basket_stats SET orders = orders + :delta, updated_at = CURRENT_TIMESTAMP WHERE id = 1
+RETURNING orders
+"""
+
+PRODUCT_PAIRS_QUERY = """
+SELECT product_a, product_b, co_orders
+FROM product_pair_counts
+WHERE (product_a = ANY(CAST(:products AS uuid[])) OR product_b = ANY(CAST(:products AS uuid[])))
+AND co_orders > 0
+"""
+
+PRODUCT_COUNTS_QUERY = """
+SELECT product_id, orders FROM product_order_counts WHERE product_id = ANY(CAST(:products AS uuid[]))
+"""
+
+INSERT_AFFINITY_QUERY = f"""
+INSERT INTO product_affinity ({', '.join(AFFINITY_COLUMNS)})
+SELECT * FROM unnest(
+    CAST(:product_id AS uuid[]), CAST(:related_product_id AS uuid[]), CAST(:rank AS smallint[]),
+    CAST(:co_orders AS integer[]), CAST(:support AS double precision[]),
+    CAST(:confidence AS double precision[]), CAST(:lift AS double precision[])
+)
+"""
+
+RELATED_PRODUCTS_QUERY = """
+SELECT a.rank, a.related_product_id, p.name, p.category, a.co_orders, a.support, a.confidence, a.lift
+FROM product_affinity a
+LEFT JOIN products p ON p.product_id = a.related_product_id
+WHERE a.product_id = CAST(:product_id AS uuid) AND a.rank <= :limit
+ORDER BY a.rank
+"""
+
+
+def incidence_matrix(order_ids, product_ids, products: pd.Index = None) -> tuple:
+    """
+    Binary order x product CSR matrix (duplicate lines count once). Columns
+    are in id order, so column i < j exactly when product i sorts before j
+    (the product_a < product_b key of product_pair_counts).
+
+    Returns:
+        (X, orders, products): the matrix and its row / column labels
+    """
+    rows, orders = pd.factorize(pd.Series(order_ids, dtype=object).astype(str))
+    if products is None:
+        cols, products = pd.factorize(pd.Series(product_ids, dtype=object).astype(str), sort=True)
+        products = pd.Index(products)
+    else:
+        cols = products.get_indexer(pd.Series(product_ids, dtype=object).astype(str))
+    X = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                      shape=(len(orders), len(products)))
+    X.sum_duplicates()
+    X.data[:] = 1
+    return X, pd.Index(orders), products
+
+
+def rank_pairs(a: np.ndarray, b: np.ndarray, co: np.ndarray, count_a: np.ndarray, count_b: np.ndarray,
+               n_orders: int, top_k: int, min_co_orders: int) -> pd.DataFrame:
+    """
+    Top-k partners per product by lift (ties broken by co-occurrence count)
+
+    Args:
+        a, b: Directed pairs (each unordered pair listed both ways)
+        co: Orders containing both
+        count_a, count_b: Orders containing a / b
+        n_orders: Orders with at least one item
+
+    Returns:
+        pd.DataFrame: AFFINITY_COLUMNS (a, b as given)
+    """
+    keep = co >= min_co_orders
+    a, b, co, count_a, count_b = a[keep], b[keep], co[keep], count_a[keep], count_b[keep]
+    lift = co * float(n_orders) / (count_a.astype(np.float64) * count_b)
+    order = np.lexsort((-co, -lift, a))
+    df = pd.DataFrame({
+        'product_id': a[order],
+        'related_product_id': b[order],
+        'co_orders': co[order].astype(np.int64),
+        'support': co[order] / float(n_orders),
+        'confidence': co[order] / count_a[order].astype(np.float64),
+        'lift': lift[order],
+    })
+    df['rank'] = df.groupby('product_id', sort=False).cumcount() + 1
+    return df[df['rank'] <= top_k][AFFINITY_COLUMNS].reset_index(drop=True)
+
+
+class MarketBasketEngine:
+    def __init__(self, engine, top_k: int = 20, min_co_orders: int = 2):
+        self.engine = engine
+        self.top_k = top_k
+        self.min_co_orders = min_co_orders
+        self.extractor = CopyExtractor(engine)
+
+    def related(self, product_id: str, limit: int = 10) -> pd.DataFrame:
+        """
+        Stored top partners of a product
+
+        Returns:
+            pd.DataFrame: rank, related_product_id, name, category, co_orders, support, confidence, lift
+        """
+        with self.engine.connect() as conn:
+            result = conn.execute(text(RELATED_PRODUCTS_QUERY), {'product_id': product_id, 'limit': limit})
+            return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+    # ---------- full rebuild ----------
+
+    def rebuild(self) -> dict:
+        """
+        Recompute every count and top-k list from order_items (one transaction)
+
+        Returns:
+            dict: orders, products, pairs and affinity rows written
+        """
+        items = self.extractor.extract(ORDER_ITEMS_QUERY)
+        X, orders, products = incidence_matrix(items['order_id'], items['product_id'])
+        C = (X.T @ X).tocoo()
+        counts = X.sum(axis=0).A1.astype(np.int64)
+        n_orders = len(orders)
+
+        off_diagonal = C.row != C.col
+        a, b, co = C.row[off_diagonal], C.col[off_diagonal], C.data[off_diagonal]
+        upper = a < b
+        pairs = pd.DataFrame({'product_a': products[a[upper]], 'product_b': products[b[upper]],
+                              'co_orders': co[upper].astype(np.int64)})
+        product_counts = pd.DataFrame({'product_id': products, 'orders': counts})
+        affinity = rank_pairs(a, b, co, counts[a], counts[b], n_orders, self.top_k, self.min_co_orders)
+        affinity['product_id'] = products[affinity['product_id']]
+        affinity['related_product_id'] = products[affinity['related_product_id']]
+
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cur:
+                cur.execute("TRUNCATE product_pair_counts, product_order_counts, product_affinity")
+                for table_name, df in (('product_pair_counts', pairs),
+                                       ('product_order_counts', product_counts),
+                                       ('product_affinity', affinity)):
+                    copy_dataframe(cur, df, table_name, 'binary', COLUMN_TYPES)
+                cur.execute("UPDATE basket_stats SET orders = %(orders)s, updated_at = CURRENT_TIMESTAMP "
+                            "WHERE id = 1", {'orders': n_orders})
+                cur.execute(BUMP_DATA_VERSION_PYFORMAT, {'source': 'product_affinity'})
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+
+        summary = {'orders': n_orders, 'products': len(products), 'pairs': len(pairs), 'affinity_rows': len(affinity)}
+        logger.info(f"✅ Rebuilt market basket: {summary}")
+        return summary
+
+    # ---------- incremental ----------
+
+    def track_load(self, df: pd.DataFrame, table_name: str, conn=None) -> int:
+        """
+        Apply a freshly loaded order_items frame to the counts and refresh affected top-k lists
+
+        The counts are additive, so they must change exactly once per load:
+        pass the load's connection (the frame's rows already inserted in it)
+        so the deltas commit or roll back together with the lines.
+
+        Returns:
+            int: Number of products whose top-k list was recomputed (0 for other tables)
+        """
+        if table_name != 'order_items' or not {'order_id', 'product_id'} <= set(df.columns):
+            return 0
+        loaded = df[['order_id', 'product_id']].dropna().astype(str)
+        if loaded.empty:
+            return 0
+
+        owned = conn is None
+        with self.engine.begin() if owned else nullcontext(conn) as conn:
+            after = pd.DataFrame(conn.execute(text(AFFECTED_ITEMS_QUERY), {
+                'order_ids': loaded['order_id'].unique().tolist()
+            }).fetchall(), columns=['order_id', 'product_id']).astype(str)
+            # A line was there before the load if the table holds more copies than the frame added
+            held = after.groupby(['order_id', 'product_id']).size()
+            added = loaded.groupby(['order_id', 'product_id']).size().reindex(held.index, fill_value=0)
+            before = held[held > added].index.to_frame(index=False)
+
+            products = pd.Index(np.sort(after['product_id'].unique()))
+            X_after, orders, _ = incidence_matrix(after['order_id'], after['product_id'], products)
+            rows = orders.get_indexer(before['order_id'])
+            X_before = sp.csr_matrix((np.ones(len(before), dtype=np.int32),
+                                      (rows, products.get_indexer(before['product_id']))),
+                                     shape=X_after.shape)
+            delta = (X_after.T @ X_after - X_before.T @ X_before).tocoo()
+            nonzero = delta.data != 0
+            a, b, d = delta.row[nonzero], delta.col[nonzero], delta.data[nonzero]
+            if not len(d):
+                return 0
+            new_orders = len(orders) - len(np.unique(rows))
+
+            upper = a < b
+            if upper.any():
+                conn.execute(text(ADD_PAIR_COUNTS_QUERY), {
+                    'product_a': products[a[upper]].tolist(), 'product_b': products[b[upper]].tolist(),
+                    'delta': d[upper].astype(int).tolist(),
+                })
+            diagonal = a == b
+            if diagonal.any():
+                conn.execute(text(ADD_PRODUCT_COUNTS_QUERY), {
+                    'product_id': products[a[diagonal]].tolist(), 'delta': d[diagonal].astype(int).tolist(),
+                })
+            n_orders = conn.execute(text(ADD_BASKET_ORDERS_QUERY), {'delta': new_orders}).scalar()
+
+            changed = products[np.unique(np.concatenate([a, b]))].tolist()
+            refreshed = self._refresh_top_k(conn, changed, n_orders)
+            if owned:
+                bump_data_version(conn, 'product_affinity')
+        logger.info(f"✅ Market basket updated from {len(loaded):,} lines, {refreshed:,} top-k lists refreshed")
+        return refreshed
+
+    def clear(self, table_name: str, conn) -> None:
+        """Drop all basket counts when order_items are cleared (inside conn's transaction)"""
+        if table_name == 'order_items':
+            conn.execute(text("TRUNCATE product_pair_counts, product_order_counts, product_affinity"))
+            conn.execute(text("UPDATE basket_stats SET orders = 0, updated_at = CURRENT_TIMESTAMP WHERE id = 1"))
+
+    def _refresh_top_k(self, conn, products: list, n_orders: int) -> int:
+        pairs = pd.DataFrame(conn.execute(text(PRODUCT_PAIRS_QUERY), {'products': products}).fetchall(),
+                             columns=['product_a', 'product_b', 'co_orders']).astype({'product_a': str, 'product_b': str})
+        # Both directions, then keep rows starting at a changed product
+        directed = pd.concat([
+            pairs.rename(columns={'product_a': 'a', 'product_b': 'b'}),
+            pairs.rename(columns={'product_b': 'a', 'product_a': 'b'}),
+        ], ignore_index=True)
+        directed = directed[directed['a'].isin(products)]
+        involved = pd.unique(np.concatenate([directed['a'].to_numpy(), directed['b'].to_numpy()]))
+        counts = dict(conn.execute(text(PRODUCT_COUNTS_QUERY), {'products': list(involved)}).fetchall())
+        counts = {str(k): v for k, v in counts.items()}
+
+        affinity = rank_pairs(directed['a'].to_numpy(dtype=object), directed['b'].to_numpy(dtype=object),
+                              directed['co_orders'].to_numpy(dtype=np.int64),
+                              directed['a'].map(counts).to_numpy(dtype=np.int64),
+                              directed['b'].map(counts).to_numpy(dtype=np.int64),
+                              n_orders, self.top_k, self.min_co_orders)
+        conn.execute(text("DELETE FROM product_affinity WHERE product_id = ANY(CAST(:products AS uuid[]))"),
+                     {'products': products})
+        if not affinity.empty:
+            conn.execute(text(INSERT_AFFINITY_QUERY), {column: affinity[column].tolist() for column in AFFINITY_COLUMNS})
+        return len(products)
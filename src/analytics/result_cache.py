@@ -0,0 +1,161 @@
+# src/analytics/result_cache.py
+"""
+Process-wide cache for analytics results, keyed by data version.
+
+Entries are keyed by (method, bound arguments, data version), where the
+version is read from data_version (src/database/data_version.py) before the
+result is computed. Every write bumps that version in its own transaction, so a
+cached result is served only while no change has committed since it was
+computed. Entries for older versions can never be hit again and are dropped as
+soon as a newer version is seen.
+
+Eviction is least-recently-used, bounded both by entry count and by the
+estimated in-memory size of the results. Results are copied in and out, so
+callers may modify what they get back.
+"""
+import copy
+import functools
+import inspect
+import sys
+import threading
+from collections import OrderedDict
+import pandas as pd
+import logging
+from src.database.data_version import current_data_version
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def result_bytes(value) -> int:
+    """Estimated in-memory size of a result (DataFrames measured deeply)"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(result_bytes(k) + result_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(result_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _freeze(value):
+    """Hashable form of an argument value (dicts, lists and sets become sorted tuples)"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 128, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, name: str, params: tuple, version, compute):
+        """
+        Cached result of compute() for (name, params) at a data version
+
+        Args:
+            name: Method name
+            params: Hashable, normalized arguments
+            version: Data version read before computing (None disables caching)
+            compute: Zero-argument callable producing the result
+
+        Returns:
+            A copy of the cached or freshly computed result
+        """
+        if version is None:
+            with self._lock:
+                self.misses += 1
+            return compute()
+
+        key = (name, params, version)
+        with self._lock:
+            self._observe(version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(self._entries[key][0])
+            self.misses += 1
+
+        result = compute()
+        size = result_bytes(result)
+        if size <= self.max_bytes:
+            with self._lock:
+                # A newer version may have been seen while computing
+                if self._version is not None and version < self._version:
+                    return result
+                if key in self._entries:
+                    self._bytes -= self._entries.pop(key)[1]
+                self._entries[key] = (copy.deepcopy(result), size)
+                self._bytes += size
+                self._evict()
+        return result
+
+    def _observe(self, version):
+        """Drop every entry older than a newly seen version"""
+        if self._version is not None and version <= self._version:
+            return
+        stale = [key for key in self._entries if key[2] < version]
+        for key in stale:
+            self._bytes -= self._entries.pop(key)[1]
+        self.invalidations += len(stale)
+        self._version = version
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+def versioned(method):
+    """
+    Memoize a method in self.cache under (method, arguments, data version)
+
+    The instance provides `cache` (a ResultCache) and `engine`; arguments are
+    bound with their defaults so f() and f(90) share an entry.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        params = tuple((name, _freeze(value)) for name, value in list(bound.arguments.items())[1:])
+        version = current_data_version(self.engine)
+        return self.cache.get_or_compute(method.__qualname__, params, version,
+                                         lambda: method(self, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,78 @@
+# src/database/activity.py
+"""
+Per-user calendar-month activity, maintained incrementally as orders load.
+
+user_month_activity holds one row per (user, month) with at least one order,
+flagged when any of that month's orders is completed. Loads upsert the months
+their frame touches, so the table never re-reads orders; rebuild() recomputes
+it in one pass after a truncating load. It is the source of the cohort engine
+(src/analytics/cohort_engine.py).
+"""
+from contextlib import nullcontext
+import pandas as pd
+from sqlalchemy import text
+import logging
+from src.database.data_version import bump_data_version
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+UPSERT_ACTIVITY_QUERY = """
+INSERT INTO user_month_activity (user_id, month, completed)
+SELECT *
+FROM unnest(CAST(:user_ids AS uuid[]), CAST(:months AS date[]), CAST(:completed AS boolean[]))
+ON CONFLICT (user_id, month) DO UPDATE
+SET completed = user_month_activity.completed OR EXCLUDED.completed
+"""
+
+REBUILD_ACTIVITY_QUERY = """
+INSERT INTO user_month_activity (user_id, month, completed)
+SELECT user_id, DATE_TRUNC('month', order_date)::date, BOOL_OR(status = 'completed')
+FROM orders
+GROUP BY 1, 2
+"""
+
+
+class UserActivityTracker:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def track_load(self, df: pd.DataFrame, table_name: str, conn=None) -> int:
+        """
+        Upsert the user-months a freshly loaded orders frame touches
+
+        With conn, the upsert joins the caller's transaction (the load's), so
+        it commits or rolls back together with the rows.
+
+        Returns:
+            int: Number of (user, month) rows upserted (0 for other tables)
+        """
+        if table_name != 'orders' or not {'user_id', 'order_date'} <= set(df.columns):
+            return 0
+        frame = pd.DataFrame({
+            'user_id': df['user_id'].astype(str),
+            'month': pd.to_datetime(df['order_date']).dt.to_period('M').dt.start_time.dt.date,
+            'completed': (df['status'] == 'completed') if 'status' in df.columns else False,
+        }).dropna(subset=['month'])
+        months = frame.groupby(['user_id', 'month'], sort=False)['completed'].any().reset_index()
+        if months.empty:
+            return 0
+        owned = conn is None
+        with self.engine.begin() if owned else nullcontext(conn) as conn:
+            conn.execute(text(UPSERT_ACTIVITY_QUERY), {
+                'user_ids': months['user_id'].tolist(),
+                'months': months['month'].tolist(),
+                'completed': months['completed'].astype(bool).tolist(),
+            })
+            if owned:
+                bump_data_version(conn, 'user_month_activity')
+        return len(months)
+
+    def rebuild(self) -> int:
+        """Recompute the whole table from orders (one pass)"""
+        with self.engine.begin() as conn:
+            conn.execute(text("TRUNCATE user_month_activity"))
+            rows = conn.execute(text(REBUILD_ACTIVITY_QUERY)).rowcount
+            bump_data_version(conn, 'user_month_activity')
+        logger.info(f"✅ Rebuilt user_month_activity ({rows:,} user-months)")
+        return rows
@@ -0,0 +1,344 @@
+# src/database/aggregate_navigator.py
+"""
+Aggregate navigator: answer metric requests from the cheapest exact source.
+
+Callers ask for measures by dimensions, time grain and date range; the
+navigator routes each measure to the coarsest pre-aggregate that answers it
+exactly, falling back to the raw tables only when none can:
+
+    weekly_kpis                  week grain, all statuses (weekly DAG)
+    daily_kpis                   day grain, all statuses (materialized view, only when fresh)
+    daily_sales_rollup           day x status x shipping_country x acquisition_channel
+    daily_category_sales_rollup  ... x category (revenue/orders only when category is grouped or filtered)
+    raw                          orders (+ users, order_items, products as needed)
+
+Additive measures (revenue, orders, units_sold) can be rolled up from any finer
+grain. Distinct counts (active_customers) are only exact at the source's own
+grain; weekly_kpis does not serve them, since rows written before the weekly
+DAG used whole-day bounds counted customers over a window shifted from the
+order totals. A pre-aggregate is skipped while the range has days waiting in
+rollup_dirty_days for any rollup it depends on (the rollups of the tables it
+reads, see src/database/rollups.py), and weekly_kpis only when it covers every
+requested week and was computed after the daily rollup last changed for that
+week. daily_kpis is only used when its last successful refresh started after
+the daily rollup last changed, since the loader's rollup refresh does not
+refresh the view.
+"""
+import time
+import pandas as pd
+from sqlalchemy import text
+import logging
+from src.database.rollups import ROLLUPS, TABLE_ROLLUPS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MEASURES = ('revenue', 'orders', 'aov', 'active_customers', 'units_sold')
+DIMENSIONS = ('status', 'shipping_country', 'acquisition_channel', 'category')
+GRAINS = (None, 'day', 'week', 'month')
+
+# Not additive across rows: only exact when each output row is one source row
+DISTINCT_MEASURES = {'active_customers'}
+
+# Returned as integers
+COUNT_MEASURES = ('orders', 'active_customers', 'units_sold')
+
+# Coarsest first; 'reads' lists the tables a source is computed from
+AGGREGATE_SOURCES = [
+    {
+        'name': 'weekly_kpis',
+        'date_column': 'week_start',
+        'grain': 'week',
+        'reads': ('daily_sales_rollup', 'orders'),
+        'dimensions': (),
+        'measures': {'revenue': 'SUM(total_revenue)', 'orders': 'SUM(total_orders)'},
+    },
+    {
+        'name': 'daily_kpis',
+        'date_column': 'date',
+        'grain': 'day',
+        'matview': True,
+        'reads': ('orders',),
+        'dimensions': (),
+        'measures': {'revenue': 'SUM(total_revenue)', 'orders': 'SUM(total_orders)',
+                     'active_customers': 'SUM(active_customers)'},
+    },
+    {
+        'name': 'daily_sales_rollup',
+        'date_column': 'day',
+        'grain': 'day',
+        'reads': ('daily_sales_rollup',),
+        'dimensions': ('status', 'shipping_country', 'acquisition_channel'),
+        'measures': {'revenue': 'SUM(revenue)', 'orders': 'SUM(order_count)'},
+    },
+    {
+        'name': 'daily_category_sales_rollup',
+        'date_column': 'day',
+        'grain': 'day',
+        'reads': ('daily_category_sales_rollup',),
+        'dimensions': ('category', 'status', 'shipping_country', 'acquisition_channel'),
+        'measures': {'revenue': 'SUM(item_revenue)', 'orders': 'SUM(order_count)',
+                     'units_sold': 'SUM(units_sold)'},
+        # Item revenue and per-category order counts only match orders per category
+        'requires': {'revenue': 'category', 'orders': 'category'},
+    },
+]
+
+RAW_DIMENSIONS = {
+    'status': 'o.status',
+    'shipping_country': 'o.shipping_country',
+    'acquisition_channel': 'u.acquisition_channel',
+    'category': 'p.category',
+}
+
+PENDING_ROLLUPS_QUERY = """
+SELECT DISTINCT rollup FROM rollup_dirty_days
+WHERE (CAST(:start_date AS date) IS NULL OR day >= :start_date)
+AND (CAST(:end_date AS date) IS NULL OR day <= :end_date)
+"""
+
+WEEKLY_COVERAGE_QUERY = """
+SELECT COUNT(*) AS weeks,
+       COALESCE(BOOL_AND(w.updated_at >= COALESCE(
+           (SELECT MAX(r.refreshed_at) FROM daily_sales_rollup r
+            WHERE r.day >= w.week_start AND r.day < w.week_start + 7),
+           w.updated_at)), FALSE) AS fresh
+FROM weekly_kpis w
+WHERE w.week_start BETWEEN :start_date AND :end_date
+"""
+
+# A view refresh that started after the rollup's last change saw every row the rollup did
+MATVIEW_FRESH_QUERY = """
+SELECT COALESCE(
+    (SELECT MAX(started_at) FROM materialized_view_refreshes
+     WHERE view_name = :view_name AND status = 'success')
+    >= COALESCE((SELECT MAX(refreshed_at) FROM daily_sales_rollup), '-infinity'::timestamp),
+    FALSE)
+"""
+
+
+def source_rollups(source: dict) -> set:
+    """Rollups whose pending days make a source stale (owning its tables or fed by them)"""
+    rollups = set()
+    for table in source['reads']:
+        rollups.update(name for name, spec in ROLLUPS.items() if table in spec['tables'])
+        rollups.update(TABLE_ROLLUPS.get(table, []))
+    return rollups
+
+
+class AggregateNavigator:
+    def __init__(self, engine):
+        self.engine = engine
+        self.decisions = []
+
+    # ---------- routing ----------
+
+    def _weekly_usable(self, conn, start_date, end_date) -> bool:
+        """weekly_kpis must exist, cover every whole week in the range and be fresh"""
+        if start_date is None or end_date is None:
+            return False
+        if start_date.weekday() != 0 or end_date.weekday() != 6:
+            return False
+        if conn.execute(text("SELECT to_regclass('weekly_kpis')")).scalar() is None:
+            return False
+        row = conn.execute(text(WEEKLY_COVERAGE_QUERY), {'start_date': start_date, 'end_date': end_date}).one()
+        expected_weeks = ((end_date - start_date).days + 1) // 7
+        return row.weeks == expected_weeks and bool(row.fresh)
+
+    def _matview_fresh(self, conn, view_name: str) -> bool:
+        """A materialized view must have been refreshed since the daily rollup last changed"""
+        return bool(conn.execute(text(MATVIEW_FRESH_QUERY), {'view_name': view_name}).scalar())
+
+    def _answers(self, source: dict, measure: str, used_dims: set, grain: str) -> bool:
+        """Whether a source answers one measure exactly for this request"""
+        if measure not in source['measures']:
+            return False
+        if not used_dims <= set(source['dimensions']):
+            return False
+        required = source.get('requires', {}).get(measure)
+        if required and required not in used_dims:
+            return False
+        if source['grain'] == 'week' and grain not in ('week', None):
+            return False
+        if measure in DISTINCT_MEASURES and (grain != source['grain'] or source['dimensions']):
+            return False
+        return True
+
+    def plan(self, measures: list, dimensions: list = None, grain: str = None,
+             start_date=None, end_date=None, filters: dict = None) -> dict:
+        """
+        Pick a source per measure
+
+        Returns:
+            dict: source name -> list of base measures it answers ('raw' for the fallback)
+        """
+        dimensions, filters = list(dimensions or []), dict(filters or {})
+        self._validate(measures, dimensions, grain, filters)
+        used_dims = set(dimensions) | set(filters)
+        base = []
+        for measure in measures:
+            for needed in (['revenue', 'orders'] if measure == 'aov' else [measure]):
+                if needed not in base:
+                    base.append(needed)
+
+        with self.engine.connect() as conn:
+            pending = set(conn.execute(text(PENDING_ROLLUPS_QUERY),
+                                       {'start_date': start_date, 'end_date': end_date}).scalars())
+            candidates = []
+            for source in AGGREGATE_SOURCES:
+                if source_rollups(source) & pending:
+                    continue
+                if source['grain'] == 'week' and not self._weekly_usable(conn, start_date, end_date):
+                    continue
+                if source.get('matview') and not self._matview_fresh(conn, source['name']):
+                    continue
+                candidates.append(source)
+
+        plan = {}
+        for measure in base:
+            source = next((s['name'] for s in candidates if self._answers(s, measure, used_dims, grain)), 'raw')
+            plan.setdefault(source, []).append(measure)
+        # revenue and orders must come from the same source for aov
+        if 'aov' in measures and len({s for s, ms in plan.items() if {'revenue', 'orders'} & set(ms)}) > 1:
+            for source in list(plan):
+                plan[source] = [m for m in plan[source] if m not in ('revenue', 'orders')]
+                if not plan[source]:
+                    del plan[source]
+            plan.setdefault('raw', []).extend(['revenue', 'orders'])
+        return plan
+
+    def _validate(self, measures, dimensions, grain, filters):
+        unknown = [m for m in measures if m not in MEASURES]
+        unknown += [d for d in list(dimensions) + list(filters) if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown measures/dimensions: {unknown}")
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown grain '{grain}', expected one of {GRAINS}")
+
+    # ---------- SQL ----------
+
+    def _aggregate_sql(self, source: dict, measures: list, dimensions: list, grain: str, filters: dict) -> str:
+        date_column = source['date_column']
+        select, group = [], []
+        if grain:
+            select.append(f"DATE_TRUNC('{grain}', {date_column})::date AS period")
+            group.append('period')
+        select += dimensions
+        group += dimensions
+        select += [f"{source['measures'][m]} AS {m}" for m in measures]
+        where = ["(CAST(:start_date AS date) IS NULL OR {0} >= :start_date)".format(date_column),
+                 "(CAST(:end_date AS date) IS NULL OR {0} <= :end_date)".format(date_column)]
+        where += [f"{dim} = :filter_{dim}" for dim in filters]
+        sql = f"SELECT {', '.join(select)} FROM {source['name']} WHERE {' AND '.join(where)}"
+        return sql + (f" GROUP BY {', '.join(group)}" if group else "")
+
+    def _raw_sql(self, measures: list, dimensions: list, grain: str, filters: dict) -> str:
+        used = set(dimensions) | set(filters)
+        items = 'category' in used
+        measure_sql = {
+            'revenue': 'SUM(oi.quantity * oi.price_at_time)' if items else 'SUM(o.total_amount)',
+            'orders': 'COUNT(DISTINCT o.order_id)',
+            'active_customers': 'COUNT(DISTINCT o.user_id)',
+            'units_sold': 'SUM(oi.quantity)' if items else 'SUM(ou.units)',
+        }
+        select, group = [], []
+        if grain:
+            select.append(f"DATE_TRUNC('{grain}', o.order_date)::date AS period")
+            group.append('period')
+        select += [f"{RAW_DIMENSIONS[d]} AS {d}" for d in dimensions]
+        group += dimensions
+        select += [f"{measure_sql[m]} AS {m}" for m in measures]
+
+        joins = ""
+        if 'acquisition_channel' in used:
+            joins += " LEFT JOIN users u ON u.user_id = o.user_id"
+        if items:
+            joins += " JOIN order_items oi ON oi.order_id = o.order_id LEFT JOIN products p ON p.product_id = oi.product_id"
+        elif 'units_sold' in measures:
+            # Per-order units, so order-level measures are not multiplied by items
+            joins += (" LEFT JOIN (SELECT order_id, SUM(quantity) AS units FROM order_items GROUP BY order_id) ou"
+                      " ON ou.order_id = o.order_id")
+        # Ranges on order_date (not DATE(order_date)) keep partition pruning and index use
+        where = ["(CAST(:start_date AS date) IS NULL OR o.order_date >= :start_date)",
+                 "(CAST(:end_date AS date) IS NULL OR o.order_date < CAST(:end_date AS date) + 1)"]
+        where += [f"{RAW_DIMENSIONS[d]} = :filter_{d}" for d in filters]
+        sql = f"SELECT {', '.join(select)} FROM orders o{joins} WHERE {' AND '.join(where)}"
+        return sql + (f" GROUP BY {', '.join(group)}" if group else "")
+
+    # ---------- execution ----------
+
+    def query(self, measures: list, dimensions: list = None, grain: str = None,
+              start_date=None, end_date=None, filters: dict = None) -> pd.DataFrame:
+        """
+        Compute measures by dimensions over an inclusive date range
+
+        Args:
+            measures: Any of revenue, orders, aov, active_customers, units_sold
+            dimensions: Group-by dimensions (status, shipping_country, acquisition_channel, category)
+            grain: None (one total), 'day', 'week' or 'month' (adds a 'period' column)
+            start_date: First day (date/datetime; None = unbounded)
+            end_date: Last day, inclusive (None = unbounded)
+            filters: dimension -> value equality filters
+
+        Returns:
+            pd.DataFrame: period (if grain), dimensions, then the requested measures
+        """
+        dimensions, filters = list(dimensions or []), dict(filters or {})
+        start_date = pd.Timestamp(start_date).date() if start_date is not None else None
+        end_date = pd.Timestamp(end_date).date() if end_date is not None else None
+        plan = self.plan(measures, dimensions, grain, start_date, end_date, filters)
+
+        params = {'start_date': start_date, 'end_date': end_date}
+        params.update({f"filter_{dim}": value for dim, value in filters.items()})
+        keys = (['period'] if grain else []) + dimensions
+
+        result = None
+        for source_name, source_measures in plan.items():
+            if source_name == 'raw':
+                sql = self._raw_sql(source_measures, dimensions, grain, filters)
+            else:
+                source = next(s for s in AGGREGATE_SOURCES if s['name'] == source_name)
+                sql = self._aggregate_sql(source, source_measures, dimensions, grain, filters)
+
+            start = time.perf_counter()
+            with self.engine.connect() as conn:
+                rows = conn.execute(text(sql), params)
+                df = pd.DataFrame(rows.fetchall(), columns=list(rows.keys()))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._log_decision(source_name, source_measures, dimensions, grain, filters, elapsed_ms)
+
+            for measure in source_measures:
+                df[measure] = pd.to_numeric(df[measure]).astype('float64')
+            if result is None:
+                result = df
+            elif keys:
+                result = result.merge(df, on=keys, how='outer')
+            else:
+                result = pd.concat([result, df], axis=1)
+
+        for measure in MEASURES:
+            if measure in result.columns:
+                result[measure] = result[measure].fillna(0)
+                if measure in COUNT_MEASURES:
+                    result[measure] = result[measure].round().astype('int64')
+        if 'aov' in measures:
+            result['aov'] = (result['revenue'] / result['orders'].replace(0, float('nan'))).fillna(0)
+        if grain:
+            result['period'] = pd.to_datetime(result['period'])
+        if keys:
+            result = result.sort_values(keys).reset_index(drop=True)
+        return result[keys + list(measures)]
+
+    def _log_decision(self, source: str, measures: list, dimensions: list, grain: str, filters: dict,
+                      elapsed_ms: float):
+        decision = {
+            'source': source,
+            'measures': list(measures),
+            'dimensions': list(dimensions),
+            'grain': grain,
+            'filters': sorted(filters),
+            'ms': round(elapsed_ms, 1),
+        }
+        self.decisions.append(decision)
+        logger.info(f"🧭 {','.join(measures)} by {','.join(dimensions) or '-'} @ {grain or 'total'}"
+                    f" -> {source} ({elapsed_ms:.0f} ms)")
@@ -0,0 +1,121 @@
+# src/database/batch_executor.py
+"""
+Concurrent executor for batches of independent queries.
+
+Reports, checks and dashboards that issue several independent queries run them
+on separate pooled connections at the same time, so the batch takes about as
+long as its slowest query. Each query runs in its own transaction with
+statement_timeout set to the batch timeout, so the server cancels anything
+still running when the batch gives up.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION, ALL_COMPLETED
+from sqlalchemy import text
+import logging
+from src.database.query_catalog import QueryCatalog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default pool is 5 connections + 10 overflow; stay inside the pool
+DEFAULT_MAX_WORKERS = 5
+DEFAULT_TIMEOUT = 120
+
+
+class BatchQueryExecutor:
+    def __init__(self, engine, max_workers: int = DEFAULT_MAX_WORKERS, timeout: float = DEFAULT_TIMEOUT,
+                 catalog: QueryCatalog = None):
+        self.engine = engine
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.catalog = catalog or QueryCatalog(engine)
+        self.last_timings = {}
+
+    def run_tasks(self, tasks: dict, max_workers: int = None, timeout: float = None,
+                  raise_errors: bool = True) -> dict:
+        """
+        Run independent callables concurrently
+
+        Args:
+            tasks: name -> zero-argument callable
+            max_workers: Concurrency limit for this batch
+            timeout: Seconds to wait for the whole batch
+            raise_errors: Raise the first failure (otherwise failed names are left out)
+
+        Returns:
+            dict: name -> return value
+        """
+        timeout = timeout or self.timeout
+        workers = min(max_workers or self.max_workers, len(tasks)) or 1
+        results = {}
+        timings = {}
+
+        def timed(name, task):
+            start = time.perf_counter()
+            try:
+                return task()
+            finally:
+                timings[name] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch-query')
+        try:
+            futures = {executor.submit(timed, name, task): name for name, task in tasks.items()}
+            done, pending = wait(futures, timeout=timeout,
+                                 return_when=FIRST_EXCEPTION if raise_errors else ALL_COMPLETED)
+
+            for future in done:
+                name = futures[future]
+                error = future.exception()
+                if error is None:
+                    results[name] = future.result()
+                elif raise_errors:
+                    raise error
+                else:
+                    logger.error(f"❌ Batch query {name} failed: {error}")
+
+            if pending:
+                for future in pending:
+                    future.cancel()
+                names = sorted(futures[future] for future in pending)
+                message = f"Batch timed out after {timeout}s; unfinished: {names}"
+                if raise_errors:
+                    raise TimeoutError(message)
+                logger.error(f"❌ {message}")
+        finally:
+            # Don't block on work that timed out; statement_timeout ends it server-side
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.last_timings = timings
+
+        logger.info(f"✅ Ran {len(results)}/{len(tasks)} batch tasks in "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms with {workers} workers")
+        return results
+
+    def _execute(self, name: str, params: dict, timeout: float):
+        with self.engine.connect() as conn:
+            # SET LOCAL only lasts for this transaction, so the pooled connection is unaffected
+            conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+            df = self.catalog.execute(name, params, conn=conn)
+            conn.rollback()
+        return df
+
+    def run(self, queries: dict, max_workers: int = None, timeout: float = None,
+            raise_errors: bool = True) -> dict:
+        """
+        Run catalog queries concurrently
+
+        Args:
+            queries: result name -> catalog query name, or (catalog query name, params)
+            max_workers: Concurrency limit for this batch
+            timeout: Seconds for the whole batch (also each query's statement_timeout)
+            raise_errors: Raise the first failure (otherwise failed names are left out)
+
+        Returns:
+            dict: result name -> pd.DataFrame
+        """
+        timeout = timeout or self.timeout
+        tasks = {}
+        for result_name, query in queries.items():
+            query_name, params = (query, None) if isinstance(query, str) else query
+            tasks[result_name] = (lambda q=query_name, p=params: self._execute(q, p, timeout))
+        return self.run_tasks(tasks, max_workers=max_workers, timeout=timeout, raise_errors=raise_errors)
@@ -0,0 +1,53 @@
+# src/database/data_version.py
+"""
+Data version stamp.
+
+data_version holds a single counter that every write path bumps inside its own
+transaction (loads, truncates, rollup/activity/materialized view refreshes), so
+a committed change and its new version become visible together. Readers that
+read the version before computing can therefore cache results under it: an
+entry stored under version v never predates a change that v already covers.
+"""
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUMP_DATA_VERSION_QUERY = """
+UPDATE data_version
+SET version = version + 1, source = :source, updated_at = CURRENT_TIMESTAMP
+WHERE id = 1
+RETURNING version
+"""
+
+# Same statement for driver-level (psycopg2 cursor) transactions
+BUMP_DATA_VERSION_PYFORMAT = BUMP_DATA_VERSION_QUERY.replace(':source', '%(source)s')
+
+CURRENT_DATA_VERSION_QUERY = """
+SELECT version FROM data_version WHERE id = 1
+"""
+
+
+def bump_data_version(conn, source: str) -> int:
+    """
+    Bump the version inside the caller's transaction
+
+    Args:
+        conn: SQLAlchemy connection with the write's transaction open
+        source: What changed (table or refresh name), kept for diagnostics
+
+    Returns:
+        int: The new version
+    """
+    return conn.execute(text(BUMP_DATA_VERSION_QUERY), {'source': source}).scalar()
+
+
+def current_data_version(engine) -> int:
+    """Current version, or None when data_version does not exist (nothing is cacheable)"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text(CURRENT_DATA_VERSION_QUERY)).scalar()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read data version: {e}")
+        return None
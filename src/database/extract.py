@@ -0,0 +1,189 @@
+# src/database/extract.py
+"""
+Typed bulk extraction with COPY ... TO STDOUT.
+
+pd.read_sql_query builds every row as Python objects (Decimal, datetime, UUID)
+before pandas converts them column by column. CopyExtractor instead streams
+COPY (query) TO STDOUT as CSV through a pipe straight into pandas' C parser,
+with a dtype per column taken from the result description:
+
+    integer types      int64 (nullable Int64)
+    numeric/decimal    float64, or scaled int64 (value * 10^scale, rounded server-side)
+    real/double        float64
+    timestamp(tz)/date datetime64 (ISO-8601 fast path)
+    boolean            bool
+    uuid/text/other    str
+
+Nothing is materialized as per-row Python objects and the CSV text is never
+held in memory as a whole.
+"""
+import os
+import re
+import threading
+import pandas as pd
+import logging
+from src.database.query_catalog import QUERIES, pyformat_query
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DECIMAL_MODES = ('float', 'scaled')
+
+# PostgreSQL type OIDs from cursor.description
+INT_OIDS = {20, 21, 23}
+FLOAT_OIDS = {700, 701}
+NUMERIC_OID = 1700
+BOOL_OID = 16
+DATE_OID = 1082
+TIMESTAMP_OID = 1114
+TIMESTAMPTZ_OID = 1184
+
+# Distinguishes NULL from the empty string in CSV COPY output
+NULL_MARKER = '\\N'
+
+_IDENT_RE = re.compile(r'"')
+
+
+def _quote(column: str) -> str:
+    return '"' + _IDENT_RE.sub('""', column) + '"'
+
+
+class CopyExtractor:
+    def __init__(self, engine, decimals: str = 'float'):
+        if decimals not in DECIMAL_MODES:
+            raise ValueError(f"Unknown decimal mode '{decimals}', expected one of {DECIMAL_MODES}")
+        self.engine = engine
+        self.decimals = decimals
+
+    def _describe(self, cursor, sql: str) -> list:
+        """Result columns as [(name, type_oid, scale), ...] without fetching rows"""
+        cursor.execute(f"SELECT * FROM ({sql}) _q LIMIT 0")
+        return [(col.name, col.type_code, col.scale) for col in cursor.description]
+
+    def _plan(self, columns: list, decimals: str) -> tuple:
+        """Outer select list and post-parse conversions for the COPY query"""
+        select, dtypes, converters = [], {}, {}
+        for name, oid, scale in columns:
+            quoted = _quote(name)
+            if oid == NUMERIC_OID and decimals == 'scaled' and scale is not None and scale >= 0:
+                # Exact numeric multiply; rounding happens before the cast
+                select.append(f"ROUND({quoted} * {10 ** scale})::bigint AS {quoted}")
+                dtypes[name] = 'Int64'
+            elif oid == NUMERIC_OID or oid in FLOAT_OIDS:
+                select.append(quoted)
+                dtypes[name] = 'float64'
+            elif oid in INT_OIDS:
+                select.append(quoted)
+                dtypes[name] = 'Int64'
+            elif oid in (DATE_OID, TIMESTAMP_OID, TIMESTAMPTZ_OID):
+                select.append(quoted)
+                dtypes[name] = str
+                converters[name] = oid
+            elif oid == BOOL_OID:
+                select.append(quoted)
+                dtypes[name] = str
+                converters[name] = oid
+            else:
+                select.append(quoted)
+                dtypes[name] = str
+        return ', '.join(select), dtypes, converters
+
+    def _convert(self, df: pd.DataFrame, converters: dict) -> pd.DataFrame:
+        for name, oid in converters.items():
+            if oid == BOOL_OID:
+                df[name] = df[name].map({'t': True, 'f': False})
+            elif oid == DATE_OID:
+                df[name] = pd.to_datetime(df[name], format='%Y-%m-%d')
+            else:
+                df[name] = pd.to_datetime(df[name], format='ISO8601', utc=(oid == TIMESTAMPTZ_OID))
+        # Integer columns without NULLs become plain int64
+        for name in df.columns:
+            if str(df[name].dtype) == 'Int64' and not df[name].hasnans:
+                df[name] = df[name].astype('int64')
+        return df
+
+    def _stream_copy(self, raw_conn, copy_sql: str, consume):
+        """Run COPY TO STDOUT in a thread writing into a pipe that consume(file) reads"""
+        read_fd, write_fd = os.pipe()
+        errors = []
+
+        def produce():
+            try:
+                with os.fdopen(write_fd, 'wb') as out, raw_conn.cursor() as cur:
+                    cur.copy_expert(copy_sql, out)
+            except Exception as e:
+                errors.append(e)
+
+        producer = threading.Thread(target=produce, name='copy-extract', daemon=True)
+        producer.start()
+        try:
+            with os.fdopen(read_fd, 'rb') as stream:
+                result = consume(stream)
+        except Exception:
+            producer.join()
+            # A failed COPY surfaces as a parse error on an empty/truncated stream;
+            # a failed parse surfaces as a broken pipe in the producer
+            if errors and not isinstance(errors[0], BrokenPipeError):
+                raise errors[0]
+            raise
+        producer.join()
+        if errors:
+            raise errors[0]
+        return result
+
+    def extract(self, sql: str, params: dict = None, decimals: str = None) -> pd.DataFrame:
+        """
+        Run a query through COPY and return a typed DataFrame
+
+        Args:
+            sql: SELECT query (psycopg2 %(name)s placeholders)
+            params: Values for the placeholders
+            decimals: 'float' (float64) or 'scaled' (int64 of value * 10^scale)
+
+        Returns:
+            pd.DataFrame: One typed column per result column
+        """
+        decimals = decimals or self.decimals
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cur:
+                # COPY takes no bind parameters, so values are rendered by the driver
+                sql = cur.mogrify(sql.strip().rstrip(';'), params).decode()
+                columns = self._describe(cur, sql)
+            select, dtypes, converters = self._plan(columns, decimals)
+            copy_sql = (f"COPY (SELECT {select} FROM ({sql}) _q) TO STDOUT "
+                        f"WITH (FORMAT csv, HEADER, NULL '{NULL_MARKER}')")
+            df = self._stream_copy(raw_conn, copy_sql, lambda stream: pd.read_csv(
+                stream, dtype=dtypes, na_values=[NULL_MARKER], keep_default_na=False
+            ))
+            raw_conn.commit()
+        finally:
+            raw_conn.close()
+        return self._convert(df, converters)
+
+    def extract_query(self, name: str, params: dict = None, decimals: str = None) -> pd.DataFrame:
+        """extract() for a named catalog query (parameters checked and typed by the catalog)"""
+        sql, bound = pyformat_query(name, params)
+        df = self.extract(sql, bound, decimals)
+        spec = QUERIES[name]
+        if spec['columns'] is not None and list(df.columns) != spec['columns']:
+            raise ValueError(f"Query '{name}' returned columns {list(df.columns)}, expected {spec['columns']}")
+        return df
+
+    def copy_to_file(self, sql: str, path: str, params: dict = None) -> int:
+        """
+        Write a query's result straight to a CSV file with a header (no DataFrame)
+
+        Returns:
+            int: Rows written
+        """
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cur, open(path, 'wb') as out:
+                sql = cur.mogrify(sql.strip().rstrip(';'), params).decode()
+                cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+                rows = cur.rowcount
+            raw_conn.commit()
+        finally:
+            raw_conn.close()
+        return rows
@@ -0,0 +1,157 @@
+# src/database/indexes.py
+"""
+Managed analytics index pack.
+
+Indexes matched to the query shapes the platform actually runs:
+
+    idx_orders_completed_date          partial (status = 'completed') covering index on
+                                       order_date INCLUDE (total_amount, user_id), so
+                                       completed-revenue range queries are index-only scans
+    idx_events_timestamp_brin          BRIN on the append-only events timestamp
+                                       (a few pages instead of a full B-tree)
+    idx_order_items_product_covering   order_items(product_id) INCLUDE (quantity, price_at_time)
+                                       for per-product/category sales
+
+On partitioned tables the index is created ON ONLY the parent, built
+CONCURRENTLY on each partition and attached, so no partition is locked against
+writes while it builds. Partitions created later inherit the parent index.
+"""
+from sqlalchemy import text
+import logging
+from src.database.partitions import PartitionManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# name -> table, index body (after "ON <table>") and the plain B-trees it supersedes
+INDEX_PACK = {
+    'idx_orders_completed_date': {
+        'table': 'orders',
+        'definition': "(order_date) INCLUDE (total_amount, user_id) WHERE status = 'completed'",
+        'replaces': {},
+    },
+    'idx_events_timestamp_brin': {
+        'table': 'events',
+        'definition': "USING brin (timestamp) WITH (pages_per_range = 32)",
+        'replaces': {'idx_events_timestamp': '(timestamp)'},
+    },
+    'idx_order_items_product_covering': {
+        'table': 'order_items',
+        'definition': "(product_id) INCLUDE (quantity, price_at_time)",
+        'replaces': {'idx_order_items_product_id': '(product_id)'},
+    },
+}
+
+INDEX_EXISTS_QUERY = """
+SELECT EXISTS (
+    SELECT 1 FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema() AND c.relname = :index_name
+)
+"""
+
+INDEX_STATUS_QUERY = """
+SELECT c.relname AS index_name, t.relname AS table_name,
+       -- partitioned indexes have no storage; sum their partition indexes
+       COALESCE((SELECT SUM(pg_relation_size(inh.inhrelid)) FROM pg_inherits inh WHERE inh.inhparent = c.oid),
+                pg_relation_size(c.oid))::bigint AS bytes,
+       ix.indisvalid AS is_valid
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_index ix ON ix.indexrelid = c.oid
+JOIN pg_class t ON t.oid = ix.indrelid
+WHERE n.nspname = current_schema() AND c.relname = ANY(:names)
+"""
+
+
+def _partition_index_name(index_name: str, partition: str) -> str:
+    # Keep within PostgreSQL's 63-byte identifier limit
+    return f"{partition}_{index_name[4:]}"[:63]
+
+
+class IndexManager:
+    def __init__(self, engine):
+        self.engine = engine
+        self.partitions = PartitionManager(engine)
+
+    def _exists(self, conn, index_name: str) -> bool:
+        return bool(conn.execute(text(INDEX_EXISTS_QUERY), {'index_name': index_name}).scalar())
+
+    def _create_index(self, index_name: str, table_name: str, definition: str, concurrently: bool):
+        """
+        Create one index, per partition + ATTACH when the table is partitioned
+
+        Returns:
+            bool: Whether the (parent) index was created by this call
+        """
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            exists = self._exists(conn, index_name)
+            keyword = "CONCURRENTLY " if concurrently else ""
+            if not self.partitions.is_partitioned(table_name):
+                if not exists:
+                    conn.execute(text(f"CREATE INDEX {keyword}{index_name} ON {table_name} {definition}"))
+                return not exists
+
+            # The parent index stays invalid until every partition has one attached,
+            # so an interrupted build is finished on the next call
+            if not exists:
+                conn.execute(text(f"CREATE INDEX {index_name} ON ONLY {table_name} {definition}"))
+            for partition in self.partitions.list_partitions(table_name):
+                child_index = _partition_index_name(index_name, partition['name'])
+                if not self._exists(conn, child_index):
+                    conn.execute(text(f"CREATE INDEX {keyword}{child_index} ON {partition['name']} {definition}"))
+                conn.execute(text(f"ALTER INDEX {index_name} ATTACH PARTITION {child_index}"))
+            return not exists
+
+    def ensure_indexes(self, concurrently: bool = True, drop_replaced: bool = True) -> list:
+        """
+        Create every missing index in the pack
+
+        Args:
+            concurrently: Build without blocking writes
+            drop_replaced: Drop the single-column B-trees each index supersedes
+
+        Returns:
+            list: Names of indexes created
+        """
+        created = []
+        for index_name, spec in INDEX_PACK.items():
+            if self._create_index(index_name, spec['table'], spec['definition'], concurrently):
+                created.append(index_name)
+                logger.info(f"✅ Created {index_name} on {spec['table']}")
+                # Index-only scans need an up-to-date visibility map
+                with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    conn.execute(text(f"VACUUM (ANALYZE) {spec['table']}"))
+
+            if drop_replaced:
+                with self.engine.begin() as conn:
+                    for old_index in spec['replaces']:
+                        conn.execute(text(f"DROP INDEX IF EXISTS {old_index}"))
+        return created
+
+    def drop_indexes(self, restore_replaced: bool = True) -> list:
+        """
+        Remove the pack (e.g. to benchmark the baseline), restoring the B-trees it replaced
+
+        Returns:
+            list: Names of indexes dropped
+        """
+        dropped = []
+        with self.engine.begin() as conn:
+            for index_name, spec in INDEX_PACK.items():
+                if self._exists(conn, index_name):
+                    # Dropping the parent index drops its attached partition indexes
+                    conn.execute(text(f"DROP INDEX {index_name}"))
+                    dropped.append(index_name)
+                if restore_replaced:
+                    for old_index, definition in spec['replaces'].items():
+                        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {old_index} ON {spec['table']} {definition}"))
+        logger.info(f"Dropped {len(dropped)} pack indexes")
+        return dropped
+
+    def get_status(self) -> list:
+        """Size and validity of every pack index: [{'index_name', 'table_name', 'bytes', 'is_valid'}, ...]"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(INDEX_STATUS_QUERY), {'names': list(INDEX_PACK)}).mappings().all()
+        return [dict(row) for row in rows]
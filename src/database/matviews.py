@@ -0,0 +1,125 @@
+# src/database/matviews.py
+"""
+Refresh manager for the KPI materialized views.
+
+Views are refreshed CONCURRENTLY (readers are never blocked; needs a unique
+index) once they have been populated, and plainly the first time. Every refresh
+is recorded in materialized_view_refreshes so duration and staleness can be
+reported.
+"""
+import time
+from sqlalchemy import text
+import logging
+from src.database.data_version import bump_data_version
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Refreshed in this order after each load
+MATERIALIZED_VIEWS = ['daily_kpis', 'customer_lifetime_value']
+
+IS_POPULATED_QUERY = """
+SELECT ispopulated FROM pg_matviews
+WHERE schemaname = current_schema() AND matviewname = :view_name
+"""
+
+LOG_REFRESH_QUERY = """
+INSERT INTO materialized_view_refreshes
+    (view_name, started_at, finished_at, duration_ms, concurrent, status, error)
+VALUES (:view_name, LOCALTIMESTAMP - make_interval(secs => :duration_ms / 1000.0), LOCALTIMESTAMP,
+        :duration_ms, :concurrent, :status, :error)
+"""
+
+REFRESH_STATUS_QUERY = """
+SELECT DISTINCT ON (view_name)
+    view_name,
+    finished_at AS last_refreshed_at,
+    duration_ms AS last_duration_ms,
+    EXTRACT(EPOCH FROM (LOCALTIMESTAMP - finished_at)) AS staleness_seconds
+FROM materialized_view_refreshes
+WHERE status = 'success'
+ORDER BY view_name, finished_at DESC
+"""
+
+
+class MaterializedViewManager:
+    def __init__(self, engine, views: list = None):
+        self.engine = engine
+        self.views = views or MATERIALIZED_VIEWS
+
+    def refresh(self, views: list = None, concurrently: bool = True) -> dict:
+        """
+        Refresh materialized views and record each refresh
+
+        Args:
+            views: Views to refresh (default: all KPI views)
+            concurrently: Use REFRESH ... CONCURRENTLY when the view is populated
+
+        Returns:
+            dict: view_name -> duration in ms (None if the refresh failed)
+        """
+        durations = {}
+        for view_name in views or self.views:
+            durations[view_name] = self._refresh_view(view_name, concurrently)
+        return durations
+
+    def _refresh_view(self, view_name: str, concurrently: bool):
+        start = time.perf_counter()
+        concurrent = False
+        error = None
+        try:
+            with self.engine.begin() as conn:
+                # CONCURRENTLY is rejected on a view that was never populated
+                concurrent = concurrently and bool(
+                    conn.execute(text(IS_POPULATED_QUERY), {'view_name': view_name}).scalar()
+                )
+                keyword = "CONCURRENTLY " if concurrent else ""
+                conn.execute(text(f"REFRESH MATERIALIZED VIEW {keyword}{view_name}"))
+                bump_data_version(conn, view_name)
+        except Exception as e:
+            error = str(e)
+            logger.error(f"❌ Failed to refresh {view_name}: {e}")
+
+        duration_ms = (time.perf_counter() - start) * 1000
+        self._log_refresh(view_name, duration_ms, concurrent, error)
+        if error is None:
+            logger.info(f"✅ Refreshed {view_name} in {duration_ms:.0f} ms" + (" (concurrently)" if concurrent else ""))
+            return duration_ms
+        return None
+
+    def _log_refresh(self, view_name: str, duration_ms: float, concurrent: bool, error: str):
+        # Timestamps come from the server clock so staleness never mixes time zones
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text(LOG_REFRESH_QUERY), {
+                    'view_name': view_name,
+                    'duration_ms': round(duration_ms, 1),
+                    'concurrent': concurrent,
+                    'status': 'success' if error is None else 'failed',
+                    'error': error
+                })
+        except Exception as e:
+            logger.warning(f"⚠️ Could not record refresh of {view_name}: {e}")
+
+    def get_status(self) -> list:
+        """
+        Last successful refresh per view
+
+        Returns:
+            list: [{'view_name', 'last_refreshed_at', 'last_duration_ms', 'staleness_seconds'}, ...]
+        """
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(REFRESH_STATUS_QUERY)).mappings().all()
+        status = {}
+        for row in rows:
+            status[row['view_name']] = {
+                'view_name': row['view_name'],
+                'last_refreshed_at': row['last_refreshed_at'],
+                'last_duration_ms': float(row['last_duration_ms']),
+                'staleness_seconds': float(row['staleness_seconds'])
+            }
+        return [
+            status.get(view_name, {'view_name': view_name, 'last_refreshed_at': None,
+                                   'last_duration_ms': None, 'staleness_seconds': None})
+            for view_name in self.views
+        ]
@@ -0,0 +1,243 @@
+# src/database/partitions.py
+"""
+Monthly range partitions for the orders and events tables.
+
+Partitions are named <table>_pYYYY_MM and cover [first of month, first of next
+month). Retention drops (or detaches) whole partitions instead of running
+DELETEs, so it generates no per-row WAL and no bloat.
+"""
+import re
+import pandas as pd
+from datetime import datetime, date
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> partition key column
+PARTITIONED_TABLES = {
+    'orders': 'order_date',
+    'events': 'timestamp',
+}
+
+PARTITION_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+LIST_PARTITIONS_QUERY = """
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+JOIN pg_class p ON p.oid = i.inhparent
+JOIN pg_namespace n ON n.oid = p.relnamespace
+WHERE n.nspname = current_schema()
+AND p.relname = :table_name
+ORDER BY c.relname
+"""
+
+IS_PARTITIONED_QUERY = """
+SELECT EXISTS (
+    SELECT 1
+    FROM pg_partitioned_table pt
+    JOIN pg_class c ON c.oid = pt.partrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema()
+    AND c.relname = :table_name
+)
+"""
+
+
+def month_start(value) -> date:
+    """First day of the month containing value"""
+    value = pd.Timestamp(value)
+    return date(value.year, value.month, 1)
+
+
+def next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def partition_name(table_name: str, month: date) -> str:
+    return f"{table_name}_p{month.year:04d}_{month.month:02d}"
+
+
+class PartitionManager:
+    def __init__(self, engine):
+        self.engine = engine
+        self._known = {}
+        self._partitioned = {}
+
+    def is_partitioned(self, table_name: str) -> bool:
+        """Whether the table exists and is range partitioned (cached)"""
+        if table_name not in PARTITIONED_TABLES:
+            return False
+        if table_name not in self._partitioned:
+            with self.engine.connect() as conn:
+                self._partitioned[table_name] = bool(
+                    conn.execute(text(IS_PARTITIONED_QUERY), {'table_name': table_name}).scalar()
+                )
+        return self._partitioned[table_name]
+
+    def list_partitions(self, table_name: str) -> list:
+        """
+        List partitions of a table
+
+        Returns:
+            list: [{'name', 'start', 'end', 'is_default'}, ...] ordered by start
+        """
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(LIST_PARTITIONS_QUERY), {'table_name': table_name}).fetchall()
+
+        partitions = []
+        for name, bound in rows:
+            match = PARTITION_BOUND_RE.search(bound or '')
+            partitions.append({
+                'name': name,
+                'start': pd.Timestamp(match.group(1)).date() if match else None,
+                'end': pd.Timestamp(match.group(2)).date() if match else None,
+                'is_default': bound == 'DEFAULT'
+            })
+        partitions.sort(key=lambda p: (p['start'] is None, p['start'] or date.min))
+        self._known[table_name] = {p['name'] for p in partitions}
+        return partitions
+
+    def ensure_partitions(self, table_name: str, start, end) -> list:
+        """
+        Make sure a monthly partition exists for every month in [start, end]
+
+        Rows already sitting in the default partition for a new month are moved
+        into it, so late partition creation never fails on the default.
+
+        Returns:
+            list: Names of partitions created
+        """
+        key = PARTITIONED_TABLES[table_name]
+        if table_name not in self._known:
+            self.list_partitions(table_name)
+
+        created = []
+        month = month_start(start)
+        last = month_start(end)
+        while month <= last:
+            name = partition_name(table_name, month)
+            if name not in self._known[table_name]:
+                self._create_partition(table_name, key, name, month, next_month(month))
+                self._known[table_name].add(name)
+                created.append(name)
+            month = next_month(month)
+
+        if created:
+            logger.info(f"✅ Created {len(created)} partitions for {table_name}: {created[0]} .. {created[-1]}")
+        return created
+
+    def _create_partition(self, table_name: str, key: str, name: str, lower: date, upper: date):
+        bounds = {'lower': lower, 'upper': upper}
+        default_name = f"{table_name}_default"
+        with self.engine.begin() as conn:
+            stranded = conn.execute(
+                text(f'SELECT EXISTS (SELECT 1 FROM {default_name} WHERE "{key}" >= :lower AND "{key}" < :upper)'),
+                bounds
+            ).scalar()
+
+            if not stranded:
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} "
+                    f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+                ))
+                return
+
+            # Move the month's rows out of the default partition, then attach
+            conn.execute(text(f"CREATE TABLE {name} (LIKE {table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            conn.execute(text(
+                f'WITH moved AS (DELETE FROM {default_name} WHERE "{key}" >= :lower AND "{key}" < :upper RETURNING *) '
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ), bounds)
+            conn.execute(text(
+                f"ALTER TABLE {table_name} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            ))
+            logger.info(f"Moved {lower:%Y-%m} rows from {default_name} into {name}")
+
+    def ensure_future_partitions(self, months_ahead: int = 3) -> list:
+        """Create partitions from the current month through months_ahead for every table"""
+        today = datetime.now().date()
+        end = today
+        for _ in range(months_ahead):
+            end = next_month(month_start(end))
+        created = []
+        for table_name in PARTITIONED_TABLES:
+            created.extend(self.ensure_partitions(table_name, today, end))
+        return created
+
+    def route(self, df: pd.DataFrame, table_name: str) -> list:
+        """
+        Split a frame by partition, creating any missing partitions
+
+        Returns:
+            list: [(target_table, frame), ...]; unpartitioned tables and rows
+            without a partition key stay addressed to the parent table.
+        """
+        key = PARTITIONED_TABLES.get(table_name)
+        if key not in df.columns or not self.is_partitioned(table_name):
+            return [(table_name, df)]
+
+        keys = pd.to_datetime(df[key])
+        valid = keys.notna()
+        if not valid.any():
+            return [(table_name, df)]
+
+        self.ensure_partitions(table_name, keys[valid].min(), keys[valid].max())
+
+        months = keys.dt.to_period('M')
+        targets = []
+        for period, frame in df[valid].groupby(months[valid], sort=True):
+            month = date(period.year, period.month, 1)
+            targets.append((partition_name(table_name, month), frame))
+        if not valid.all():
+            targets.append((table_name, df[~valid]))
+        return targets
+
+    def _move_expired_default_rows(self, table_name: str, before: date) -> list:
+        """Give every month before `before` that still has rows in the default partition its own partition"""
+        key = PARTITIONED_TABLES[table_name]
+        with self.engine.connect() as conn:
+            months = conn.execute(text(
+                f"SELECT DISTINCT DATE_TRUNC('month', \"{key}\")::date FROM {table_name}_default "
+                f"WHERE \"{key}\" < :before"
+            ), {'before': before}).scalars().all()
+        created = []
+        for month in sorted(months):
+            created.extend(self.ensure_partitions(table_name, month, month))
+        return created
+
+    def drop_partitions_before(self, table_name: str, cutoff, detach_only: bool = False) -> list:
+        """
+        Retention: remove every partition whose upper bound is <= cutoff
+
+        Expired rows stranded in the default partition are first moved into
+        partitions of their months, so they are dropped (or archived) with the
+        rest instead of staying there for good.
+
+        Args:
+            table_name: Partitioned table
+            cutoff: Keep data at or after this point
+            detach_only: Detach (keep the table for archiving) instead of dropping
+
+        Returns:
+            list: Names of partitions removed
+        """
+        cutoff = pd.Timestamp(cutoff).date()
+        self._move_expired_default_rows(table_name, month_start(cutoff))
+        removed = []
+        for partition in self.list_partitions(table_name):
+            if partition['is_default'] or partition['end'] is None or partition['end'] > cutoff:
+                continue
+            with self.engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table_name} DETACH PARTITION {partition['name']}"))
+                if not detach_only:
+                    conn.execute(text(f"DROP TABLE {partition['name']}"))
+            removed.append(partition['name'])
+            self._known.get(table_name, set()).discard(partition['name'])
+
+        action = 'Detached' if detach_only else 'Dropped'
+        logger.info(f"✅ {action} {len(removed)} partitions of {table_name} older than {cutoff}")
+        return removed
@@ -187,20 +187,25 @@ WITH daily_metrics AS (
         
         -- Customer metrics
         COUNT(DISTINCT o.user_id) as daily_active_customers,
-        COUNT(DISTINCT CASE WHEN DATE(u.signup_date) = DATE(o.order_date) THEN u.user_id END) as new_customers,
-        
-        -- Conversion metrics (simplified)
-        COUNT(DISTINCT e.session_id) as daily_sessions
+        COUNT(DISTINCT CASE WHEN DATE(u.signup_date) = DATE(o.order_date) THEN u.user_id END) as new_customers
         
     FROM orders o
     JOIN users u ON o.user_id = u.user_id
-    LEFT JOIN events e ON DATE(e.timestamp) = DATE(o.order_date)
     WHERE o.status = 'completed'
     GROUP BY DATE(o.order_date)
 ),
 rolling_metrics AS (
     SELECT 
-        *,
+        dm.*,
+        
+        -- Conversion metrics: one pre-aggregated events row per day
+        -- (daily_event_counts, maintained at load time by src/database/rollups.py)
+        COALESCE(ec.sessions, 0) as daily_sessions,
+        COALESCE(ec.product_views, 0) as daily_product_views,
+        COALESCE(ec.add_to_carts, 0) as daily_add_to_carts,
+        COALESCE(ec.checkouts, 0) as daily_checkouts,
+        COALESCE(ec.purchases, 0) as daily_purchase_events,
+        
         AVG(daily_revenue) OVER (ORDER BY date ROWS BETWEEN 6 PRECEDING AND CURRENT ROW) as rolling_7d_revenue,
         AVG(daily_orders) OVER (ORDER BY date ROWS BETWEEN 6 PRECEDING AND CURRENT ROW) as rolling_7d_orders,
         
@@ -208,7 +213,8 @@ rolling_metrics AS (
         SUM(daily_revenue) OVER (PARTITION BY DATE_TRUNC('month', date) ORDER BY date) as mtd_revenue,
         SUM(daily_orders) OVER (PARTITION BY DATE_TRUNC('month', date) ORDER BY date) as mtd_orders
         
-    FROM daily_metrics
+    FROM daily_metrics dm
+    LEFT JOIN daily_event_counts ec ON ec.day = dm.date
 )
 SELECT 
     *,
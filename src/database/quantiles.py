@@ -0,0 +1,155 @@
+# src/database/quantiles.py
+"""
+Per-day quantile sketches of order value, basket size and item price.
+
+Each sketch is a log-bucketed histogram (the DDSketch layout): a positive
+value x falls in bucket ceil(log_gamma(x)) with gamma = (1 + a) / (1 - a), and
+every value in a bucket is within a relative error a of the bucket's
+representative 2 * gamma^i / (gamma + 1). Merging sketches adds their bucket
+counts, so any date range and slice merges exactly and every quantile read
+back from the merge keeps the same relative-error bound (a = 1%). Values <= 0
+are counted separately and rank below every bucket.
+
+    order_value   orders.total_amount per order               slices: status
+    basket_size   SUM(order_items.quantity) per order         slices: status
+    item_price    order_items.price_at_time per unit sold      slices: category
+
+The sketches are a table of the 'sales' rollup (src/database/rollups.py): they
+are recomputed in SQL for exactly the days a load dirties, in the same
+transaction as the other sales rollups, one row per (day, metric, slice) with
+parallel bucket/count arrays.
+"""
+import math
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+# metric -> slice dimension
+METRICS = {
+    'order_value': 'status',
+    'basket_size': 'status',
+    'item_price': 'category',
+}
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# Union of a slice's sketches over a day range; bucket NULL holds values <= 0
+MERGE_SKETCHES_QUERY = """
+WITH s AS (
+    SELECT buckets, counts, zero_count
+    FROM daily_value_sketches
+    WHERE metric = :metric AND dimension = :dimension AND value = ANY(:values)
+    AND day >= :start_date AND day <= :end_date
+)
+SELECT bucket, SUM(n)::bigint AS n
+FROM (
+    SELECT b.bucket, b.n FROM s CROSS JOIN LATERAL unnest(s.buckets, s.counts) AS b(bucket, n)
+    UNION ALL
+    SELECT NULL, zero_count FROM s
+) merged
+GROUP BY bucket
+ORDER BY bucket NULLS FIRST
+"""
+
+
+def bucket_value(buckets) -> np.ndarray:
+    """Representative value of each bucket (within RELATIVE_ACCURACY of its members)"""
+    return 2 * np.power(GAMMA, np.asarray(buckets, dtype=np.float64)) / (GAMMA + 1)
+
+
+class QuantileSketches:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _slice(self, metric: str, filters: dict) -> tuple:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown sketch metric '{metric}', expected one of {list(METRICS)}")
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        if not filters:
+            return '', ['']
+        if set(filters) != {METRICS[metric]}:
+            raise ValueError(f"'{metric}' sketches are sliced by '{METRICS[metric]}' only, got {list(filters)}")
+        values = filters[METRICS[metric]]
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        return METRICS[metric], [str(v) for v in values]
+
+    def load(self, metric: str, start_date=None, end_date=None, filters: dict = None) -> tuple:
+        """
+        Merged sketch of one slice over a date range (inclusive)
+
+        Returns:
+            (values, counts): bucket representative values (0.0 for values <= 0),
+                              ascending, and their counts
+        """
+        dimension, values = self._slice(metric, filters)
+        params = {
+            'metric': metric, 'dimension': dimension, 'values': values,
+            'start_date': pd.Timestamp(start_date or '1900-01-01').date(),
+            'end_date': pd.Timestamp(end_date or '2999-12-31').date(),
+        }
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(MERGE_SKETCHES_QUERY), params).fetchall()
+        rows = [row for row in rows if row.n]
+        buckets = np.array([row.bucket if row.bucket is not None else 0 for row in rows], dtype=np.int64)
+        representatives = np.where([row.bucket is None for row in rows], 0.0, bucket_value(buckets))
+        return representatives.astype(np.float64), np.array([row.n for row in rows], dtype=np.int64)
+
+    def quantiles(self, metric: str, quantiles=DEFAULT_QUANTILES, start_date=None, end_date=None,
+                  filters: dict = None) -> dict:
+        """
+        Approximate quantiles over a date range and optional slice
+
+        Args:
+            metric: 'order_value', 'basket_size' or 'item_price'
+            quantiles: Quantiles in [0, 1]
+            start_date: First day (inclusive, optional)
+            end_date: Last day (inclusive, optional)
+            filters: {slice dimension: value or list of values}
+
+        Returns:
+            dict: quantile -> value (None when the range is empty), plus 'count'
+        """
+        values, counts = self.load(metric, start_date, end_date, filters)
+        total = int(counts.sum())
+        result = {'count': total}
+        cumulative = np.cumsum(counts)
+        for q in quantiles:
+            if not 0 <= q <= 1:
+                raise ValueError(f"Quantile {q} outside [0, 1]")
+            if not total:
+                result[q] = None
+                continue
+            # Lower rank convention: the q-quantile is the value at rank q * (n - 1)
+            rank = q * (total - 1)
+            result[q] = float(values[np.searchsorted(cumulative, rank, side='right')])
+        return result
+
+    def histogram(self, metric: str, bins: int = 30, start_date=None, end_date=None,
+                  filters: dict = None, log: bool = False) -> pd.DataFrame:
+        """
+        Distribution over a date range, re-binned from the sketch buckets
+
+        Args:
+            bins: Number of equal-width bins (log-spaced with log=True)
+
+        Returns:
+            pd.DataFrame: bin_start, bin_end, count
+        """
+        values, counts = self.load(metric, start_date, end_date, filters)
+        if not len(values):
+            return pd.DataFrame(columns=['bin_start', 'bin_end', 'count'])
+        low, high = values[0], values[-1]
+        if log and low > 0:
+            edges = np.geomspace(low, high * (1 + 1e-9), bins + 1)
+        else:
+            edges = np.linspace(low, high * (1 + 1e-9) if high > low else low + 1, bins + 1)
+        binned, _ = np.histogram(values, bins=edges, weights=counts)
+        return pd.DataFrame({'bin_start': edges[:-1], 'bin_end': edges[1:], 'count': binned.astype(np.int64)})
@@ -0,0 +1,542 @@
+# src/database/query_catalog.py
+"""
+Named, parameterized query catalog.
+
+Every query has a name, typed parameters (PostgreSQL types, written as :name in
+the SQL) and the result columns it must return. QueryCatalog executes queries by
+name: hot queries are PREPAREd once per pooled connection and then run with
+EXECUTE, so PostgreSQL can reuse the plan and values are always bound, never
+interpolated. The name is also the key for caching and per-query timings.
+
+The catalog is seeded from the queries the app, KPICalculator, ReportGenerator,
+DataQualityChecker and verify_data.py used to build inline, plus every query in
+sample_queries.sql (registered as sample_<title>).
+"""
+import os
+import re
+import time
+import threading
+import pandas as pd
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_QUERIES_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'sample_queries.sql')
+
+# :name placeholders (not :: casts)
+PARAM_RE = re.compile(r'(?<![:\w]):([A-Za-z_]\w*)')
+IDENTIFIER_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+# Key in the pooled connection's info dict holding names prepared on it
+PREPARED_KEY = 'prepared_statements'
+
+_CONVERTERS = {
+    'integer': int,
+    'bigint': int,
+    'numeric': float,
+    'double precision': float,
+    'text': str,
+    # Typed by the server from the column it is compared with (enum columns
+    # in the compact schema take labels, not text)
+    'unknown': str,
+    'uuid': str,
+    'date': lambda v: pd.Timestamp(v).date(),
+    'timestamp': lambda v: pd.Timestamp(v).to_pydatetime(),
+}
+
+QUERIES = {}
+
+
+def register_query(name: str, sql: str, params: dict = None, columns: list = None,
+                   prepare: bool = True, replace: bool = False):
+    """
+    Add a query to the catalog
+
+    Args:
+        name: Unique query name (also the prepared statement name)
+        sql: SQL with :param placeholders
+        params: param name -> PostgreSQL type (e.g. {'start_day': 'date'})
+        columns: Expected result columns, in order (None skips the check)
+        prepare: PREPARE once per connection instead of sending the text each call
+        replace: Overwrite an existing entry with the same name
+    """
+    # The name doubles as the prepared statement name (63-byte identifier limit)
+    if not IDENTIFIER_RE.match(name) or len(name) > 63:
+        raise ValueError(f"Invalid query name '{name}'")
+    if name in QUERIES and not replace:
+        return QUERIES[name]
+
+    params = params or {}
+    used = list(dict.fromkeys(PARAM_RE.findall(sql)))
+    missing = [p for p in used if p not in params]
+    if missing:
+        raise ValueError(f"Query '{name}' uses undeclared parameters: {missing}")
+    unknown_types = [t for t in params.values() if t not in _CONVERTERS]
+    if unknown_types:
+        raise ValueError(f"Query '{name}' has unsupported parameter types: {unknown_types}")
+
+    QUERIES[name] = {
+        'name': name,
+        'sql': sql.strip().rstrip(';'),
+        'params': params,
+        'columns': columns,
+        'prepare': prepare,
+    }
+    return QUERIES[name]
+
+
+def _slug(title: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', title.lower()).strip('_')
+
+
+def load_sql_file(path: str, prefix: str, columns: dict = None, prepare: bool = False) -> list:
+    """
+    Register every '-- N. Title' query of a .sql file as <prefix>_<title>
+
+    Returns:
+        list: Names registered
+    """
+    with open(path, 'r') as f:
+        content = f.read()
+
+    names = []
+    for statement in content.split(';'):
+        title_match = re.search(r'--\s*\d+\.\s*(.+)', statement)
+        sql = '\n'.join(line for line in statement.splitlines() if not line.strip().startswith('--')).strip()
+        if title_match and sql.upper().startswith(('SELECT', 'WITH')):
+            name = f"{prefix}_{_slug(title_match.group(1))}"
+            register_query(name, sql, columns=(columns or {}).get(name), prepare=prepare)
+            names.append(name)
+    return names
+
+
+def bind_params(spec: dict, params: dict) -> list:
+    """Check and convert parameters for a catalog entry; returns values in declaration order"""
+    params = params or {}
+    unknown = set(params) - set(spec['params'])
+    if unknown:
+        raise ValueError(f"Unknown parameters for '{spec['name']}': {sorted(unknown)}")
+    values = []
+    for param, pg_type in spec['params'].items():
+        if param not in params:
+            raise ValueError(f"Missing parameter '{param}' for '{spec['name']}'")
+        value = params[param]
+        values.append(None if value is None else _CONVERTERS[pg_type](value))
+    return values
+
+
+def pyformat_query(name: str, params: dict = None) -> tuple:
+    """
+    A catalog query in psycopg2 %(name)s style, for driver-level paths (COPY, named cursors)
+
+    Returns:
+        (sql, params): SQL with %-escaped literals and the converted parameter dict
+    """
+    spec = QUERIES.get(name)
+    if spec is None:
+        raise KeyError(f"Unknown query '{name}'")
+    values = bind_params(spec, params)
+    sql = PARAM_RE.sub(lambda m: f"%({m.group(1)})s", spec['sql'].replace('%', '%%'))
+    return sql, dict(zip(spec['params'], values))
+
+
+class QueryCatalog:
+    def __init__(self, engine):
+        self.engine = engine
+        self.timings = {}
+        # Catalogs are shared by concurrent batch queries
+        self._timings_lock = threading.Lock()
+
+    def _bind(self, spec: dict, params: dict) -> list:
+        return bind_params(spec, params)
+
+    def _prepare(self, conn, spec: dict):
+        """PREPARE the statement on this pooled connection unless already done"""
+        prepared = conn.connection.info.setdefault(PREPARED_KEY, set())
+        if spec['name'] in prepared:
+            return
+        order = list(spec['params'])
+        sql = PARAM_RE.sub(lambda m: f"${order.index(m.group(1)) + 1}", spec['sql'])
+        types = f"({', '.join(spec['params'].values())})" if order else ""
+        # Sent without parameters, so the DBAPI leaves the SQL text untouched
+        conn.exec_driver_sql(f"PREPARE {spec['name']}{types} AS {sql}")
+        prepared.add(spec['name'])
+
+    def _run(self, conn, spec: dict, values: list):
+        if spec['prepare']:
+            self._prepare(conn, spec)
+            placeholders = f"({', '.join(['%s'] * len(values))})" if values else ""
+            return conn.exec_driver_sql(f"EXECUTE {spec['name']}{placeholders}", tuple(values))
+        return conn.execute(text(spec['sql']), dict(zip(spec['params'], values)))
+
+    def _fetch(self, name: str, params: dict, conn) -> tuple:
+        """Run a query by name; returns (columns, rows) as plain Python values"""
+        spec = QUERIES.get(name)
+        if spec is None:
+            raise KeyError(f"Unknown query '{name}'")
+        values = self._bind(spec, params)
+
+        start = time.perf_counter()
+        if conn is not None:
+            result = self._run(conn, spec, values)
+            columns, rows = list(result.keys()), result.fetchall()
+        else:
+            with self.engine.connect() as own_conn:
+                result = self._run(own_conn, spec, values)
+                columns, rows = list(result.keys()), result.fetchall()
+        self._record(name, time.perf_counter() - start)
+
+        if spec['columns'] is not None and columns != spec['columns']:
+            raise ValueError(f"Query '{name}' returned columns {columns}, expected {spec['columns']}")
+        return columns, rows
+
+    def execute(self, name: str, params: dict = None, conn=None) -> pd.DataFrame:
+        """
+        Run a catalog query by name
+
+        Args:
+            name: Catalog query name
+            params: Parameter values (converted to the declared types)
+            conn: Optional open SQLAlchemy connection to run on
+
+        Returns:
+            pd.DataFrame: Result, columns checked against the catalog entry
+        """
+        columns, rows = self._fetch(name, params, conn)
+        # Same Decimal -> float coercion as pd.read_sql_query
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+    def scalar(self, name: str, params: dict = None, conn=None):
+        """First column of the first row (None if no rows)"""
+        _, rows = self._fetch(name, params, conn)
+        return rows[0][0] if rows else None
+
+    def records(self, name: str, params: dict = None, conn=None) -> list:
+        """Result as a list of dicts of plain Python values (JSON friendly)"""
+        columns, rows = self._fetch(name, params, conn)
+        return [dict(zip(columns, row)) for row in rows]
+
+    def _record(self, name: str, elapsed: float):
+        with self._timings_lock:
+            stats = self.timings.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed * 1000
+            stats['max_ms'] = max(stats['max_ms'], elapsed * 1000)
+
+    def get_timings(self) -> pd.DataFrame:
+        """Per-query call count and latency for this catalog instance"""
+        df = pd.DataFrame.from_dict(self.timings, orient='index')
+        if not df.empty:
+            df['avg_ms'] = df['total_ms'] / df['calls']
+        return df
+
+
+# ==================== KPI CALCULATOR ====================
+
+register_query('kpi_daily_kpis', """
+    SELECT * FROM daily_kpis ORDER BY date DESC LIMIT :limit
+""", params={'limit': 'integer'},
+    columns=['date', 'active_customers', 'total_orders', 'total_revenue', 'avg_order_value', 'new_customers'])
+
+register_query('kpi_customer_ltv', """
+    SELECT * FROM customer_lifetime_value WHERE total_spent > 0 ORDER BY total_spent DESC LIMIT :limit
+""", params={'limit': 'integer'},
+    columns=['user_id', 'email', 'signup_date', 'total_orders', 'total_spent', 'first_order_date', 'last_order_date'])
+
+register_query('kpi_customer_ltv_all', """
+    SELECT user_id, total_orders, total_spent FROM customer_lifetime_value WHERE total_spent > 0
+""", columns=['user_id', 'total_orders', 'total_spent'])
+
+register_query('kpi_customer_ltv_range', """
+    SELECT MIN(total_spent) as min_spent, MAX(total_spent) as max_spent
+    FROM customer_lifetime_value WHERE total_spent > 0
+""", columns=['min_spent', 'max_spent'])
+
+register_query('kpi_channel_roi', """
+    SELECT
+        u.acquisition_channel,
+        COUNT(DISTINCT u.user_id) as users,
+        COUNT(DISTINCT o.order_id) as orders,
+        ROUND(SUM(o.total_amount), 2) as revenue,
+        ROUND(SUM(o.total_amount) / NULLIF(COUNT(DISTINCT u.user_id), 0), 2) as revenue_per_user,
+        ROUND((SUM(o.total_amount) / NULLIF(COUNT(DISTINCT u.user_id), 0)) / 10, 2) as roi
+    FROM users u
+    LEFT JOIN orders o ON u.user_id = o.user_id
+    GROUP BY u.acquisition_channel
+    ORDER BY revenue DESC
+""", columns=['acquisition_channel', 'users', 'orders', 'revenue', 'revenue_per_user', 'roi'])
+
+register_query('kpi_inventory_turnover', """
+    SELECT
+        p.category,
+        AVG(p.stock_quantity) as avg_inventory,
+        SUM(oi.quantity) as units_sold,
+        ROUND(SUM(oi.quantity) / NULLIF(AVG(p.stock_quantity), 0), 2) as turnover_rate
+    FROM products p
+    LEFT JOIN order_items oi ON p.product_id = oi.product_id
+    GROUP BY p.category
+    ORDER BY turnover_rate DESC
+""", columns=['category', 'avg_inventory', 'units_sold', 'turnover_rate'])
+
+# One pass over orders (aggregated per user) and one over users (cohort sizes,
+# new users) for AOV, new users, month-1 retention and CLV. Retention keeps the
+# old definition: average over cohorts with any month-1 activity.
+register_query('kpi_key_metrics', """
+    WITH u AS MATERIALIZED (
+        SELECT user_id, signup_date, DATE_TRUNC('month', signup_date) AS cohort_month
+        FROM users
+    ),
+    per_user AS MATERIALIZED (
+        SELECT
+            u.cohort_month,
+            COUNT(*) AS orders,
+            SUM(o.total_amount) AS spent,
+            BOOL_OR(o.order_date >= u.cohort_month + INTERVAL '1 month'
+                    AND o.order_date < u.cohort_month + INTERVAL '2 months') AS retained
+        FROM orders o
+        JOIN u ON u.user_id = o.user_id
+        GROUP BY o.user_id, u.cohort_month
+    ),
+    cohort_sizes AS (
+        SELECT cohort_month, COUNT(*) AS initial_size FROM u GROUP BY cohort_month
+    ),
+    cohort_retained AS (
+        SELECT cohort_month, COUNT(*) FILTER (WHERE retained) AS retained_users
+        FROM per_user
+        GROUP BY cohort_month
+    )
+    SELECT
+        (SELECT ROUND(SUM(spent) / NULLIF(SUM(orders), 0), 2) FROM per_user) as aov,
+        (SELECT COUNT(*) FROM u WHERE signup_date >= CURRENT_DATE - :days) as new_users,
+        (SELECT AVG(CAST(r.retained_users AS NUMERIC) / s.initial_size * 100)
+         FROM cohort_retained r
+         JOIN cohort_sizes s ON s.cohort_month = r.cohort_month
+         WHERE r.retained_users > 0) as retention_rate_pct,
+        (SELECT ROUND(AVG(spent), 2) FROM per_user WHERE spent > 0) as clv
+""", params={'days': 'integer'}, columns=['aov', 'new_users', 'retention_rate_pct', 'clv'])
+
+# ==================== COHORT ENGINE ====================
+
+# Bulk inputs of the in-memory cohort engine (read once per load)
+register_query('cohort_users', """
+    SELECT user_id, signup_date, country, acquisition_channel FROM users
+""", columns=['user_id', 'signup_date', 'country', 'acquisition_channel'], prepare=False)
+
+register_query('cohort_activity', """
+    SELECT user_id, month, completed FROM user_month_activity
+""", columns=['user_id', 'month', 'completed'], prepare=False)
+
+# ==================== REPORT GENERATOR ====================
+
+register_query('report_top_products', """
+    SELECT
+        p.name,
+        p.category,
+        COALESCE(SUM(oi.quantity * oi.price_at_time), 0) as revenue,
+        COALESCE(SUM(oi.quantity), 0) as units_sold,
+        ROUND(COALESCE(AVG(oi.price_at_time), 0), 2) as avg_price
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.product_id
+    JOIN orders o ON oi.order_id = o.order_id
+    WHERE o.order_date BETWEEN :start_ts AND :end_ts
+    AND o.status = 'completed'
+    GROUP BY p.product_id, p.name, p.category
+    ORDER BY revenue DESC
+    LIMIT :limit
+""", params={'start_ts': 'timestamp', 'end_ts': 'timestamp', 'limit': 'integer'},
+    columns=['name', 'category', 'revenue', 'units_sold', 'avg_price'])
+
+# ==================== API ====================
+
+register_query('api_users_page', """
+    SELECT user_id, first_name, last_name, email, country, signup_date
+    FROM users
+    ORDER BY signup_date DESC, user_id
+    LIMIT :limit OFFSET :offset
+""", params={'limit': 'integer', 'offset': 'integer'},
+    columns=['user_id', 'first_name', 'last_name', 'email', 'country', 'signup_date'])
+
+register_query('api_users_count', "SELECT COUNT(*) as total FROM users", columns=['total'])
+
+register_query('api_orders_page', """
+    SELECT o.order_id, o.order_date, o.total_amount, o.status, u.first_name, u.last_name
+    FROM orders o
+    JOIN users u ON o.user_id = u.user_id
+    ORDER BY o.order_date DESC
+    LIMIT :limit OFFSET :offset
+""", params={'limit': 'integer', 'offset': 'integer'},
+    columns=['order_id', 'order_date', 'total_amount', 'status', 'first_name', 'last_name'])
+
+register_query('api_orders_count', "SELECT COUNT(*) as total FROM orders", columns=['total'])
+
+register_query('api_top_products', """
+    SELECT p.product_id, p.name, SUM(oi.quantity * oi.price_at_time)::numeric(12,2) as revenue
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.product_id
+    GROUP BY p.product_id, p.name
+    ORDER BY revenue DESC
+    LIMIT :limit
+""", params={'limit': 'integer'}, columns=['product_id', 'name', 'revenue'])
+
+register_query('api_customer_metrics', """
+    SELECT
+        (SELECT COUNT(*) FROM users) as total_customers,
+        (SELECT AVG(total_amount)::numeric(12,2) FROM orders WHERE status = :status) as avg_order_value,
+        (SELECT COUNT(*) FROM orders WHERE status = :status) as total_orders,
+        (SELECT COUNT(*) FROM (SELECT user_id FROM orders GROUP BY user_id HAVING COUNT(*) > 1) r) as repeat_customers
+""", params={'status': 'unknown'},
+    columns=['total_customers', 'avg_order_value', 'total_orders', 'repeat_customers'])
+
+# ==================== DATA QUALITY ====================
+
+def quality_query(check: str, table_name: str, column: str, **kwargs) -> str:
+    """
+    Register (once) and return the name of a data quality query for one column
+
+    Table and column names are identifiers, so each (check, table, column) gets
+    its own catalog entry; values such as dates and bounds stay bound parameters.
+    """
+    for identifier in (table_name, column):
+        if not IDENTIFIER_RE.match(identifier):
+            raise ValueError(f"Invalid identifier '{identifier}'")
+    name = f"quality_{check}_{table_name}_{column}"
+    if check == 'nulls':
+        date_column = kwargs.get('date_column')
+        if date_column:
+            if not IDENTIFIER_RE.match(date_column):
+                raise ValueError(f"Invalid identifier '{date_column}'")
+            name += f"_by_{date_column}"
+            register_query(name, f"""
+                SELECT COUNT(*) as null_count FROM {table_name}
+                WHERE {column} IS NULL AND {date_column} >= :day AND {date_column} < CAST(:day AS date) + 1
+            """, params={'day': 'date'}, columns=['null_count'])
+        else:
+            register_query(name, f"SELECT COUNT(*) as null_count FROM {table_name} WHERE {column} IS NULL",
+                           columns=['null_count'])
+    elif check == 'freshness':
+        register_query(name, f"SELECT MAX({column}) as latest_date FROM {table_name}", columns=['latest_date'])
+    elif check == 'range':
+        register_query(name, f"""
+            SELECT COUNT(*) as outlier_count FROM {table_name}
+            WHERE {column} < :min_val OR {column} > :max_val
+        """, params={'min_val': 'numeric', 'max_val': 'numeric'}, columns=['outlier_count'])
+    elif check == 'orphans':
+        parent_table = kwargs['parent_table']
+        if not IDENTIFIER_RE.match(parent_table):
+            raise ValueError(f"Invalid identifier '{parent_table}'")
+        name += f"_{parent_table}"
+        register_query(name, f"""
+            SELECT COUNT(*) as orphan_count
+            FROM {table_name} c
+            LEFT JOIN {parent_table} p ON c.{column} = p.{column}
+            WHERE p.{column} IS NULL
+        """, columns=['orphan_count'])
+    else:
+        raise ValueError(f"Unknown quality check '{check}'")
+    return name
+
+# ==================== VERIFICATION (scripts/verify_data.py) ====================
+
+register_query('verify_user_statistics', """
+    SELECT
+        COUNT(*) as total_users,
+        COUNT(DISTINCT country) as countries_represented,
+        ROUND(AVG(CURRENT_DATE - signup_date), 1) as avg_account_age_days,
+        MIN(signup_date) as earliest_signup,
+        MAX(signup_date) as latest_signup
+    FROM users
+""", prepare=False)
+
+register_query('verify_product_statistics', """
+    SELECT
+        COUNT(*) as total_products,
+        COUNT(DISTINCT category) as categories,
+        ROUND(AVG(price), 2) as avg_price,
+        ROUND(MIN(price), 2) as min_price,
+        ROUND(MAX(price), 2) as max_price
+    FROM products
+""", prepare=False)
+
+register_query('verify_order_statistics', """
+    SELECT
+        COUNT(*) as total_orders,
+        ROUND(SUM(total_amount), 2) as total_revenue,
+        ROUND(AVG(total_amount), 2) as avg_order_value,
+        MIN(order_date) as first_order,
+        MAX(order_date) as last_order
+    FROM orders
+""", prepare=False)
+
+register_query('verify_daily_revenue', """
+    SELECT
+        DATE(order_date) as order_day,
+        COUNT(*) as orders,
+        ROUND(SUM(total_amount), 2) as daily_revenue,
+        ROUND(AVG(total_amount), 2) as avg_order_value
+    FROM orders
+    WHERE order_date >= CURRENT_DATE - :days
+    GROUP BY DATE(order_date)
+    ORDER BY order_day DESC
+""", params={'days': 'integer'}, prepare=False)
+
+register_query('verify_top_products', """
+    SELECT
+        p.name,
+        p.category,
+        COUNT(oi.order_item_id) as units_sold,
+        ROUND(SUM(oi.quantity * oi.price_at_time), 2) as total_revenue
+    FROM order_items oi
+    JOIN products p ON oi.product_id = p.product_id
+    GROUP BY p.product_id, p.name, p.category
+    ORDER BY total_revenue DESC
+    LIMIT :limit
+""", params={'limit': 'integer'}, prepare=False)
+
+register_query('verify_user_geography', """
+    SELECT
+        country,
+        COUNT(*) as user_count,
+        ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER(), 1) as percentage
+    FROM users
+    GROUP BY country
+    ORDER BY user_count DESC
+""", prepare=False)
+
+register_query('verify_acquisition_channels', """
+    SELECT
+        acquisition_channel,
+        COUNT(*) as users,
+        COUNT(DISTINCT o.order_id) as orders,
+        ROUND(SUM(o.total_amount), 2) as revenue
+    FROM users u
+    LEFT JOIN orders o ON u.user_id = o.user_id
+    GROUP BY acquisition_channel
+    ORDER BY revenue DESC NULLS LAST
+""", prepare=False)
+
+register_query('verify_null_emails', "SELECT COUNT(*) FROM users WHERE email IS NULL", prepare=False)
+register_query('verify_negative_prices', "SELECT COUNT(*) FROM products WHERE price < 0", prepare=False)
+register_query('verify_future_orders', "SELECT COUNT(*) FROM orders WHERE order_date > NOW()", prepare=False)
+register_query('verify_orders_without_items', """
+    SELECT COUNT(*) FROM orders o
+    WHERE NOT EXISTS (
+        SELECT 1 FROM order_items oi
+        WHERE oi.order_id = o.order_id
+    )
+""", prepare=False)
+
+# ==================== SAMPLE QUERIES (sample_queries.sql) ====================
+
+SAMPLE_QUERY_COLUMNS = {
+    'sample_monthly_revenue_trend': ['month', 'orders', 'revenue', 'avg_order_value'],
+    'sample_customer_retention_cohort_analysis': ['cohort_month', 'order_month', 'active_users'],
+    'sample_product_category_performance': ['category', 'orders', 'units_sold', 'revenue', 'profit'],
+    'sample_customer_lifetime_value': ['user_id', 'email', 'signup_date', 'total_orders', 'total_spent',
+                                       'avg_order_value', 'first_order', 'last_order'],
+    'sample_hourly_sales_distribution': ['hour_of_day', 'orders', 'revenue'],
+}
+
+if os.path.exists(SAMPLE_QUERIES_PATH):
+    load_sql_file(SAMPLE_QUERIES_PATH, 'sample', columns=SAMPLE_QUERY_COLUMNS)
@@ -0,0 +1,284 @@
+# src/database/rollups.py
+"""
+Incrementally maintained daily rollups.
+
+Loads mark the days they touch in rollup_dirty_days (one queue per rollup);
+refresh_dirty() recomputes exactly those days (delete + re-aggregate in one
+transaction), so late-arriving rows land in the right day without ever
+re-aggregating a full fact table.
+
+    sales   daily_sales_rollup           day x shipping_country x acquisition_channel x status
+            daily_category_sales_rollup  ... x category (order_items joined to products)
+            daily_value_sketches         day x metric x slice quantile sketches (src/database/quantiles.py)
+    events  daily_event_counts           day (sessions, users and funnel step counts)
+
+Sales measures are additive (counts, sums); averages are derived as
+SUM(revenue) / SUM(order_count). Distinct customer counts are not additive and
+stay on the raw tables. Event counts are one row per day, so their distinct
+session/user counts are exact for that day.
+"""
+from contextlib import nullcontext
+import pandas as pd
+from sqlalchemy import text
+import logging
+from src.database.data_version import bump_data_version
+from src.database.quantiles import LOG_GAMMA
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MARK_DAYS_QUERY = """
+INSERT INTO rollup_dirty_days (rollup, day)
+SELECT DISTINCT :rollup, unnest(CAST(:days AS date[]))
+ON CONFLICT (rollup, day) DO UPDATE SET marked_at = CURRENT_TIMESTAMP
+"""
+
+MARK_ORDER_DAYS_QUERY = """
+INSERT INTO rollup_dirty_days (rollup, day)
+SELECT DISTINCT 'sales', DATE(order_date)
+FROM orders
+WHERE order_id = ANY(CAST(:order_ids AS uuid[]))
+ON CONFLICT (rollup, day) DO UPDATE SET marked_at = CURRENT_TIMESTAMP
+"""
+
+CLAIM_DIRTY_DAYS_QUERY = "DELETE FROM rollup_dirty_days WHERE rollup = :rollup RETURNING day"
+
+
+def _dirty_filter(alias: str, column: str) -> str:
+    # The range lets the planner prune monthly partitions; the DATE() filter
+    # then keeps only the dirty days inside that range.
+    return f"""
+{alias}."{column}" >= :first_day AND {alias}."{column}" < CAST(:last_day AS date) + 1
+AND DATE({alias}."{column}") = ANY(CAST(:days AS date[]))
+"""
+
+
+REFRESH_SALES_QUERY = f"""
+INSERT INTO daily_sales_rollup
+    (day, shipping_country, acquisition_channel, status, order_count, revenue)
+SELECT
+    DATE(o.order_date),
+    o.shipping_country,
+    u.acquisition_channel,
+    o.status,
+    COUNT(*),
+    COALESCE(SUM(o.total_amount), 0)
+FROM orders o
+LEFT JOIN users u ON u.user_id = o.user_id
+WHERE {_dirty_filter('o', 'order_date')}
+GROUP BY 1, 2, 3, 4
+"""
+
+REFRESH_CATEGORY_SALES_QUERY = f"""
+INSERT INTO daily_category_sales_rollup
+    (day, category, shipping_country, acquisition_channel, status, order_count, units_sold, item_revenue)
+SELECT
+    DATE(o.order_date),
+    p.category,
+    o.shipping_country,
+    u.acquisition_channel,
+    o.status,
+    COUNT(DISTINCT o.order_id),
+    COALESCE(SUM(oi.quantity), 0),
+    COALESCE(SUM(oi.quantity * oi.price_at_time), 0)
+FROM orders o
+JOIN order_items oi ON oi.order_id = o.order_id
+LEFT JOIN products p ON p.product_id = oi.product_id
+LEFT JOIN users u ON u.user_id = o.user_id
+WHERE {_dirty_filter('o', 'order_date')}
+GROUP BY 1, 2, 3, 4, 5
+"""
+
+# One sample per order (value, basket size, by status) and per unit sold
+# (price, by category); each sample lands in the unfiltered sketch and its slice
+REFRESH_VALUE_SKETCHES_QUERY = f"""
+WITH dirty_orders AS MATERIALIZED (
+    SELECT o.order_id, DATE(o.order_date) AS day, o.status, o.total_amount
+    FROM orders o
+    WHERE {_dirty_filter('o', 'order_date')}
+),
+samples (day, metric, dimension, slice, x, weight) AS (
+    SELECT day, 'order_value', 'status', status::text, total_amount::float8, 1
+    FROM dirty_orders
+    UNION ALL
+    SELECT o.day, 'basket_size', 'status', o.status::text, SUM(oi.quantity)::float8, 1
+    FROM dirty_orders o
+    JOIN order_items oi ON oi.order_id = o.order_id
+    GROUP BY o.order_id, o.day, o.status
+    UNION ALL
+    SELECT o.day, 'item_price', 'category', p.category::text, oi.price_at_time::float8, oi.quantity
+    FROM dirty_orders o
+    JOIN order_items oi ON oi.order_id = o.order_id
+    LEFT JOIN products p ON p.product_id = oi.product_id
+),
+bucketed AS (
+    SELECT s.day, s.metric, d.dimension, d.value,
+           CASE WHEN s.x > 0 THEN CEIL(LN(s.x) / {LOG_GAMMA!r})::int END AS bucket,
+           SUM(s.weight) AS n
+    FROM samples s
+    CROSS JOIN LATERAL (VALUES ('', ''), (s.dimension, s.slice)) AS d(dimension, value)
+    WHERE s.x IS NOT NULL AND d.value IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5
+)
+INSERT INTO daily_value_sketches (day, metric, dimension, value, buckets, counts, zero_count)
+SELECT
+    day, metric, dimension, value,
+    COALESCE(array_agg(bucket ORDER BY bucket) FILTER (WHERE bucket IS NOT NULL), '{{}}'),
+    COALESCE(array_agg(n ORDER BY bucket) FILTER (WHERE bucket IS NOT NULL), '{{}}'),
+    COALESCE(SUM(n) FILTER (WHERE bucket IS NULL), 0)
+FROM bucketed
+GROUP BY 1, 2, 3, 4
+"""
+
+REFRESH_EVENT_COUNTS_QUERY = f"""
+INSERT INTO daily_event_counts
+    (day, events, sessions, active_users, product_views, add_to_carts, checkouts, purchases)
+SELECT
+    DATE(e.timestamp),
+    COUNT(*),
+    COUNT(DISTINCT e.session_id),
+    COUNT(DISTINCT e.user_id),
+    COUNT(*) FILTER (WHERE e.event_type IN ('product_view', 'page_view')),
+    COUNT(*) FILTER (WHERE e.event_type = 'add_to_cart'),
+    COUNT(*) FILTER (WHERE e.event_type = 'checkout'),
+    COUNT(*) FILTER (WHERE e.event_type = 'purchase')
+FROM events e
+WHERE {_dirty_filter('e', 'timestamp')}
+GROUP BY 1
+"""
+
+# rollup -> source table, day column, rollup tables and their refresh queries
+ROLLUPS = {
+    'sales': {
+        'source': ('orders', 'order_date'),
+        'tables': ['daily_sales_rollup', 'daily_category_sales_rollup', 'daily_value_sketches'],
+        'queries': [REFRESH_SALES_QUERY, REFRESH_CATEGORY_SALES_QUERY, REFRESH_VALUE_SKETCHES_QUERY],
+    },
+    'events': {
+        'source': ('events', 'timestamp'),
+        'tables': ['daily_event_counts'],
+        'queries': [REFRESH_EVENT_COUNTS_QUERY],
+    },
+}
+
+# Loaded table -> rollups it feeds
+TABLE_ROLLUPS = {
+    'orders': ['sales'],
+    'order_items': ['sales'],
+    'events': ['events'],
+}
+
+
+class RollupManager:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def mark_dirty(self, rollup: str, days, conn=None) -> int:
+        """Mark days (dates/timestamps) of one rollup for recomputation (inside conn's transaction when given)"""
+        days = sorted({pd.Timestamp(day).date() for day in days if pd.notna(day)})
+        if days:
+            with nullcontext(conn) if conn is not None else self.engine.begin() as conn:
+                conn.execute(text(MARK_DAYS_QUERY), {'rollup': rollup, 'days': days})
+        return len(days)
+
+    def track_load(self, df: pd.DataFrame, table_name: str, conn=None) -> int:
+        """
+        Mark the days a freshly loaded frame touches
+
+        orders and events frames carry their own dates; order_items frames are
+        mapped to their orders' days in the database, so items arriving after
+        their order still dirty the right day. Pass the load's connection so
+        the marks commit (or roll back) with the rows.
+
+        Returns:
+            int: Number of days marked (order ids looked up for order_items)
+        """
+        if table_name == 'order_items' and 'order_id' in df.columns:
+            order_ids = df['order_id'].dropna().astype(str).unique().tolist()
+            if order_ids:
+                with nullcontext(conn) if conn is not None else self.engine.begin() as conn:
+                    conn.execute(text(MARK_ORDER_DAYS_QUERY), {'order_ids': order_ids})
+            return len(order_ids)
+
+        marked = 0
+        for rollup in TABLE_ROLLUPS.get(table_name, []):
+            source_table, day_column = ROLLUPS[rollup]['source']
+            if source_table == table_name and day_column in df.columns:
+                marked += self.mark_dirty(rollup, pd.to_datetime(df[day_column]).dt.normalize().unique(), conn)
+        return marked
+
+    def clear(self, table_name: str, conn=None) -> list:
+        """
+        Keep the rollups fed by a table right after it is emptied (inside conn's transaction when given)
+
+        A rollup whose source is the table has nothing left to aggregate: its
+        rows and queued days are deleted. Other rollups it feeds (order_items
+        -> sales) get every day they hold queued for recomputation.
+
+        Returns:
+            list: The rollups affected
+        """
+        rollups = TABLE_ROLLUPS.get(table_name, [])
+        if not rollups:
+            return []
+        owned = conn is None
+        with self.engine.begin() if owned else nullcontext(conn) as conn:
+            for rollup in rollups:
+                spec = ROLLUPS[rollup]
+                if spec['source'][0] == table_name:
+                    for rollup_table in spec['tables']:
+                        conn.execute(text(f"DELETE FROM {rollup_table}"))
+                    conn.execute(text("DELETE FROM rollup_dirty_days WHERE rollup = :rollup"), {'rollup': rollup})
+                    continue
+                for rollup_table in spec['tables']:
+                    conn.execute(text(
+                        f"INSERT INTO rollup_dirty_days (rollup, day) "
+                        f"SELECT DISTINCT :rollup, day FROM {rollup_table} "
+                        f"ON CONFLICT (rollup, day) DO NOTHING"
+                    ), {'rollup': rollup})
+            if owned:
+                bump_data_version(conn, f"{table_name} rollups")
+        return rollups
+
+    def refresh_dirty(self, rollups: list = None) -> dict:
+        """
+        Recompute every dirty day (one transaction per rollup)
+
+        Returns:
+            dict: rollup -> list of days refreshed
+        """
+        refreshed = {}
+        for rollup in rollups or ROLLUPS:
+            spec = ROLLUPS[rollup]
+            with self.engine.begin() as conn:
+                days = sorted(row[0] for row in conn.execute(text(CLAIM_DIRTY_DAYS_QUERY), {'rollup': rollup}))
+                if days:
+                    params = {'days': days, 'first_day': days[0], 'last_day': days[-1]}
+                    for table_name in spec['tables']:
+                        conn.execute(text(f"DELETE FROM {table_name} WHERE day = ANY(CAST(:days AS date[]))"), params)
+                    for query in spec['queries']:
+                        conn.execute(text(query), params)
+                    bump_data_version(conn, f"{rollup} rollups")
+            refreshed[rollup] = days
+            if days:
+                logger.info(f"✅ Refreshed {rollup} rollups for {len(days)} days ({days[0]} .. {days[-1]})")
+        return refreshed
+
+    def rebuild(self, rollups: list = None) -> dict:
+        """Mark every day present in the source tables dirty and recompute from scratch"""
+        rollups = rollups or list(ROLLUPS)
+        with self.engine.begin() as conn:
+            for rollup in rollups:
+                source_table, day_column = ROLLUPS[rollup]['source']
+                for table_name in ROLLUPS[rollup]['tables']:
+                    conn.execute(text(f"TRUNCATE {table_name}"))
+                conn.execute(text(
+                    f'INSERT INTO rollup_dirty_days (rollup, day) '
+                    f'SELECT DISTINCT :rollup, DATE("{day_column}") FROM {source_table} '
+                    f'ON CONFLICT (rollup, day) DO NOTHING'
+                ), {'rollup': rollup})
+        return self.refresh_dirty(rollups)
+
+    def rollups_for(self, tables) -> list:
+        """Rollups fed by any of the given tables"""
+        return [rollup for rollup in ROLLUPS if any(rollup in TABLE_ROLLUPS.get(t, []) for t in tables)]
@@ -0,0 +1,78 @@
+-- src/database/schema_compact.sql
+-- Compact layout for the fact tables (users, orders, order_items, events).
+-- Applied by `python scripts/create_schema.py --compact`, which runs
+-- schema_ddl.sql with these CREATE TABLE statements in place of its own.
+--
+-- * Low-cardinality text columns are enums (4 bytes instead of the label
+--   repeated on every row). Enum values read and compare as text, so views,
+--   rollups, materialized views and queries work unchanged. The loader adds
+--   labels it has not seen before (src/etl/compact_encoding.py).
+-- * events.session_id is a native uuid (16 bytes instead of 37 bytes of text).
+-- * Columns are ordered uuid / 8-byte / 4-byte / variable width, so no
+--   alignment padding is inserted between fixed-width columns.
+--
+-- Enum labels sort in declaration order (new labels sort last), not
+-- alphabetically. Cast to text where alphabetical ORDER BY matters.
+
+DROP TYPE IF EXISTS order_status CASCADE;
+CREATE TYPE order_status AS ENUM ('pending', 'shipped', 'completed', 'cancelled', 'returned');
+
+DROP TYPE IF EXISTS event_type CASCADE;
+CREATE TYPE event_type AS ENUM ('session_start', 'page_view', 'product_view', 'add_to_cart', 'checkout', 'purchase');
+
+DROP TYPE IF EXISTS acquisition_channel CASCADE;
+CREATE TYPE acquisition_channel AS ENUM ('organic', 'google_ads', 'facebook', 'instagram', 'email', 'referral');
+
+-- users.country and orders.shipping_country share one label set
+DROP TYPE IF EXISTS country_name CASCADE;
+CREATE TYPE country_name AS ENUM ('USA', 'UK', 'Canada', 'Australia', 'Germany', 'France', 'Japan', 'Brazil');
+
+CREATE TABLE users (
+    user_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    signup_date DATE NOT NULL,
+    country country_name,
+    acquisition_channel acquisition_channel,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    first_name VARCHAR(100),
+    last_name VARCHAR(100),
+    city VARCHAR(100)
+);
+
+CREATE TABLE orders (
+    order_id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    order_date TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status order_status DEFAULT 'completed',
+    shipping_country country_name,
+    total_amount DECIMAL(10,2) NOT NULL,
+    shipping_city VARCHAR(100),
+    PRIMARY KEY (order_id, order_date)
+) PARTITION BY RANGE (order_date);
+
+CREATE TABLE order_items (
+    order_id UUID NOT NULL,
+    product_id UUID NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    order_item_id SERIAL PRIMARY KEY,
+    quantity INTEGER NOT NULL DEFAULT 1,
+    price_at_time DECIMAL(10,2) NOT NULL
+);
+
+CREATE TABLE events (
+    event_id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    product_id UUID REFERENCES products(product_id) ON DELETE SET NULL,
+    session_id UUID,
+    timestamp TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    event_type event_type NOT NULL,
+    PRIMARY KEY (event_id, timestamp)
+) PARTITION BY RANGE (timestamp);
@@ -2,6 +2,25 @@
 -- Enable UUID generation
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Time-ordered UUIDv7 (RFC 9562): 48-bit Unix milliseconds followed by random
+-- bits. Keys increase with insert time, so appends hit the right-most B-tree
+-- leaf instead of a random page. Takes a v4 UUID, overwrites its first 6 bytes
+-- with the timestamp and flips the version nibble from 4 (0100) to 7 (0111).
+-- Opt-in: keys default to v4; switch a table with
+--   ALTER TABLE orders ALTER COLUMN order_id SET DEFAULT uuid_generate_v7()
+-- and generate v7 keys in the ETL with ETL_KEY_FORMAT=uuid7.
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(
+            set_bit(
+                overlay(uuid_send(uuid_generate_v4())
+                        PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                        FROM 1 FOR 6),
+                52, 1),
+            53, 1),
+        'hex')::uuid
+$$ LANGUAGE sql VOLATILE;
+
 -- Drop tables if they exist (for development only)
 DROP TABLE IF EXISTS events CASCADE;
 DROP TABLE IF EXISTS order_items CASCADE;
@@ -40,9 +59,12 @@ CREATE TABLE products (
     loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Orders table
+-- Orders table (range partitioned by month on order_date)
+-- The partition key must be part of the primary key, so order_id alone is
+-- unique only through the loader's checks. Monthly partitions are
+-- created by src/database/partitions.py, anything else lands in orders_default.
 CREATE TABLE orders (
-    order_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    order_id UUID NOT NULL DEFAULT uuid_generate_v4(),
     user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
     order_date TIMESTAMP NOT NULL,
     total_amount DECIMAL(10,2) NOT NULL,
@@ -51,13 +73,19 @@ CREATE TABLE orders (
     shipping_city VARCHAR(100),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (order_id, order_date)
+) PARTITION BY RANGE (order_date);
+
+CREATE TABLE orders_default PARTITION OF orders DEFAULT;
 
 -- Order items table
+-- order_id cannot reference the partitioned orders table, whose key includes
+-- order_date. Parents (and orders.order_id uniqueness) are enforced on every
+-- load by PreloadValidator.enforce_keys in src/etl/preload_validation.py.
 CREATE TABLE order_items (
     order_item_id SERIAL PRIMARY KEY,
-    order_id UUID NOT NULL REFERENCES orders(order_id) ON DELETE CASCADE,
+    order_id UUID NOT NULL,
     product_id UUID NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
     quantity INTEGER NOT NULL DEFAULT 1,
     price_at_time DECIMAL(10,2) NOT NULL,
@@ -65,17 +93,20 @@ CREATE TABLE order_items (
     loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Events table (for user interactions)
+-- Events table (for user interactions, range partitioned by month on timestamp)
 CREATE TABLE events (
-    event_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    event_id UUID NOT NULL DEFAULT uuid_generate_v4(),
     user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
     event_type VARCHAR(50) NOT NULL,
     product_id UUID REFERENCES products(product_id) ON DELETE SET NULL,
     timestamp TIMESTAMP NOT NULL,
     session_id VARCHAR(100),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (event_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE events_default PARTITION OF events DEFAULT;
 
 -- Marketing campaigns table
 CREATE TABLE marketing_campaigns (
@@ -96,13 +127,259 @@ CREATE INDEX idx_users_acquisition_channel ON users(acquisition_channel);
 CREATE INDEX idx_orders_user_id ON orders(user_id);
 CREATE INDEX idx_orders_order_date ON orders(order_date);
 CREATE INDEX idx_order_items_order_id ON order_items(order_id);
-CREATE INDEX idx_order_items_product_id ON order_items(product_id);
-CREATE INDEX idx_events_user_id ON events(user_id);
-CREATE INDEX idx_events_timestamp ON events(timestamp);
+-- (user_id, timestamp) also serves the sessionizer's per-user tail reads
+CREATE INDEX idx_events_user_id ON events(user_id, timestamp);
 CREATE INDEX idx_events_event_type ON events(event_type);
+-- Partial, covering and BRIN indexes (completed orders by date, order_items by
+-- product, events by timestamp) are managed by src/database/indexes.py
+
+-- Daily rollups, maintained incrementally by src/database/rollups.py.
+-- The loader marks every day it touches in rollup_dirty_days (late rows
+-- included). Only those days are recomputed. Order-level facts live at
+-- day x country x channel x status, item-level facts add product category.
+DROP TABLE IF EXISTS rollup_dirty_days;
+CREATE TABLE rollup_dirty_days (
+    rollup VARCHAR(50) NOT NULL,
+    day DATE NOT NULL,
+    marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (rollup, day)
+);
+
+DROP TABLE IF EXISTS daily_sales_rollup;
+CREATE TABLE daily_sales_rollup (
+    day DATE NOT NULL,
+    shipping_country VARCHAR(100),
+    acquisition_channel VARCHAR(50),
+    status VARCHAR(50),
+    order_count INTEGER NOT NULL,
+    revenue DECIMAL(14,2) NOT NULL,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_daily_sales_rollup_day ON daily_sales_rollup(day, status);
+
+DROP TABLE IF EXISTS daily_category_sales_rollup;
+CREATE TABLE daily_category_sales_rollup (
+    day DATE NOT NULL,
+    category VARCHAR(100),
+    shipping_country VARCHAR(100),
+    acquisition_channel VARCHAR(50),
+    status VARCHAR(50),
+    order_count INTEGER NOT NULL,
+    units_sold INTEGER NOT NULL,
+    item_revenue DECIMAL(14,2) NOT NULL,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_daily_category_sales_rollup_day ON daily_category_sales_rollup(day, status);
+
+-- Per-day quantile sketches (log-bucketed, 1% relative accuracy) of order
+-- value, basket size and item price, part of the sales rollup. buckets and
+-- counts are parallel arrays, zero_count counts values <= 0.
+-- dimension/value are '' for the unfiltered sketch (src/database/quantiles.py).
+DROP TABLE IF EXISTS daily_value_sketches;
+CREATE TABLE daily_value_sketches (
+    day DATE NOT NULL,
+    metric VARCHAR(20) NOT NULL,
+    dimension VARCHAR(50) NOT NULL,
+    value VARCHAR(100) NOT NULL,
+    buckets INTEGER[] NOT NULL,
+    counts BIGINT[] NOT NULL,
+    zero_count BIGINT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (metric, dimension, value, day)
+);
+
+CREATE INDEX idx_daily_value_sketches_day ON daily_value_sketches(day);
+
+-- Calendar months each user placed an order in (completed = any completed
+-- order that month). Upserted by the loader as orders arrive
+-- (src/database/activity.py), read by the cohort engine.
+DROP TABLE IF EXISTS user_month_activity;
+CREATE TABLE user_month_activity (
+    user_id UUID NOT NULL,
+    month DATE NOT NULL,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (user_id, month)
+);
+
+-- Sessions derived from events: a user's events split on a 30-minute
+-- inactivity gap (src/etl/sessionization.py), maintained as events load.
+DROP TABLE IF EXISTS sessions;
+CREATE TABLE sessions (
+    session_id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
+    session_start TIMESTAMP NOT NULL,
+    session_end TIMESTAMP NOT NULL,
+    events INTEGER NOT NULL,
+    product_views INTEGER NOT NULL DEFAULT 0,
+    add_to_carts INTEGER NOT NULL DEFAULT 0,
+    checkouts INTEGER NOT NULL DEFAULT 0,
+    purchases INTEGER NOT NULL DEFAULT 0,
+    converted BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE INDEX idx_sessions_user_end ON sessions(user_id, session_end);
+CREATE INDEX idx_sessions_start ON sessions(session_start);
+
+-- Market-basket co-occurrence (src/analytics/market_basket.py): orders per
+-- product, orders per product pair (product_a < product_b), the number of
+-- orders with items, and each product's top-k partners by lift
+DROP TABLE IF EXISTS product_order_counts;
+CREATE TABLE product_order_counts (
+    product_id UUID PRIMARY KEY,
+    orders INTEGER NOT NULL
+);
+
+DROP TABLE IF EXISTS product_pair_counts;
+CREATE TABLE product_pair_counts (
+    product_a UUID NOT NULL,
+    product_b UUID NOT NULL,
+    co_orders INTEGER NOT NULL,
+    PRIMARY KEY (product_a, product_b),
+    CHECK (product_a < product_b)
+);
+
+CREATE INDEX idx_product_pair_counts_b ON product_pair_counts(product_b);
+
+DROP TABLE IF EXISTS basket_stats;
+CREATE TABLE basket_stats (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    orders INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO basket_stats (id, orders) VALUES (1, 0) ON CONFLICT DO NOTHING;
+
+DROP TABLE IF EXISTS product_affinity;
+CREATE TABLE product_affinity (
+    product_id UUID NOT NULL,
+    rank SMALLINT NOT NULL,
+    related_product_id UUID NOT NULL,
+    co_orders INTEGER NOT NULL,
+    support DOUBLE PRECISION NOT NULL,
+    confidence DOUBLE PRECISION NOT NULL,
+    lift DOUBLE PRECISION NOT NULL,
+    computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (product_id, rank)
+);
+
+-- RFM segmentation (src/analytics/clustering.py): the feature table rebuilt
+-- by one aggregate over orders, each customer's current segment (replaced by
+-- every run) and the per-segment summary of every run
+DROP TABLE IF EXISTS customer_rfm;
+CREATE TABLE customer_rfm (
+    user_id UUID PRIMARY KEY,
+    recency_days DOUBLE PRECISION NOT NULL,
+    frequency INTEGER NOT NULL,
+    monetary DOUBLE PRECISION NOT NULL,
+    first_order_date TIMESTAMP NOT NULL,
+    last_order_date TIMESTAMP NOT NULL,
+    as_of TIMESTAMP NOT NULL
+);
+
+DROP TABLE IF EXISTS customer_segments;
+CREATE TABLE customer_segments (
+    user_id UUID PRIMARY KEY,
+    segment_id SMALLINT NOT NULL,
+    segment VARCHAR(50) NOT NULL,
+    recency_days DOUBLE PRECISION NOT NULL,
+    frequency INTEGER NOT NULL,
+    monetary DOUBLE PRECISION NOT NULL,
+    assigned_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_customer_segments_segment ON customer_segments(segment_id);
 
--- Create a view for daily KPIs
-CREATE OR REPLACE VIEW daily_kpis AS
+CREATE TABLE IF NOT EXISTS customer_segment_summary (
+    run_at TIMESTAMP NOT NULL,
+    as_of TIMESTAMP NOT NULL,
+    segment_id SMALLINT NOT NULL,
+    segment VARCHAR(50) NOT NULL,
+    customers INTEGER NOT NULL,
+    avg_recency_days DOUBLE PRECISION,
+    avg_frequency DOUBLE PRECISION,
+    avg_monetary DOUBLE PRECISION,
+    PRIMARY KEY (run_at, segment_id)
+);
+
+-- A/B experiments (src/analytics/experiments.py). variants[1] is the control.
+-- Users are exposed by their first event (of exposure_event, if set) in the
+-- window and bucketed into a variant by a hash of experiment and user id
+CREATE TABLE IF NOT EXISTS experiments (
+    experiment_id VARCHAR(100) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    variants TEXT[] NOT NULL DEFAULT ARRAY['control', 'treatment'],
+    start_date TIMESTAMP NOT NULL,
+    end_date TIMESTAMP,
+    exposure_event VARCHAR(50),
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CHECK (cardinality(variants) >= 2)
+);
+
+-- One row per analysis run, experiment and treatment variant
+CREATE TABLE IF NOT EXISTS ab_test_results (
+    run_at TIMESTAMP NOT NULL,
+    experiment_id VARCHAR(100) NOT NULL,
+    test_name VARCHAR(255),
+    variant VARCHAR(100) NOT NULL,
+    control_variant VARCHAR(100) NOT NULL,
+    users BIGINT NOT NULL,
+    control_users BIGINT NOT NULL,
+    conversion_rate DOUBLE PRECISION,
+    control_conversion_rate DOUBLE PRECISION,
+    conversion_diff DOUBLE PRECISION,
+    conversion_diff_low DOUBLE PRECISION,
+    conversion_diff_high DOUBLE PRECISION,
+    z_stat DOUBLE PRECISION,
+    p_value DOUBLE PRECISION,
+    revenue_per_user DOUBLE PRECISION,
+    control_revenue_per_user DOUBLE PRECISION,
+    revenue_diff DOUBLE PRECISION,
+    revenue_diff_low DOUBLE PRECISION,
+    revenue_diff_high DOUBLE PRECISION,
+    t_stat DOUBLE PRECISION,
+    welch_df DOUBLE PRECISION,
+    revenue_p_value DOUBLE PRECISION,
+    significant BOOLEAN,
+    revenue_significant BOOLEAN,
+    PRIMARY KEY (run_at, experiment_id, variant)
+);
+
+-- Per-day HyperLogLog sketches of distinct users and sessions, one row per
+-- (metric, dimension slice, day). dimension/value are '' for the unfiltered
+-- sketch. registers holds 4096 one-byte registers (src/database/sketches.py).
+DROP TABLE IF EXISTS daily_distinct_sketches;
+CREATE TABLE daily_distinct_sketches (
+    metric VARCHAR(20) NOT NULL,
+    dimension VARCHAR(50) NOT NULL,
+    value VARCHAR(100) NOT NULL,
+    day DATE NOT NULL,
+    registers BYTEA NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (metric, dimension, value, day)
+);
+
+-- Event-side daily aggregate: one row per day, so views that relate events to
+-- orders join on date instead of multiplying orders by events
+DROP TABLE IF EXISTS daily_event_counts;
+CREATE TABLE daily_event_counts (
+    day DATE PRIMARY KEY,
+    events INTEGER NOT NULL,
+    sessions INTEGER NOT NULL,
+    active_users INTEGER NOT NULL,
+    product_views INTEGER NOT NULL,
+    add_to_carts INTEGER NOT NULL,
+    checkouts INTEGER NOT NULL,
+    purchases INTEGER NOT NULL,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Daily KPIs, materialized so dashboard reads are index lookups instead of a
+-- full orders x users aggregation. Refreshed CONCURRENTLY after every ETL load
+-- by src/database/matviews.py, which needs the unique index on date.
+CREATE MATERIALIZED VIEW daily_kpis AS
 SELECT
     DATE(o.order_date) as date,
     COUNT(DISTINCT o.user_id) as active_customers,
@@ -112,11 +389,12 @@ SELECT
     COUNT(DISTINCT CASE WHEN u.signup_date = DATE(o.order_date) THEN u.user_id END) as new_customers
 FROM orders o
 JOIN users u ON o.user_id = u.user_id
-GROUP BY DATE(o.order_date)
-ORDER BY date DESC;
+GROUP BY DATE(o.order_date);
+
+CREATE UNIQUE INDEX idx_daily_kpis_date ON daily_kpis(date);
 
--- Create a view for customer lifetime value
-CREATE OR REPLACE VIEW customer_lifetime_value AS
+-- Customer lifetime value, materialized (one row per user)
+CREATE MATERIALIZED VIEW customer_lifetime_value AS
 SELECT
     u.user_id,
     u.email,
@@ -127,4 +405,36 @@ SELECT
     MAX(o.order_date) as last_order_date
 FROM users u
 LEFT JOIN orders o ON u.user_id = o.user_id
-GROUP BY u.user_id, u.email, u.signup_date;
\ No newline at end of file
+GROUP BY u.user_id, u.email, u.signup_date;
+
+CREATE UNIQUE INDEX idx_customer_lifetime_value_user_id ON customer_lifetime_value(user_id);
+CREATE INDEX idx_customer_lifetime_value_total_spent ON customer_lifetime_value(total_spent);
+
+-- Materialized view refresh history (duration and staleness tracking)
+CREATE TABLE IF NOT EXISTS materialized_view_refreshes (
+    refresh_id SERIAL PRIMARY KEY,
+    view_name VARCHAR(100) NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP NOT NULL,
+    duration_ms NUMERIC(12,1) NOT NULL,
+    concurrent BOOLEAN NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_materialized_view_refreshes_view ON materialized_view_refreshes(view_name, finished_at DESC);
+
+-- Data version stamp: one row, bumped in the same transaction as every load,
+-- truncate and derived-table refresh (src/database/data_version.py). Cached
+-- KPI results are keyed by it. Starts at the creation time in milliseconds so
+-- a recreated table never reissues a version an earlier table already used.
+CREATE TABLE IF NOT EXISTS data_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL,
+    source VARCHAR(100),
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO data_version (id, version, source)
+VALUES (1, (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::bigint, 'create_schema')
+ON CONFLICT (id) DO NOTHING;
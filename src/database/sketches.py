@@ -0,0 +1,305 @@
+# src/database/sketches.py
+"""
+Per-day HyperLogLog sketches for distinct-user metrics.
+
+Distinct counts do not add across days, so daily_kpis, weekly_kpis and the
+reports recount raw rows for every range. A HyperLogLog sketch does merge: the
+union of two sketches is their element-wise register maximum, and the
+estimate of the union is the distinct count over both. Loads build one sketch
+per (metric, day, dimension slice) and merge it into daily_distinct_sketches,
+so any date range and slice filter is answered by reading one small row per
+day instead of scanning the fact tables.
+
+    customers   orders.user_id     slices: status, shipping_country
+    visitors    events.user_id     slices: event_type
+    sessions    events.session_id  slices: event_type
+
+Each sketch has 2^12 = 4096 one-byte registers (4 KB). Estimates have a
+relative standard error of 1.04 / sqrt(4096) = 1.6% (about 3.3% at two
+standard errors), independent of the count, and small counts are corrected
+with linear counting. Values are hashed with pandas' fixed-key 64-bit hash, so
+sketches built by different processes merge. A slice filter on one dimension
+may name several values (their sketches are unioned). Filters on two
+dimensions at once cannot be answered from single-dimension slices.
+"""
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+import logging
+from src.database.data_version import bump_data_version
+from src.database.streaming import StreamingReader
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+RELATIVE_ERROR = 1.04 / np.sqrt(REGISTERS)
+ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+_REST_BITS = 64 - PRECISION
+
+# source table -> day column, metric -> id column, slice dimensions
+SKETCHES = {
+    'orders': {
+        'day': 'order_date',
+        'metrics': {'customers': 'user_id'},
+        'dimensions': ['status', 'shipping_country'],
+    },
+    'events': {
+        'day': 'timestamp',
+        'metrics': {'visitors': 'user_id', 'sessions': 'session_id'},
+        'dimensions': ['event_type'],
+    },
+}
+METRIC_SOURCES = {metric: table for table, spec in SKETCHES.items() for metric in spec['metrics']}
+
+GRAINS = ('day', 'week', 'month')
+
+# Dimension '' / value '' is the unfiltered sketch of the day
+LOCK_SKETCHES_QUERY = """
+SELECT metric, dimension, value, day, registers
+FROM daily_distinct_sketches
+WHERE metric = ANY(:metrics) AND day = ANY(CAST(:days AS date[]))
+FOR UPDATE
+"""
+
+UPSERT_SKETCH_QUERY = """
+INSERT INTO daily_distinct_sketches (metric, dimension, value, day, registers)
+VALUES (:metric, :dimension, :value, :day, :registers)
+ON CONFLICT (metric, dimension, value, day) DO UPDATE
+SET registers = EXCLUDED.registers, updated_at = CURRENT_TIMESTAMP
+"""
+
+SLICE_SKETCHES_QUERY = """
+SELECT day, registers
+FROM daily_distinct_sketches
+WHERE metric = :metric AND dimension = :dimension AND value = ANY(:values)
+AND day >= :start_date AND day <= :end_date
+ORDER BY day
+"""
+
+
+def hash_values(values: pd.Series) -> np.ndarray:
+    """64-bit hashes of the non-null values (ids compared as lower-case text)"""
+    values = values.dropna().astype(str).str.lower()
+    return pd.util.hash_array(values.to_numpy(dtype=object))
+
+
+def register_updates(hashes: np.ndarray) -> tuple:
+    """
+    Register index and rank for each hash
+
+    The top PRECISION bits pick the register; the rank is the position of the
+    first set bit in the remaining bits (all zero -> 64 - PRECISION + 1).
+    """
+    index = (hashes >> np.uint64(_REST_BITS)).astype(np.int64)
+    rest = hashes & np.uint64((1 << _REST_BITS) - 1)
+    # frexp's exponent is the exact bit length: rest < 2^52 is exact in float64
+    bit_length = np.frexp(rest.astype(np.float64))[1]
+    rank = (_REST_BITS - bit_length + 1).astype(np.uint8)
+    return index, rank
+
+
+def estimate(registers: np.ndarray) -> np.ndarray:
+    """Distinct count estimate per sketch (rows of a 2D register array)"""
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    raw = ALPHA * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=1)
+    zeros = np.count_nonzero(registers == 0, axis=1)
+    # Linear counting is more accurate while many registers are still empty
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def build_sketches(df: pd.DataFrame, table_name: str) -> dict:
+    """
+    Sketch a frame of a source table
+
+    Returns:
+        dict: (metric, dimension, value, day) -> uint8 registers
+    """
+    spec = SKETCHES.get(table_name)
+    if spec is None or spec['day'] not in df.columns:
+        return {}
+    days = pd.to_datetime(df[spec['day']]).dt.date
+    sketches = {}
+    for metric, column in spec['metrics'].items():
+        if column not in df.columns:
+            continue
+        ids = df[column].notna() & days.notna()
+        index, rank = register_updates(hash_values(df.loc[ids, column]))
+        slices = [('', pd.Series('', index=df.index))]
+        slices += [(d, df[d].astype(str).where(df[d].notna())) for d in spec['dimensions'] if d in df.columns]
+        for dimension, labels in slices:
+            keep = labels[ids].notna().to_numpy()
+            groups = pd.MultiIndex.from_arrays([labels[ids][keep], days[ids][keep]])
+            codes, keys = pd.factorize(groups)
+            registers = np.zeros((len(keys), REGISTERS), dtype=np.uint8)
+            np.maximum.at(registers, (codes, index[keep]), rank[keep])
+            for (value, day), row in zip(keys, registers):
+                sketches[(metric, dimension, value, day)] = row
+    return sketches
+
+
+class SketchStore:
+    def __init__(self, engine):
+        self.engine = engine
+        self.stream = StreamingReader(engine)
+
+    # ---------- maintenance ----------
+
+    def merge(self, sketches: dict, conn=None) -> int:
+        """Union sketches into the stored ones (one transaction, existing rows locked)"""
+        if not sketches:
+            return 0
+        metrics = sorted({key[0] for key in sketches})
+        days = sorted({key[3] for key in sketches})
+        owned = conn is None
+        with self.engine.begin() if owned else nullcontext(conn) as conn:
+            for row in conn.execute(text(LOCK_SKETCHES_QUERY), {'metrics': metrics, 'days': days}):
+                key = (row.metric, row.dimension, row.value, row.day)
+                if key in sketches:
+                    stored = np.frombuffer(bytes(row.registers), dtype=np.uint8)
+                    sketches[key] = np.maximum(sketches[key], stored)
+            conn.execute(text(UPSERT_SKETCH_QUERY), [
+                {'metric': metric, 'dimension': dimension, 'value': value, 'day': day,
+                 'registers': registers.tobytes()}
+                for (metric, dimension, value, day), registers in sketches.items()
+            ])
+            if owned:
+                bump_data_version(conn, 'daily_distinct_sketches')
+        return len(sketches)
+
+    def track_load(self, df: pd.DataFrame, table_name: str, conn=None) -> int:
+        """
+        Merge the sketches of a freshly loaded frame (inside conn's transaction when given)
+
+        Returns:
+            int: Number of (metric, slice, day) sketches written (0 for other tables)
+        """
+        return self.merge(build_sketches(df, table_name), conn=conn)
+
+    def clear(self, table_name: str, conn=None) -> None:
+        """Drop the sketches fed by a table (inside conn's transaction when given)"""
+        metrics = list(SKETCHES.get(table_name, {}).get('metrics', {}))
+        if not metrics:
+            return
+        query = text("DELETE FROM daily_distinct_sketches WHERE metric = ANY(:metrics)")
+        if conn is not None:
+            conn.execute(query, {'metrics': metrics})
+            return
+        with self.engine.begin() as conn:
+            conn.execute(query, {'metrics': metrics})
+            bump_data_version(conn, 'daily_distinct_sketches')
+
+    def rebuild(self, tables: list = None, batch_size: int = 500000) -> int:
+        """Recompute sketches from the source tables, streamed in batches"""
+        written = 0
+        for table_name in tables or list(SKETCHES):
+            spec = SKETCHES[table_name]
+            columns = [spec['day']] + sorted(set(spec['metrics'].values())) + spec['dimensions']
+            self.clear(table_name)
+            quoted = ', '.join(f'"{column}"' for column in columns)
+            sql = f"SELECT {quoted} FROM {table_name}"
+            for batch in self.stream.iter_batches(sql, batch_size=batch_size):
+                written += self.track_load(batch, table_name)
+            logger.info(f"✅ Rebuilt distinct sketches for {table_name}")
+        return written
+
+    # ---------- queries ----------
+
+    def _slice(self, metric: str, filters: dict) -> tuple:
+        if metric not in METRIC_SOURCES:
+            raise ValueError(f"Unknown sketch metric '{metric}', expected one of {list(METRIC_SOURCES)}")
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        if not filters:
+            return '', ['']
+        if len(filters) > 1:
+            raise ValueError(f"Sketches are sliced by one dimension at a time, got {list(filters)}")
+        dimension, values = next(iter(filters.items()))
+        if dimension not in SKETCHES[METRIC_SOURCES[metric]]['dimensions']:
+            raise ValueError(f"'{metric}' sketches are not sliced by '{dimension}'")
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        return dimension, [str(v) for v in values]
+
+    def load(self, metric: str, start_date=None, end_date=None, filters: dict = None) -> tuple:
+        """
+        Day-level sketches of one slice (values of a multi-value filter unioned)
+
+        Returns:
+            (days, registers): DatetimeIndex and a (days x 4096) uint8 array
+        """
+        dimension, values = self._slice(metric, filters)
+        params = {
+            'metric': metric, 'dimension': dimension, 'values': values,
+            'start_date': pd.Timestamp(start_date or '1900-01-01').date(),
+            'end_date': pd.Timestamp(end_date or '2999-12-31').date(),
+        }
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(SLICE_SKETCHES_QUERY), params).fetchall()
+        if not rows:
+            return pd.DatetimeIndex([]), np.zeros((0, REGISTERS), dtype=np.uint8)
+        days, codes = np.unique(pd.to_datetime([row.day for row in rows]), return_inverse=True)
+        registers = np.zeros((len(days), REGISTERS), dtype=np.uint8)
+        for code, row in zip(codes, rows):
+            np.maximum(registers[code], np.frombuffer(bytes(row.registers), dtype=np.uint8), out=registers[code])
+        return pd.DatetimeIndex(days), registers
+
+    def count(self, metric: str, start_date=None, end_date=None, filters: dict = None) -> float:
+        """
+        Estimated distinct count over a date range (inclusive) and optional slice
+
+        Args:
+            metric: 'customers', 'visitors' or 'sessions'
+            start_date: First day (inclusive, optional)
+            end_date: Last day (inclusive, optional)
+            filters: {dimension: value or list of values}, one dimension
+
+        Returns:
+            float: Estimate, within RELATIVE_ERROR (one standard error)
+        """
+        _, registers = self.load(metric, start_date, end_date, filters)
+        if not len(registers):
+            return 0.0
+        return float(estimate(registers.max(axis=0))[0])
+
+    def series(self, metric: str, grain: str = 'day', start_date=None, end_date=None,
+               filters: dict = None) -> pd.DataFrame:
+        """
+        Estimated distinct count per calendar period (DAU / WAU / MAU)
+
+        Returns:
+            pd.DataFrame: period, <metric>
+        """
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown grain '{grain}', expected one of {GRAINS}")
+        days, registers = self.load(metric, start_date, end_date, filters)
+        periods = days.to_period({'day': 'D', 'week': 'W-SUN', 'month': 'M'}[grain]).start_time
+        codes, uniques = pd.factorize(periods, sort=True)
+        merged = np.zeros((len(uniques), REGISTERS), dtype=np.uint8)
+        np.maximum.at(merged, codes, registers)
+        return pd.DataFrame({'period': uniques, metric: estimate(merged)})
+
+    def rolling(self, metric: str, window: int = 30, start_date=None, end_date=None,
+                filters: dict = None) -> pd.DataFrame:
+        """
+        Estimated distinct count over the trailing `window` days ending on each day
+
+        Returns:
+            pd.DataFrame: day, <metric>
+        """
+        first = pd.Timestamp(start_date) - pd.Timedelta(days=window - 1) if start_date is not None else None
+        days, registers = self.load(metric, first, end_date, filters)
+        if not len(days):
+            return pd.DataFrame({'day': pd.DatetimeIndex([]), metric: []})
+        # Calendar-complete grid so the window counts days, not rows
+        calendar = pd.date_range(days[0], days[-1], freq='D')
+        grid = np.zeros((len(calendar), REGISTERS), dtype=np.uint8)
+        grid[calendar.get_indexer(days)] = registers
+        padded = np.concatenate([np.zeros((window - 1, REGISTERS), dtype=np.uint8), grid])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0).max(axis=2)
+        df = pd.DataFrame({'day': calendar, metric: estimate(windows)})
+        if start_date is not None:
+            df = df[df['day'] >= pd.Timestamp(start_date)].reset_index(drop=True)
+        return df
@@ -0,0 +1,113 @@
+# src/database/table_stats.py
+"""
+Table statistics service.
+
+Row counts come from the planner statistics (pg_class.reltuples scaled to the
+current relation size, falling back to pg_stat_user_tables.n_live_tup) so they
+return in milliseconds regardless of table size. Exact COUNT(*) is opt-in.
+Column metadata from information_schema is cached per instance.
+"""
+from sqlalchemy import text
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Same estimate the planner uses: tuple density from the last ANALYZE times the
+# number of pages the relation has now. Never-analyzed tables fall back to the
+# live-tuple counter maintained by the statistics collector. Partitioned tables
+# have no storage of their own, so leaf estimates are summed up to their root.
+ESTIMATED_COUNTS_QUERY = """
+SELECT
+    root.relname AS table_name,
+    SUM(CASE
+        WHEN c.reltuples >= 0 AND c.relpages > 0
+        THEN (c.reltuples / c.relpages)
+             * (pg_relation_size(c.oid) / current_setting('block_size')::int)
+        ELSE COALESCE(s.n_live_tup, 0)
+    END)::bigint AS row_count
+FROM pg_class c
+JOIN pg_class root ON root.oid = COALESCE(pg_partition_root(c.oid), c.oid)
+JOIN pg_namespace n ON n.oid = root.relnamespace
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+WHERE n.nspname = current_schema()
+AND c.relkind = 'r'
+AND root.relname = ANY(:tables)
+GROUP BY root.relname
+"""
+
+COLUMNS_QUERY = """
+SELECT column_name, data_type, numeric_precision, numeric_scale, character_maximum_length
+FROM information_schema.columns
+WHERE table_schema = current_schema()
+AND table_name = :table_name
+ORDER BY ordinal_position
+"""
+
+
+def _pg_type(data_type: str, precision, scale, max_length) -> str:
+    """Rebuild a full type name (e.g. 'numeric(10,2)') from information_schema"""
+    if data_type == 'numeric' and precision is not None:
+        return f"numeric({precision},{scale or 0})"
+    if data_type in ('character varying', 'character') and max_length is not None:
+        return f"{data_type}({max_length})"
+    return data_type
+
+
+class TableStatistics:
+    def __init__(self, engine):
+        self.engine = engine
+        self._columns = {}
+
+    def row_counts(self, tables: list, exact: bool = False) -> dict:
+        """
+        Row counts for several tables
+
+        Args:
+            tables: Table names
+            exact: Run COUNT(*) per table instead of reading statistics
+
+        Returns:
+            dict: table_name -> row count (tables that don't exist are omitted)
+        """
+        with self.engine.connect() as conn:
+            if exact:
+                counts = {}
+                for table_name in tables:
+                    counts[table_name] = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()
+                return counts
+
+            result = conn.execute(text(ESTIMATED_COUNTS_QUERY), {'tables': list(tables)})
+            estimates = {row[0]: int(row[1]) for row in result}
+
+        return {table_name: estimates[table_name] for table_name in tables if table_name in estimates}
+
+    def row_count(self, table_name: str, exact: bool = False) -> int:
+        """Row count for one table (None if the table doesn't exist)"""
+        return self.row_counts([table_name], exact=exact).get(table_name)
+
+    def get_columns(self, table_name: str) -> list:
+        """Cached column metadata: [{'name', 'data_type', 'pg_type'}, ...]"""
+        if table_name not in self._columns:
+            with self.engine.connect() as conn:
+                result = conn.execute(text(COLUMNS_QUERY), {'table_name': table_name})
+                self._columns[table_name] = [
+                    {
+                        'name': row[0],
+                        'data_type': row[1],
+                        'pg_type': _pg_type(row[1], row[2], row[3], row[4])
+                    }
+                    for row in result
+                ]
+        return self._columns[table_name]
+
+    def column_types(self, table_name: str) -> dict:
+        """Column name -> full PostgreSQL type, e.g. for binary COPY"""
+        return {col['name']: col['pg_type'] for col in self.get_columns(table_name)}
+
+    def invalidate(self, table_name: str = None):
+        """Forget cached column metadata (after DDL changes)"""
+        if table_name is None:
+            self._columns.clear()
+        else:
+            self._columns.pop(table_name, None)
@@ -0,0 +1,122 @@
+# src/etl/compact_encoding.py
+"""
+Load-side encoding for the compact fact schema (src/database/schema_compact.sql).
+
+Enum columns are found from the catalog, so the same loader works against
+either schema: with the standard schema there is nothing to encode. Labels a
+frame brings that the enum does not have yet are added before the load
+(ALTER TYPE ... ADD VALUE, committed on its own so the COPY can use them).
+Opaque identifiers stored as uuid (session_id) keep UUID-shaped values and
+map anything else to a stable uuid5, so the same source id always lands on the
+same uuid.
+"""
+import uuid
+import pandas as pd
+from sqlalchemy import text
+import logging
+from src.database.table_stats import TableStatistics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ENUM_COLUMNS_QUERY = """
+SELECT a.attname AS column_name, t.typname AS type_name,
+       array_agg(e.enumlabel::text ORDER BY e.enumsortorder) AS labels
+FROM pg_attribute a
+JOIN pg_type t ON t.oid = a.atttypid
+JOIN pg_enum e ON e.enumtypid = t.oid
+WHERE a.attrelid = to_regclass(:table_name)
+AND a.attnum > 0 AND NOT a.attisdropped
+GROUP BY a.attname, t.typname
+"""
+
+# table -> identifier columns that may hold non-UUID source ids
+DERIVED_UUID_COLUMNS = {
+    'events': ['session_id'],
+}
+
+# Fixed namespace so derived ids are stable across loads
+ID_NAMESPACE = uuid.UUID('8f0c6d3e-4b7a-5c1e-9d2f-6a3b8e1c4d70')
+
+UUID_PATTERN = r'^[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}$'
+
+# PostgreSQL limit on enum label length (NAMEDATALEN - 1)
+MAX_LABEL_BYTES = 63
+
+
+def derive_uuid(values: pd.Series) -> pd.Series:
+    """Keep UUID-shaped values, map any other non-null id to uuid5(ID_NAMESPACE, id)"""
+    as_text = values.astype(str).where(values.notna())
+    is_uuid = as_text.str.match(UUID_PATTERN, na=False)
+    other = as_text.notna() & ~is_uuid
+    if not other.any():
+        return values
+    # Map each distinct id once
+    mapping = {value: str(uuid.uuid5(ID_NAMESPACE, value)) for value in as_text[other].unique()}
+    result = as_text.copy()
+    result[other] = as_text[other].map(mapping)
+    return result
+
+
+class CompactEncoder:
+    def __init__(self, engine, stats: TableStatistics = None):
+        self.engine = engine
+        self.stats = stats or TableStatistics(engine)
+        self._enums = {}
+
+    def enum_columns(self, table_name: str) -> dict:
+        """Cached enum columns of a table: column -> {'type': type name, 'labels': set}"""
+        if table_name not in self._enums:
+            with self.engine.connect() as conn:
+                result = conn.execute(text(ENUM_COLUMNS_QUERY), {'table_name': table_name})
+                self._enums[table_name] = {
+                    row.column_name: {'type': row.type_name, 'labels': set(row.labels)}
+                    for row in result
+                }
+        return self._enums[table_name]
+
+    def _add_labels(self, type_name: str, labels: list):
+        too_long = [label for label in labels if len(label.encode('utf-8')) > MAX_LABEL_BYTES]
+        if too_long:
+            raise ValueError(f"Labels too long for enum {type_name}: {too_long}")
+        # ADD VALUE cannot be used in the transaction that adds it, so commit first
+        with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            for label in labels:
+                conn.exec_driver_sql(
+                    f"ALTER TYPE {type_name} ADD VALUE IF NOT EXISTS %s", (label,)
+                )
+        logger.info(f"✅ Added {len(labels)} label(s) to enum {type_name}: {labels[:5]}")
+
+    def encode(self, df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+        """
+        Prepare a frame for a table in the compact layout (no-op for the standard layout)
+
+        Args:
+            df: Rows about to be loaded
+            table_name: Target table
+
+        Returns:
+            pd.DataFrame: The frame, with derived uuid columns mapped
+        """
+        enums = self.enum_columns(table_name)
+        for column, enum in enums.items():
+            if column not in df.columns:
+                continue
+            present = df[column].dropna().astype(str).unique()
+            missing = sorted(set(present) - enum['labels'])
+            if missing:
+                self._add_labels(enum['type'], missing)
+                # Columns sharing the type (country_name) see the new labels too
+                for cached in self._enums.values():
+                    for other in cached.values():
+                        if other['type'] == enum['type']:
+                            other['labels'].update(missing)
+
+        column_types = self.stats.column_types(table_name)
+        derived = [c for c in DERIVED_UUID_COLUMNS.get(table_name, [])
+                   if c in df.columns and column_types.get(c) == 'uuid']
+        if derived:
+            df = df.copy()
+            for column in derived:
+                df[column] = derive_uuid(df[column])
+        return df
@@ -16,6 +16,8 @@ import logging
 
 import os
 
+from src.etl.keys import KEY_FORMATS, new_key
+
 
 
 logging.basicConfig(level=logging.INFO)
@@ -26,7 +28,7 @@ logger = logging.getLogger(__name__)
 
 class EcommerceDataGenerator:
 
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, key_format: str = None):
 
         self.fake = Faker()
 
@@ -38,6 +40,16 @@ class EcommerceDataGenerator:
 
         
 
+        # Key format for users/orders/events: 'uuid4' (random, default) or 'uuid7' (time-ordered, opt-in)
+
+        self.key_format = key_format or os.getenv('ETL_KEY_FORMAT', 'uuid4')
+
+        if self.key_format not in KEY_FORMATS:
+
+            raise ValueError(f"Unknown key format '{self.key_format}', expected one of {KEY_FORMATS}")
+
+        
+
         # Predefine some realistic values
 
         self.countries = ['USA', 'UK', 'Canada', 'Australia', 'Germany', 'France', 'Japan', 'Brazil']
@@ -186,7 +198,7 @@ class EcommerceDataGenerator:
 
             user_data = {
 
-                'user_id': str(uuid.uuid4()),
+                'user_id': new_key(self.key_format, signup_date),
 
                 'email': email,
 
@@ -382,7 +394,7 @@ class EcommerceDataGenerator:
 
             order_data = {
 
-                'order_id': str(uuid.uuid4()),
+                'order_id': new_key(self.key_format, order_date),
 
                 'user_id': user_id,
 
@@ -550,7 +562,7 @@ class EcommerceDataGenerator:
 
             events.append({
 
-                'event_id': str(uuid.uuid4()),
+                'event_id': new_key(self.key_format, row['timestamp']),
 
                 'user_id': row['user_id'],
 
@@ -586,7 +598,7 @@ class EcommerceDataGenerator:
 
             event_data = {
 
-                'event_id': str(uuid.uuid4()),
+                'event_id': new_key(self.key_format, timestamp),
 
                 'user_id': user_id,
 
@@ -7,6 +7,7 @@ import logging
 import os
 from dotenv import load_dotenv
 from .data_generator import EcommerceDataGenerator  # Reuse base generator
+from .keys import new_key
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -56,7 +57,7 @@ def generate_daily_events(target_date: datetime, n_users: int = 50, n_events: in
             product_id = np.random.choice(product_ids)
         
         events.append({
-            'event_id': str(uuid.uuid4()),
+            'event_id': new_key(generator.key_format, event_time),
             'user_id': user_id,
             'event_type': event_type,
             'product_id': product_id,
@@ -79,11 +80,11 @@ def generate_daily_events(target_date: datetime, n_users: int = 50, n_events: in
             user_purchases = purchases[purchases['user_id'] == user_id]
             
             # Create one order per user per day (simplified)
-            order_id = str(uuid.uuid4())
             order_date = target_date.replace(
                 hour=np.random.randint(9, 21),
                 minute=np.random.randint(0, 60)
             )
+            order_id = new_key(generator.key_format, order_date)
             
             # Calculate order total
             order_total = 0
@@ -5,21 +5,53 @@ import os
 from dotenv import load_dotenv
 import logging
 from datetime import datetime
+from src.etl.pgcopy import COPY_ENCODINGS, copy_dataframe
+from src.etl.compact_encoding import CompactEncoder
+from src.etl.sessionization import Sessionizer
+from src.analytics.market_basket import MarketBasketEngine
+from src.database.table_stats import TableStatistics
+from src.database.partitions import PartitionManager
+from src.database.matviews import MaterializedViewManager
+from src.database.rollups import RollupManager
+from src.database.activity import UserActivityTracker
+from src.database.sketches import SketchStore
+from src.database.data_version import bump_data_version
+from src.etl.preload_validation import PreloadValidator
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Rows per COPY statement; keeps the encoded buffer bounded for large frames
+COPY_CHUNK_ROWS = 100000
+
 class DataLoader:
-    def __init__(self):
+    def __init__(self, *, encoding: str = None):
         # Create SQLAlchemy engine
         self.db_url = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@" \
                  f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
         self.engine = create_engine(self.db_url, pool_size=10, max_overflow=20, connect_args={"sslmode": "disable"})
+        
+        # Load encoding: 'to_sql' (INSERT), 'text' (CSV COPY) or 'binary' (PGCOPY)
+        self.encoding = encoding or os.getenv('ETL_LOAD_ENCODING', 'to_sql')
+        if self.encoding not in COPY_ENCODINGS:
+            raise ValueError(f"Unknown load encoding '{self.encoding}', expected one of {COPY_ENCODINGS}")
+        self.stats = TableStatistics(self.engine)
+        self.partitions = PartitionManager(self.engine)
+        self.validator = PreloadValidator(self.engine)
+        self.matviews = MaterializedViewManager(self.engine)
+        self.rollups = RollupManager(self.engine)
+        self.activity = UserActivityTracker(self.engine)
+        self.sketches = SketchStore(self.engine)
+        self.sessions = Sessionizer(self.engine)
+        self.basket = MarketBasketEngine(self.engine)
+        self.compact = CompactEncoder(self.engine, self.stats)
+        self.rejects = {}
     
     def load_dataframe(self, df: pd.DataFrame, table_name: str, 
-                      if_exists: str = 'append', chunk_size: int = 100) -> bool:
+                      if_exists: str = 'append', chunk_size: int = 100,
+                      encoding: str = None) -> bool:
         """
         Load a DataFrame to PostgreSQL table
         
@@ -27,34 +59,88 @@ class DataLoader:
             df: DataFrame to load
             table_name: Target table name
             if_exists: 'fail', 'replace', or 'append'
-            chunk_size: Number of rows to insert at once
+            chunk_size: Number of rows to insert at once (to_sql only)
+            encoding: Override the loader encoding for this call
         
         Returns:
             bool: Success status
         """
+        encoding = encoding or self.encoding
         try:
             # Add load timestamp
             if 'loaded_at' not in df.columns:
                 df['loaded_at'] = datetime.now()
             
-            logger.info(f"Loading {len(df)} rows to {table_name}...")
+            logger.info(f"Loading {len(df)} rows to {table_name} ({encoding})...")
+            
+            # Compact schema: register new enum labels, map non-UUID session ids
+            df = self.compact.encode(df, table_name)
             
-            # Use to_sql with chunking for large datasets
-            # Don't use method='multi' with PostgreSQL - use default insertion
-            df.to_sql(
-                table_name,
-                self.engine,
-                if_exists=if_exists,
-                index=False,
-                chunksize=chunk_size
-            )
+            # Write straight into monthly partitions (creating them as needed)
+            # so the server skips tuple routing through the parent
+            if if_exists == 'append':
+                targets = self.partitions.route(df, table_name)
+            else:
+                targets = [(table_name, df)]
+            
+            # One transaction for the rows, the derived state that cannot be
+            # recovered later (rollup dirty days, user-month activity, distinct
+            # sketches, sessions, basket counts) and the data version bump: a
+            # failure there must fail the load, or the derived tables would
+            # stay wrong for good
+            with self.engine.begin() as conn:
+                # order_id uniqueness and item parents (not declarable on the partitioned schema)
+                self.validator.enforce_keys(conn, df, table_name, append=(if_exists == 'append'))
+                if encoding == 'to_sql' or if_exists != 'append':
+                    # Use to_sql with chunking for large datasets
+                    # Don't use method='multi' with PostgreSQL - use default insertion
+                    for target, frame in targets:
+                        frame.to_sql(
+                            target,
+                            conn,
+                            if_exists=if_exists,
+                            index=False,
+                            chunksize=chunk_size
+                        )
+                else:
+                    self._copy_dataframe(conn, targets, table_name, encoding)
+                
+                # Queue the days this load touched for the daily rollups
+                self.rollups.track_load(df, table_name, conn=conn)
+                # Upsert the user-months it touched for the cohort engine
+                self.activity.track_load(df, table_name, conn=conn)
+                # Merge its distinct-user sketches (stored rows locked FOR UPDATE)
+                self.sketches.track_load(df, table_name, conn=conn)
+                # Re-sessionize the tail of each user it touched
+                self.sessions.track_load(df, table_name, conn=conn)
+                # Add its orders' item pairs to the market-basket counts
+                self.basket.track_load(df, table_name, conn=conn)
+                bump_data_version(conn, table_name)
             
             logger.info(f"✅ Successfully loaded {len(df)} rows to {table_name}")
-            return True
             
         except Exception as e:
             logger.error(f"❌ Failed to load data to {table_name}: {e}")
             return False
+        
+        return True
+    
+    def _copy_dataframe(self, conn, targets: list, table_name: str, encoding: str):
+        """COPY (target, frame) pairs inside conn's transaction, chunked to bound memory"""
+        column_types = self.get_column_types(table_name) if encoding == 'binary' else None
+        # The DBAPI connection behind conn, so COPY joins the caller's transaction
+        with conn.connection.cursor() as cur:
+            for target, df in targets:
+                for start in range(0, len(df), COPY_CHUNK_ROWS):
+                    chunk = df.iloc[start:start + COPY_CHUNK_ROWS]
+                    copy_dataframe(cur, chunk, target, encoding, column_types)
+    
+    def get_column_types(self, table_name: str) -> dict:
+        """Column name -> PostgreSQL type for a table (cached per loader)"""
+        column_types = dict(self.stats.column_types(table_name))
+        # Enum values travel as their label text in binary COPY
+        column_types.update({column: 'text' for column in self.compact.enum_columns(table_name)})
+        return column_types
     
     def load_from_csv(self, csv_path: str, table_name: str, 
                      if_exists: str = 'append') -> bool:
@@ -95,48 +181,56 @@ class DataLoader:
             with self.engine.connect() as conn:
                 # Use DELETE FROM for PostgreSQL (TRUNCATE IF EXISTS not supported)
                 conn.execute(text(f"DELETE FROM {table_name}"))
+                # Derived state goes in the same transaction; the navigator
+                # would otherwise keep serving rollups of the deleted rows
+                self.rollups.clear(table_name, conn=conn)
+                self.sketches.clear(table_name, conn=conn)
+                self.sessions.clear(table_name, conn)
+                self.basket.clear(table_name, conn)
+                bump_data_version(conn, table_name)
                 conn.commit()
+                # The table is empty, so its keys no longer need a lookup
+                self.validator.truncated(table_name)
                 logger.info(f"✅ Cleared table: {table_name}")
                 return True
         except Exception as e:
             logger.error(f"❌ Failed to clear {table_name}: {e}")
             return False
     
-    def get_table_info(self, table_name: str) -> dict:
-        """Get information about a table"""
+    def get_table_info(self, table_name: str, exact: bool = False) -> dict:
+        """
+        Get information about a table
+        
+        Row counts are estimated from planner statistics unless exact=True;
+        column metadata is cached after the first lookup.
+        """
         try:
-            with self.engine.connect() as conn:
-                # Get row count
-                count_result = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
-                row_count = count_result.fetchone()[0]
-                
-                # Get column names
-                columns_result = conn.execute(
-                    text(f"""
-                    SELECT column_name, data_type 
-                    FROM information_schema.columns 
-                    WHERE table_name = '{table_name}'
-                    ORDER BY ordinal_position
-                    """)
-                )
-                columns = [f"{row[0]} ({row[1]})" for row in columns_result]
-                
-                return {
-                    'table': table_name,
-                    'row_count': row_count,
-                    'columns': columns
-                }
+            row_count = self.stats.row_count(table_name, exact=exact)
+            if row_count is None:
+                raise ValueError(f"Table {table_name} does not exist")
+            
+            columns = [f"{col['name']} ({col['data_type']})" for col in self.stats.get_columns(table_name)]
+            
+            return {
+                'table': table_name,
+                'row_count': row_count,
+                'row_count_exact': exact,
+                'columns': columns
+            }
         except Exception as e:
             logger.error(f"❌ Failed to get info for {table_name}: {e}")
             return {}
     
-    def run_etl_pipeline(self, data_dict: dict, truncate_first: bool = True) -> bool:
+    def run_etl_pipeline(self, data_dict: dict, truncate_first: bool = True,
+                         validate: bool = True, refresh_views: bool = True) -> bool:
         """
         Run complete ETL pipeline
         
         Args:
             data_dict: Dictionary of table_name: DataFrame pairs
             truncate_first: Whether to truncate tables before loading
+            validate: Drop rows failing pre-load validation (kept in self.rejects)
+            refresh_views: Refresh the KPI materialized views after a successful load
         
         Returns:
             bool: Overall success status
@@ -147,6 +241,9 @@ class DataLoader:
         load_order = ['users', 'products', 'orders', 'order_items', 'events']
         
         all_success = True
+        self.rejects = {}
+        if truncate_first:
+            self.validator.reset()
         
         for table_name in load_order:
             if table_name in data_dict:
@@ -156,9 +253,18 @@ class DataLoader:
                 if truncate_first:
                     self.truncate_table(table_name)
                 
+                # Validate in memory so bad rows never reach the database
+                if validate:
+                    df, rejects = self.validator.validate(df, table_name)
+                    if not rejects.empty:
+                        self.rejects[table_name] = rejects
+                
                 # Load data
                 success = self.load_dataframe(df, table_name, if_exists='append')
                 
+                if success and validate:
+                    self.validator.register_loaded(df, table_name)
+                
                 if not success:
                     all_success = False
                     logger.error(f"❌ ETL pipeline failed at table: {table_name}")
@@ -167,14 +273,35 @@ class DataLoader:
         if all_success:
             logger.info("✅ ETL pipeline completed successfully!")
             
-            # Print summary
+            # Recompute only the days touched by this load (everything for
+            # rollups whose source tables were truncated), then the KPI views
+            try:
+                truncated = self.rollups.rollups_for(data_dict) if truncate_first else []
+                if truncated:
+                    self.rollups.rebuild(truncated)
+                self.rollups.refresh_dirty()
+            except Exception as e:
+                logger.error(f"❌ Failed to refresh daily rollups: {e}")
+            if truncate_first and 'orders' in data_dict:
+                try:
+                    self.activity.rebuild()
+                except Exception as e:
+                    logger.error(f"❌ Failed to rebuild user activity: {e}")
+            if refresh_views:
+                self.matviews.refresh()
+            
+            # Print summary (estimated counts, one statistics query for all tables)
             print("\n📊 ETL Pipeline Summary:")
             print("-" * 40)
-            for table_name in load_order:
-                if table_name in data_dict:
-                    info = self.get_table_info(table_name)
-                    if info:
-                        print(f"{table_name:15} | {info['row_count']:>8} rows")
+            try:
+                counts = self.stats.row_counts([t for t in load_order if t in data_dict])
+            except Exception as e:
+                logger.warning(f"⚠️ Could not read table statistics: {e}")
+                counts = {}
+            for table_name, row_count in counts.items():
+                print(f"{table_name:15} | ~{row_count:>8} rows")
+            for table_name, rejects in self.rejects.items():
+                print(f"{table_name:15} | {len(rejects):>9} rejected")
         else:
             logger.error("❌ ETL pipeline failed!")
         
@@ -1,45 +1,42 @@
 # src/etl/data_quality.py
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 from src.database.connection import db
+from src.database.query_catalog import QueryCatalog, quality_query
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Required (NOT NULL) columns per table, shared with the pre-load validator
+REQUIRED_COLUMNS = {
+    'users': ['user_id', 'email', 'signup_date'],
+    'products': ['product_id', 'name', 'price'],
+    'orders': ['order_id', 'user_id', 'order_date', 'total_amount'],
+    'events': ['event_id', 'user_id', 'event_type', 'timestamp']
+}
+
 class DataQualityChecker:
     def __init__(self):
-        pass
+        self.catalog = QueryCatalog(db.get_engine())
     
     def check_nulls(self, table_name: str, date_column: str = None, date_value: datetime = None):
         """Check for null values in required columns"""
         checks = []
         
-        # Define required columns for each table
-        required_columns = {
-            'users': ['user_id', 'email', 'signup_date'],
-            'products': ['product_id', 'name', 'price'],
-            'orders': ['order_id', 'user_id', 'order_date', 'total_amount'],
-            'events': ['event_id', 'user_id', 'event_type', 'timestamp']
-        }
+        required_columns = REQUIRED_COLUMNS
         
         if table_name not in required_columns:
             return [{'table': table_name, 'check': 'null_check', 'status': 'SKIPPED', 'message': 'Table not configured'}]
         
-        with db.get_connection() as conn:
+        with db.get_engine().connect() as conn:
             for column in required_columns[table_name]:
-                # Build query
-                query = f"""
-                SELECT COUNT(*) as null_count
-                FROM {table_name}
-                WHERE {column} IS NULL
-                """
-                
+                # One catalog entry per column (and date column); the day is a bound parameter
                 if date_column and date_value:
-                    query += f" AND {date_column} >= '{date_value.date()}' AND {date_column} < '{date_value.date() + timedelta(days=1)}'"
-                
-                result = pd.read_sql_query(query, conn)
-                null_count = result['null_count'].iloc[0]
+                    name = quality_query('nulls', table_name, column, date_column=date_column)
+                    null_count = self.catalog.scalar(name, {'day': date_value.date()}, conn=conn)
+                else:
+                    null_count = self.catalog.scalar(quality_query('nulls', table_name, column), conn=conn)
                 
                 check = {
                     'table': table_name,
@@ -58,13 +55,8 @@ class DataQualityChecker:
     
     def check_data_freshness(self, table_name: str, date_column: str):
         """Check if data is fresh (most recent date is today or yesterday)"""
-        with db.get_connection() as conn:
-            query = f"""
-            SELECT MAX({date_column}) as latest_date
-            FROM {table_name}
-            """
-            result = pd.read_sql_query(query, conn)
-            latest_date = result['latest_date'].iloc[0]
+        with db.get_engine().connect() as conn:
+            latest_date = self.catalog.scalar(quality_query('freshness', table_name, date_column), conn=conn)
             
             if pd.isna(latest_date):
                 return {
@@ -94,14 +86,8 @@ class DataQualityChecker:
     
     def check_value_ranges(self, table_name: str, column: str, min_val=None, max_val=None):
         """Check if column values are within expected range"""
-        with db.get_connection() as conn:
-            conditions = []
-            if min_val is not None:
-                conditions.append(f"{column} < {min_val}")
-            if max_val is not None:
-                conditions.append(f"{column} > {max_val}")
-            
-            if not conditions:
+        with db.get_engine().connect() as conn:
+            if min_val is None and max_val is None:
                 return {
                     'table': table_name,
                     'check': 'range_check',
@@ -109,15 +95,9 @@ class DataQualityChecker:
                     'message': 'No range specified'
                 }
             
-            where_clause = " OR ".join(conditions)
-            query = f"""
-            SELECT COUNT(*) as outlier_count
-            FROM {table_name}
-            WHERE {where_clause}
-            """
-            
-            result = pd.read_sql_query(query, conn)
-            outlier_count = result['outlier_count'].iloc[0]
+            # A NULL bound compares as unknown, so an open side never matches
+            outlier_count = self.catalog.scalar(quality_query('range', table_name, column),
+                                                {'min_val': min_val, 'max_val': max_val}, conn=conn)
             
             status = 'PASS' if outlier_count == 0 else 'FAILED'
             message = f'Found {outlier_count} outliers' if outlier_count > 0 else 'No outliers'
@@ -138,16 +118,9 @@ class DataQualityChecker:
     
     def check_referential_integrity(self, parent_table: str, child_table: str, fk_column: str):
         """Check referential integrity between tables"""
-        with db.get_connection() as conn:
-            query = f"""
-            SELECT COUNT(*) as orphan_count
-            FROM {child_table} c
-            LEFT JOIN {parent_table} p ON c.{fk_column} = p.{fk_column.split('.')[-1]}
-            WHERE p.{fk_column.split('.')[-1]} IS NULL
-            """
-            
-            result = pd.read_sql_query(query, conn)
-            orphan_count = result['orphan_count'].iloc[0]
+        with db.get_engine().connect() as conn:
+            name = quality_query('orphans', child_table, fk_column.split('.')[-1], parent_table=parent_table)
+            orphan_count = self.catalog.scalar(name, conn=conn)
             
             status = 'PASS' if orphan_count == 0 else 'FAILED'
             message = f'Found {orphan_count} orphan records' if orphan_count > 0 else 'No orphan records'
@@ -0,0 +1,49 @@
+# src/etl/keys.py
+"""
+Primary key generation for synthetic data.
+
+'uuid4' keys are fully random. 'uuid7' keys (RFC 9562) start with a 48-bit
+Unix millisecond timestamp, so keys generated in time order sort in time order
+and appends land on the right-most B-tree leaf instead of a random page.
+"""
+import os
+import uuid
+import pandas as pd
+
+KEY_FORMATS = ('uuid4', 'uuid7')
+
+
+def uuid7(timestamp=None) -> str:
+    """
+    Build a UUIDv7 string
+
+    Args:
+        timestamp: Time to embed (datetime/Timestamp); defaults to now
+
+    Returns:
+        str: Canonical UUID text
+    """
+    if timestamp is None:
+        unix_ms = pd.Timestamp.now().value // 1_000_000
+    else:
+        unix_ms = pd.Timestamp(timestamp).value // 1_000_000
+
+    rand = int.from_bytes(os.urandom(10), 'big')
+    rand_a = rand >> 68                   # 12 bits
+    rand_b = rand & ((1 << 62) - 1)       # 62 bits
+
+    value = (unix_ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76                    # version
+    value |= rand_a << 64
+    value |= 0b10 << 62                   # RFC 4122 variant
+    value |= rand_b
+    return str(uuid.UUID(int=value))
+
+
+def new_key(key_format: str = 'uuid4', timestamp=None) -> str:
+    """Generate one key in the requested format"""
+    if key_format == 'uuid7':
+        return uuid7(timestamp)
+    if key_format == 'uuid4':
+        return str(uuid.uuid4())
+    raise ValueError(f"Unknown key format '{key_format}', expected one of {KEY_FORMATS}")
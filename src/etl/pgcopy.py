@@ -0,0 +1,283 @@
+# src/etl/pgcopy.py
+"""
+COPY encoders for loading DataFrames into PostgreSQL.
+
+'text' streams the frame as CSV. 'binary' packs every column directly into the
+PGCOPY wire format with vectorized NumPy writes, so the server does not have to
+parse decimals, timestamps and UUIDs row by row.
+"""
+import io
+import struct
+import numpy as np
+import pandas as pd
+
+COPY_ENCODINGS = ('to_sql', 'text', 'binary')
+
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+
+# PostgreSQL stores timestamps and dates relative to 2000-01-01
+PG_EPOCH_US = 946684800 * 1_000_000
+PG_EPOCH_DAYS = 10957
+
+NUMERIC_POS = 0x0000
+NUMERIC_NEG = 0x4000
+# Unconstrained numeric: most decimal places tried when deriving the scale
+NUMERIC_MAX_SCALE = 15
+
+_INT_TYPES = {'smallint': '>i2', 'integer': '>i4', 'bigint': '>i8'}
+_FLOAT_TYPES = {'real': '>f4', 'double precision': '>f8'}
+_TEXT_TYPES = {'text', 'character varying', 'character', 'varchar', 'char'}
+
+
+def _base_type(pg_type: str):
+    """Split 'numeric(10,2)' into ('numeric', [10, 2])"""
+    pg_type = pg_type.strip().lower()
+    if '(' not in pg_type:
+        return pg_type, []
+    base, args = pg_type.split('(', 1)
+    args = [int(a) for a in args.rstrip(')').split(',') if a.strip()]
+    return base.strip(), args
+
+
+def _fixed_width(values: np.ndarray, null_mask: np.ndarray, be_dtype: str):
+    """Encode a fixed-width column as (lengths, payload)"""
+    be = np.dtype(be_dtype)
+    lengths = np.where(null_mask, -1, be.itemsize).astype(np.int32)
+    payload = np.ascontiguousarray(values[~null_mask].astype(be)).view(np.uint8)
+    return lengths, payload
+
+
+def _encode_int(series: pd.Series, be_dtype: str):
+    null_mask = series.isna().to_numpy()
+    values = series.fillna(0).to_numpy().astype(np.int64)
+    return _fixed_width(values, null_mask, be_dtype)
+
+
+def _encode_float(series: pd.Series, be_dtype: str):
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+    return _fixed_width(values, np.isnan(values), be_dtype)
+
+
+def _encode_bool(series: pd.Series):
+    null_mask = series.isna().to_numpy()
+    values = series.fillna(False).to_numpy().astype(bool)
+    return _fixed_width(values, null_mask, '|u1')
+
+
+def _numeric_scale(series: pd.Series) -> int:
+    """
+    Scale for an unconstrained numeric column: the fewest decimal places that
+    represent every value exactly, capped so the scaled values fit an int64.
+    """
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return 0
+    largest = float(np.abs(values).max())
+    limit = NUMERIC_MAX_SCALE
+    while limit > 0 and largest * 10 ** limit >= 2 ** 62:
+        limit -= 1
+    for scale in range(limit + 1):
+        if (np.round(values, scale) == values).all():
+            return scale
+    return limit
+
+
+def _encode_numeric(series: pd.Series, scale: int):
+    """
+    Encode a DECIMAL column from a scaled int64.
+
+    Every value uses the same number of base-10000 digits so the column stays
+    fixed width; PostgreSQL strips the leading/trailing zero digits on receive.
+    """
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+    null_mask = np.isnan(values)
+    scaled = np.round(np.where(null_mask, 0.0, values) * 10 ** scale).astype(np.int64)
+    negative = scaled < 0
+    magnitude = np.abs(scaled)
+
+    int_part = magnitude // 10 ** scale
+    frac_part = magnitude % 10 ** scale
+    frac_groups = -(-scale // 4)
+    frac_part = frac_part * 10 ** (frac_groups * 4 - scale)
+
+    max_int = int(int_part.max()) if len(int_part) else 0
+    int_groups = max(1, -(-len(str(max_int)) // 4))
+
+    n = len(values)
+    digits = np.empty((n, int_groups + frac_groups), dtype=np.int64)
+    for i in range(int_groups):
+        digits[:, int_groups - 1 - i] = (int_part // 10000 ** i) % 10000
+    for i in range(frac_groups):
+        digits[:, int_groups + frac_groups - 1 - i] = (frac_part // 10000 ** i) % 10000
+
+    header = np.empty((n, 4), dtype=np.int64)
+    header[:, 0] = int_groups + frac_groups
+    header[:, 1] = int_groups - 1
+    header[:, 2] = np.where(negative, NUMERIC_NEG, NUMERIC_POS)
+    header[:, 3] = scale
+
+    packed = np.hstack([header, digits]).astype('>i2')[~null_mask]
+    width = packed.shape[1] * 2
+    lengths = np.where(null_mask, -1, width).astype(np.int32)
+    return lengths, np.ascontiguousarray(packed).view(np.uint8).ravel()
+
+
+def _encode_timestamp(series: pd.Series):
+    ts = pd.to_datetime(series)
+    if getattr(ts.dt, 'tz', None) is not None:
+        ts = ts.dt.tz_convert('UTC').dt.tz_localize(None)
+    null_mask = ts.isna().to_numpy()
+    micros = ts.to_numpy(dtype='datetime64[us]').astype(np.int64) - PG_EPOCH_US
+    return _fixed_width(micros, null_mask, '>i8')
+
+
+def _encode_date(series: pd.Series):
+    ts = pd.to_datetime(series)
+    null_mask = ts.isna().to_numpy()
+    days = ts.to_numpy(dtype='datetime64[D]').astype(np.int64) - PG_EPOCH_DAYS
+    return _fixed_width(days, null_mask, '>i4')
+
+
+def _encode_uuid(series: pd.Series):
+    null_mask = series.isna().to_numpy()
+    hex_values = series[~null_mask].astype(str).str.replace('-', '', regex=False)
+    payload = np.frombuffer(bytes.fromhex(''.join(hex_values)), dtype=np.uint8)
+    lengths = np.where(null_mask, -1, 16).astype(np.int32)
+    return lengths, payload
+
+
+def _encode_text(series: pd.Series):
+    null_mask = series.isna().to_numpy()
+    encoded = series[~null_mask].astype(str).str.encode('utf-8')
+    lengths = np.full(len(series), -1, dtype=np.int32)
+    lengths[~null_mask] = encoded.str.len().to_numpy(dtype=np.int32)
+    payload = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return lengths, payload
+
+
+def encode_column(series: pd.Series, pg_type: str):
+    """
+    Encode one column for binary COPY.
+
+    Returns:
+        (lengths, payload): int32 field lengths (-1 for NULL) and the
+        concatenated big-endian payload bytes of the non-null values.
+    """
+    base, args = _base_type(pg_type)
+    if base in _INT_TYPES:
+        return _encode_int(series, _INT_TYPES[base])
+    if base in _FLOAT_TYPES:
+        return _encode_float(series, _FLOAT_TYPES[base])
+    if base in ('numeric', 'decimal'):
+        if not args:
+            return _encode_numeric(series, _numeric_scale(series))
+        return _encode_numeric(series, args[1] if len(args) > 1 else 0)
+    if base.startswith('timestamp'):
+        return _encode_timestamp(series)
+    if base == 'date':
+        return _encode_date(series)
+    if base == 'uuid':
+        return _encode_uuid(series)
+    if base == 'boolean':
+        return _encode_bool(series)
+    if base in _TEXT_TYPES:
+        return _encode_text(series)
+    raise ValueError(f"Binary COPY does not support column type '{pg_type}'")
+
+
+def encode_binary_copy(df: pd.DataFrame, column_types: dict) -> bytes:
+    """
+    Encode a DataFrame as a complete PGCOPY binary stream.
+
+    Args:
+        df: Rows to encode, columns in COPY order
+        column_types: column name -> PostgreSQL type (e.g. 'numeric(10,2)')
+
+    Returns:
+        bytes: Header, one tuple per row and the trailer
+    """
+    n_rows = len(df)
+    if n_rows == 0:
+        return PGCOPY_HEADER + PGCOPY_TRAILER
+    encoded = [encode_column(df[col], column_types[col]) for col in df.columns]
+
+    field_sizes = np.zeros(n_rows, dtype=np.int64)
+    for lengths, _ in encoded:
+        field_sizes += 4 + np.maximum(lengths, 0)
+    row_sizes = 2 + field_sizes
+    row_starts = len(PGCOPY_HEADER) + np.concatenate(([0], np.cumsum(row_sizes)[:-1]))
+    total = len(PGCOPY_HEADER) + int(row_sizes.sum()) + len(PGCOPY_TRAILER)
+
+    buf = np.empty(total, dtype=np.uint8)
+    buf[:len(PGCOPY_HEADER)] = np.frombuffer(PGCOPY_HEADER, dtype=np.uint8)
+    buf[total - len(PGCOPY_TRAILER):] = np.frombuffer(PGCOPY_TRAILER, dtype=np.uint8)
+
+    field_count = np.frombuffer(struct.pack('>h', len(df.columns)), dtype=np.uint8)
+    buf[row_starts[:, None] + np.arange(2)] = field_count
+
+    offsets = row_starts + 2
+    for lengths, payload in encoded:
+        buf[offsets[:, None] + np.arange(4)] = lengths.astype('>i4').view(np.uint8).reshape(-1, 4)
+        data_starts = offsets + 4
+        sizes = np.maximum(lengths, 0).astype(np.int64)
+        valid = lengths >= 0
+        valid_sizes = sizes[valid]
+        if len(valid_sizes) and (valid_sizes == valid_sizes[0]).all():
+            # Fixed-width column: one 2-D scatter
+            width = int(valid_sizes[0])
+            if width:
+                buf[data_starts[valid][:, None] + np.arange(width)] = payload.reshape(-1, width)
+        elif len(payload):
+            # Variable-width column: scatter every byte to its row's data start
+            value_starts = np.concatenate(([0], np.cumsum(valid_sizes)[:-1]))
+            within = np.arange(len(payload)) - np.repeat(value_starts, valid_sizes)
+            buf[np.repeat(data_starts[valid], valid_sizes) + within] = payload
+        offsets = data_starts + sizes
+
+    return buf.tobytes()
+
+
+def encode_text_copy(df: pd.DataFrame) -> io.StringIO:
+    """Encode a DataFrame as CSV for text COPY (empty unquoted fields are NULL)"""
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False)
+    buf.seek(0)
+    return buf
+
+
+def copy_statement(table_name: str, columns, encoding: str) -> str:
+    """Build the COPY ... FROM STDIN statement for an encoding"""
+    column_list = ', '.join(f'"{col}"' for col in columns)
+    fmt = 'binary' if encoding == 'binary' else 'csv'
+    return f"COPY {table_name} ({column_list}) FROM STDIN WITH (FORMAT {fmt})"
+
+
+def copy_dataframe(cursor, df: pd.DataFrame, table_name: str, encoding: str,
+                   column_types: dict = None) -> int:
+    """
+    COPY a DataFrame into a table through a psycopg2 cursor.
+
+    Args:
+        cursor: psycopg2 cursor (the caller owns the transaction)
+        df: Rows to load
+        table_name: Target table
+        encoding: 'text' or 'binary'
+        column_types: Required for 'binary'; column name -> PostgreSQL type
+
+    Returns:
+        int: Number of rows copied
+    """
+    if encoding == 'binary':
+        missing = [col for col in df.columns if col not in (column_types or {})]
+        if missing:
+            raise ValueError(f"Columns not found in {table_name}: {missing}")
+        stream = io.BytesIO(encode_binary_copy(df, column_types))
+    elif encoding == 'text':
+        stream = encode_text_copy(df)
+    else:
+        raise ValueError(f"Unknown COPY encoding '{encoding}'")
+
+    cursor.copy_expert(copy_statement(table_name, df.columns, encoding), stream)
+    return len(df)
@@ -0,0 +1,291 @@
+# src/etl/preload_validation.py
+"""
+Vectorized pre-load validation for DataFrames.
+
+Runs before rows reach PostgreSQL so a bad batch never fails a load halfway:
+null and range rules use pandas masks, foreign keys are checked against cached
+parent key sets, and duplicate keys are dropped within a frame and against
+the table (the frame's keys looked up by index; after a truncate by this
+loader, a Bloom filter of the keys it loaded clears new keys without a lookup).
+Returns a clean frame plus a reject frame carrying a reject_reason column.
+
+enforce_keys() is the hard counterpart the loader runs inside every load's
+transaction: partitioning moved orders' primary key to (order_id, order_date)
+and dropped the order_items -> orders foreign key, so order_id uniqueness and
+item parents are checked there and a violating load fails as a constraint
+would.
+"""
+import math
+import numpy as np
+import pandas as pd
+from sqlalchemy import text, bindparam
+import logging
+from src.etl.data_quality import REQUIRED_COLUMNS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Columns whose values must be unique in the target table
+UNIQUE_KEYS = {
+    'users': ['user_id', 'email'],
+    'products': ['product_id'],
+    'orders': ['order_id'],
+    'events': ['event_id'],
+}
+
+# child table -> [(fk column, parent table, parent column)]
+FOREIGN_KEYS = {
+    'orders': [('user_id', 'users', 'user_id')],
+    'order_items': [('order_id', 'orders', 'order_id'), ('product_id', 'products', 'product_id')],
+    'events': [('user_id', 'users', 'user_id'), ('product_id', 'products', 'product_id')],
+}
+
+# table -> {column: (min, max)}; None means unbounded
+VALUE_RANGES = {
+    'products': {'price': (0, None), 'cost': (0, None), 'stock_quantity': (0, None)},
+    'orders': {'total_amount': (0, None)},
+    'order_items': {'quantity': (1, None), 'price_at_time': (0, None)},
+}
+
+# Constraints the partitioned schema cannot declare, enforced on every load
+ENFORCED_UNIQUE_KEYS = {'orders': 'order_id'}
+ENFORCED_FOREIGN_KEYS = {'order_items': ('order_id', 'orders', 'order_id')}
+
+REQUIRED_COLUMNS_PRELOAD = dict(REQUIRED_COLUMNS, order_items=['order_id', 'product_id', 'quantity', 'price_at_time'])
+
+KEY_FETCH_BATCH = 100000
+
+# Text keys compared as stored: UNIQUE(email) is case-sensitive in the database
+CASE_SENSITIVE_KEYS = {'email'}
+
+
+def _normalize_keys(values: pd.Series, column: str = None) -> pd.Series:
+    """Compare keys as text, UUIDs lower-cased (UUID objects and strings alike)"""
+    values = values.astype(str)
+    return values if column in CASE_SENSITIVE_KEYS else values.str.lower()
+
+
+class KeyViolation(ValueError):
+    """A load would break a key the database cannot enforce itself"""
+
+
+class KeyBloomFilter:
+    """NumPy Bloom filter over string keys (double hashing on pandas' siphash)"""
+
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.01):
+        self.n_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, keys: np.ndarray):
+        h1 = pd.util.hash_array(keys, hash_key='bloomfilterkey01')
+        h2 = pd.util.hash_array(keys, hash_key='bloomfilterkey02') | np.uint64(1)
+        for i in range(self.n_hashes):
+            yield (h1 + np.uint64(i) * h2) % np.uint64(self.n_bits)
+
+    def add(self, keys: np.ndarray):
+        keys = np.asarray(keys, dtype=object)
+        for pos in self._positions(keys):
+            np.bitwise_or.at(self.bits, (pos >> np.uint64(3)).astype(np.int64),
+                             (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)))
+        self.count += len(keys)
+
+    def might_contain(self, keys: np.ndarray) -> np.ndarray:
+        keys = np.asarray(keys, dtype=object)
+        hit = np.ones(len(keys), dtype=bool)
+        for pos in self._positions(keys):
+            byte = self.bits[(pos >> np.uint64(3)).astype(np.int64)]
+            hit &= (byte >> (pos & np.uint64(7)).astype(np.uint8)) & 1 == 1
+        return hit
+
+
+class PreloadValidator:
+    def __init__(self, engine, bloom_capacity: int = 10_000_000):
+        self.engine = engine
+        self.bloom_capacity = bloom_capacity
+        self._loaded = {}         # (table, column) -> KeyBloomFilter of keys loaded by this validator
+        self._complete = set()    # (table, column) whose filter holds every key in the table
+        self._parent_keys = {}    # (table, column) -> pd.Index of parent keys
+
+    def reset(self, table_name: str = None):
+        """Forget cached keys (all tables, or one) e.g. after a truncate"""
+        if table_name is None:
+            self._loaded.clear()
+            self._complete.clear()
+            self._parent_keys.clear()
+            return
+        for cache in (self._loaded, self._parent_keys):
+            for key in [k for k in cache if k[0] == table_name]:
+                del cache[key]
+        self._complete = {k for k in self._complete if k[0] != table_name}
+
+    def truncated(self, table_name: str):
+        """
+        Record that a table was just emptied
+
+        Its keys are then known exactly (none, plus whatever this validator
+        registers), so the Bloom filter can clear new keys without a lookup.
+        """
+        self.reset(table_name)
+        for column in UNIQUE_KEYS.get(table_name, []):
+            self._loaded[(table_name, column)] = KeyBloomFilter(self.bloom_capacity)
+            self._complete.add((table_name, column))
+
+    def _stream_keys(self, table_name: str, column: str):
+        """Yield batches of existing keys from the database"""
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(
+                text(f"SELECT {column}::text FROM {table_name} WHERE {column} IS NOT NULL")
+            )
+            for rows in result.partitions(KEY_FETCH_BATCH):
+                yield _normalize_keys(pd.Series([row[0] for row in rows], dtype=object), column)
+
+    def _parent_index(self, table_name: str, column: str) -> pd.Index:
+        key = (table_name, column)
+        if key not in self._parent_keys:
+            batches = list(self._stream_keys(table_name, column))
+            keys = pd.concat(batches) if batches else pd.Series([], dtype=object)
+            self._parent_keys[key] = pd.Index(keys.unique())
+        return self._parent_keys[key]
+
+    def _confirm_existing(self, table_name: str, column: str, candidates: pd.Series) -> set:
+        """Exact check of candidate keys against the table (an index lookup per key, no scan)"""
+        if candidates.empty:
+            return set()
+        query = text(f"SELECT {column}::text FROM {table_name} WHERE {column} IN :keys").bindparams(
+            bindparam('keys', expanding=True)
+        )
+        found = set()
+        with self.engine.connect() as conn:
+            values = candidates.unique().tolist()
+            for start in range(0, len(values), KEY_FETCH_BATCH):
+                rows = conn.execute(query, {'keys': values[start:start + KEY_FETCH_BATCH]})
+                found.update(_normalize_keys(pd.Series([row[0] for row in rows], dtype=object), column))
+        return found
+
+    def validate(self, df: pd.DataFrame, table_name: str):
+        """
+        Split a frame into rows that will load cleanly and rejects
+
+        Rules run in order (nulls, ranges, foreign keys, duplicate keys) and
+        each rejected row keeps the first rule it failed.
+
+        Returns:
+            (clean_df, rejects_df): rejects_df has an extra reject_reason column
+        """
+        reasons = pd.Series(None, index=df.index, dtype=object)
+
+        def reject(mask, reason):
+            mask = pd.Series(mask, index=df.index) & reasons.isna()
+            reasons[mask] = reason
+
+        # 1. Required columns
+        for column in REQUIRED_COLUMNS_PRELOAD.get(table_name, []):
+            if column in df.columns:
+                reject(df[column].isna(), f'null_{column}')
+
+        # 2. Value ranges
+        for column, (min_val, max_val) in VALUE_RANGES.get(table_name, {}).items():
+            if column not in df.columns:
+                continue
+            values = pd.to_numeric(df[column], errors='coerce')
+            if min_val is not None:
+                reject(values < min_val, f'{column}_below_{min_val}')
+            if max_val is not None:
+                reject(values > max_val, f'{column}_above_{max_val}')
+
+        # 3. Foreign keys against cached parent key sets (NULL FKs are allowed)
+        for column, parent_table, parent_column in FOREIGN_KEYS.get(table_name, []):
+            if column not in df.columns:
+                continue
+            present = df[column].notna()
+            keys = _normalize_keys(df.loc[present, column], parent_column)
+            parent_keys = self._parent_index(parent_table, parent_column)
+            orphan = pd.Series(False, index=df.index)
+            orphan[present] = ~keys.isin(parent_keys).to_numpy()
+            reject(orphan, f'orphan_{column}')
+
+        # 4. Duplicate keys: within the frame, then against the table. Only the
+        # frame's keys are looked up, and only Bloom filter hits when the
+        # filter holds every key in the table
+        for column in UNIQUE_KEYS.get(table_name, []):
+            if column not in df.columns:
+                continue
+            keys = _normalize_keys(df[column], column)
+            pending = reasons.isna() & df[column].notna()
+            reject(pending & keys.duplicated(keep='first'), f'duplicate_{column}')
+
+            pending = reasons.isna() & df[column].notna()
+            hits = pending.copy()
+            if (table_name, column) in self._complete:
+                bloom = self._loaded[(table_name, column)]
+                hits[pending] = bloom.might_contain(keys[pending].to_numpy())
+            existing = self._confirm_existing(table_name, column, keys[hits])
+            reject(hits & keys.isin(existing), f'existing_{column}')
+
+        rejected = reasons.notna()
+        clean = df[~rejected].copy() if rejected.any() else df
+        rejects = df[rejected].assign(reject_reason=reasons[rejected])
+
+        if not rejects.empty:
+            summary = rejects['reject_reason'].value_counts().to_dict()
+            logger.warning(f"⚠️ Rejected {len(rejects)} of {len(df)} rows for {table_name}: {summary}")
+        return clean, rejects
+
+    def enforce_keys(self, conn, df: pd.DataFrame, table_name: str, append: bool = True):
+        """
+        Exact key checks inside the load's transaction (before its rows are written)
+
+        orders: order_id unique within the frame and against the table.
+        order_items: every order_id present in orders. A transaction-level
+        advisory lock per table serializes concurrent loads of the same keys.
+        With append=False (the table is being replaced) uniqueness is only
+        checked within the frame.
+
+        Raises:
+            KeyViolation: With the number of offending keys and a sample
+        """
+        checks = []
+        if table_name in ENFORCED_UNIQUE_KEYS:
+            checks.append(('unique', ENFORCED_UNIQUE_KEYS[table_name], table_name, ENFORCED_UNIQUE_KEYS[table_name]))
+        if table_name in ENFORCED_FOREIGN_KEYS:
+            checks.append(('foreign', *ENFORCED_FOREIGN_KEYS[table_name]))
+        for kind, column, key_table, key_column in checks:
+            if column not in df.columns:
+                continue
+            keys = _normalize_keys(df[column].dropna(), key_column)
+            if keys.empty:
+                continue
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:lock))"), {'lock': f"{key_table}.{key_column}"})
+            values = keys.unique().tolist()
+            found = set()
+            if kind == 'unique' and not append:
+                values = []
+            for start in range(0, len(values), KEY_FETCH_BATCH):
+                rows = conn.execute(text(
+                    f"SELECT DISTINCT t.{key_column}::text FROM {key_table} t "
+                    f"JOIN unnest(CAST(:keys AS uuid[])) AS k(key) ON t.{key_column} = k.key"
+                ), {'keys': values[start:start + KEY_FETCH_BATCH]})
+                found.update(row[0].lower() for row in rows)
+
+            if kind == 'unique':
+                bad = sorted(found | set(keys[keys.duplicated()]))
+                problem = f"duplicate {column} values"
+            else:
+                bad = sorted(set(values) - found)
+                problem = f"{column} values missing from {key_table}"
+            if bad:
+                raise KeyViolation(f"{table_name}: {len(bad)} {problem}, e.g. {bad[:3]}")
+
+    def register_loaded(self, df: pd.DataFrame, table_name: str):
+        """Record keys of a successfully loaded frame for later chunks and child tables"""
+        for column in UNIQUE_KEYS.get(table_name, []):
+            if column in df.columns and (table_name, column) in self._loaded:
+                self._loaded[(table_name, column)].add(_normalize_keys(df[column].dropna(), column).to_numpy())
+
+        for parent_table, parent_column in {(p, c) for fks in FOREIGN_KEYS.values() for _, p, c in fks}:
+            key = (parent_table, parent_column)
+            if parent_table == table_name and key in self._parent_keys and parent_column in df.columns:
+                new_keys = pd.Index(_normalize_keys(df[parent_column].dropna(), parent_column).unique())
+                self._parent_keys[key] = self._parent_keys[key].union(new_keys)
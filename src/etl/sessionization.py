@@ -0,0 +1,210 @@
+# src/etl/sessionization.py
+"""
+Sessionization stage: rebuilds sessions from raw events.
+
+events.session_id is not a usable session key (the generators draw a fresh id
+per event), so sessions are derived instead: each user's events ordered by
+timestamp, split wherever the gap to the previous event exceeds the inactivity
+timeout (SESSION_GAP_MINUTES, 30 by default). Boundaries come from one
+vectorized diff/cumsum over the (user, timestamp)-sorted arrays.
+
+The sessions table is maintained incrementally. For each user in a loaded
+events frame, only the sessions that can absorb the new events (those ending
+less than one gap before the user's earliest new event) are deleted and
+rebuilt from the events table, so an append touches just the user's tail
+session. The loader runs this inside the load's own transaction, so the
+sessions always match the committed events. Session ids are uuid5(user,
+session start), so rebuilding the same events yields the same ids.
+"""
+import os
+import uuid
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+import logging
+from src.database.data_version import bump_data_version
+from src.database.streaming import StreamingReader
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SESSION_GAP_MINUTES = int(os.getenv('SESSION_GAP_MINUTES', '30'))
+
+# Fixed namespace so session ids are stable across rebuilds
+SESSION_NAMESPACE = uuid.UUID('5b9e2c1a-7d4f-5e3b-8a6c-2f1d9e7b4c30')
+
+# event type -> sessions counter column
+EVENT_COUNTERS = {
+    'product_view': 'product_views',
+    'add_to_cart': 'add_to_carts',
+    'checkout': 'checkouts',
+    'purchase': 'purchases',
+}
+
+SESSION_COLUMNS = ['session_id', 'user_id', 'session_start', 'session_end', 'events',
+                   *EVENT_COUNTERS.values(), 'converted']
+
+# Per affected user: the sessions new events at >= since can merge into are
+# deleted, and the user's events are re-read from the earliest of them
+DELETE_TAIL_SESSIONS_QUERY = """
+WITH affected AS (
+    SELECT * FROM unnest(CAST(:user_ids AS uuid[]), CAST(:since AS timestamp[])) AS a(user_id, since)
+)
+DELETE FROM sessions s
+USING affected a
+WHERE s.user_id = a.user_id
+AND s.session_end >= a.since - make_interval(mins => :gap_minutes)
+RETURNING s.user_id, s.session_start
+"""
+
+TAIL_EVENTS_QUERY = """
+SELECT e.user_id, e."timestamp", e.event_type::text AS event_type
+FROM events e
+JOIN unnest(CAST(:user_ids AS uuid[]), CAST(:since AS timestamp[])) AS a(user_id, since)
+  ON e.user_id = a.user_id AND e."timestamp" >= a.since
+ORDER BY e.user_id, e."timestamp"
+"""
+
+ALL_EVENTS_QUERY = """
+SELECT e.user_id, e."timestamp", e.event_type::text AS event_type
+FROM events e
+ORDER BY e.user_id, e."timestamp"
+"""
+
+INSERT_SESSIONS_QUERY = f"""
+INSERT INTO sessions ({', '.join(SESSION_COLUMNS)})
+SELECT * FROM unnest(
+    CAST(:session_id AS uuid[]), CAST(:user_id AS uuid[]),
+    CAST(:session_start AS timestamp[]), CAST(:session_end AS timestamp[]),
+    CAST(:events AS integer[]), CAST(:product_views AS integer[]), CAST(:add_to_carts AS integer[]),
+    CAST(:checkouts AS integer[]), CAST(:purchases AS integer[]), CAST(:converted AS boolean[])
+)
+"""
+
+
+def sessionize(events: pd.DataFrame, gap_minutes: int = SESSION_GAP_MINUTES) -> pd.DataFrame:
+    """
+    Split events into sessions on an inactivity gap
+
+    Args:
+        events: user_id, timestamp, event_type (any order)
+        gap_minutes: A gap longer than this starts a new session
+
+    Returns:
+        pd.DataFrame: One row per session (SESSION_COLUMNS)
+    """
+    if events.empty:
+        return pd.DataFrame(columns=SESSION_COLUMNS)
+    events = events.sort_values(['user_id', 'timestamp'], kind='stable')
+    users = events['user_id'].astype(str).str.lower().to_numpy(dtype=object)
+    ts = pd.to_datetime(events['timestamp']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+    new_session = np.empty(len(events), dtype=bool)
+    new_session[0] = True
+    new_session[1:] = (users[1:] != users[:-1]) | (np.diff(ts) > gap_minutes * 60 * 10**9)
+    session = np.cumsum(new_session) - 1
+    starts = np.flatnonzero(new_session)
+    ends = np.r_[starts[1:], len(events)] - 1
+
+    event_types = events['event_type'].astype(str).to_numpy()
+    sessions = pd.DataFrame({
+        'user_id': users[starts],
+        'session_start': pd.to_datetime(ts[starts]),
+        'session_end': pd.to_datetime(ts[ends]),
+        'events': (ends - starts + 1).astype(np.int64),
+    })
+    for event_type, column in EVENT_COUNTERS.items():
+        sessions[column] = np.bincount(session, weights=event_types == event_type,
+                                       minlength=len(starts)).astype(np.int64)
+    sessions['converted'] = sessions['purchases'] > 0
+    sessions['session_id'] = [
+        str(uuid.uuid5(SESSION_NAMESPACE, f"{user}|{start.isoformat()}"))
+        for user, start in zip(sessions['user_id'], sessions['session_start'])
+    ]
+    return sessions[SESSION_COLUMNS]
+
+
+class Sessionizer:
+    def __init__(self, engine, gap_minutes: int = SESSION_GAP_MINUTES):
+        self.engine = engine
+        self.gap_minutes = gap_minutes
+        self.stream = StreamingReader(engine)
+
+    def _insert(self, conn, sessions: pd.DataFrame) -> int:
+        if sessions.empty:
+            return 0
+        params = {column: sessions[column].tolist() for column in SESSION_COLUMNS}
+        for column in ('session_start', 'session_end'):
+            params[column] = sessions[column].dt.to_pydatetime().tolist()
+        conn.execute(text(INSERT_SESSIONS_QUERY), params)
+        return len(sessions)
+
+    def track_load(self, df: pd.DataFrame, table_name: str, conn=None) -> int:
+        """
+        Re-sessionize the tail of every user a freshly loaded events frame touches
+
+        Pass the load's connection so the sessions commit (or roll back) with
+        the events; a failure then fails the load instead of leaving those
+        users' sessions stale.
+
+        Returns:
+            int: Sessions written (0 for other tables)
+        """
+        if table_name != 'events' or not {'user_id', 'timestamp'} <= set(df.columns):
+            return 0
+        loaded = pd.DataFrame({
+            'user_id': df['user_id'].astype(str),
+            'timestamp': pd.to_datetime(df['timestamp']),
+        }).dropna()
+        earliest = loaded.groupby('user_id')['timestamp'].min()
+        if earliest.empty:
+            return 0
+        owned = conn is None
+        with self.engine.begin() if owned else nullcontext(conn) as conn:
+            deleted = conn.execute(text(DELETE_TAIL_SESSIONS_QUERY), {
+                'user_ids': earliest.index.tolist(),
+                'since': earliest.dt.to_pydatetime().tolist(),
+                'gap_minutes': self.gap_minutes,
+            }).fetchall()
+            # Re-read from the start of the earliest deleted session (or the new events)
+            since = earliest
+            if deleted:
+                starts = pd.DataFrame(deleted, columns=['user_id', 'session_start'])
+                starts = starts.set_index(starts['user_id'].astype(str))['session_start']
+                since = pd.concat([earliest, pd.to_datetime(starts)]).groupby(level=0).min()
+            events = pd.DataFrame(conn.execute(text(TAIL_EVENTS_QUERY), {
+                'user_ids': since.index.tolist(),
+                'since': since.dt.to_pydatetime().tolist(),
+            }).fetchall(), columns=['user_id', 'timestamp', 'event_type'])
+            written = self._insert(conn, sessionize(events, self.gap_minutes))
+            if owned:
+                bump_data_version(conn, 'sessions')
+        logger.info(f"✅ Sessionized {len(events):,} events of {len(since):,} users "
+                    f"into {written:,} sessions ({len(deleted):,} replaced)")
+        return written
+
+    def clear(self, table_name: str, conn) -> None:
+        """Drop all sessions when events are cleared (inside conn's transaction)"""
+        if table_name == 'events':
+            conn.execute(text("TRUNCATE sessions"))
+
+    def rebuild(self, batch_size: int = 1_000_000) -> int:
+        """Re-sessionize every event, streamed in (user, timestamp) order"""
+        written = 0
+        carry = None
+        with self.engine.begin() as conn:
+            conn.execute(text("TRUNCATE sessions"))
+            for batch in self.stream.iter_batches(ALL_EVENTS_QUERY, batch_size=batch_size):
+                if carry is not None:
+                    batch = pd.concat([carry, batch], ignore_index=True)
+                # Hold back the last user: their events may continue in the next batch
+                last_user = batch['user_id'].iloc[-1]
+                tail = (batch['user_id'] == last_user).to_numpy()
+                carry = batch[tail]
+                written += self._insert(conn, sessionize(batch[~tail], self.gap_minutes))
+            if carry is not None:
+                written += self._insert(conn, sessionize(carry, self.gap_minutes))
+            bump_data_version(conn, 'sessions')
+        logger.info(f"✅ Rebuilt sessions ({written:,} sessions)")
+        return written
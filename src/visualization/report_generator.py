@@ -14,11 +14,19 @@ from pathlib import Path
 # Add src to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.database.connection import db
+from src.database.query_catalog import QueryCatalog
+from src.database.batch_executor import BatchQueryExecutor
+from src.database.aggregate_navigator import AggregateNavigator
+from src.analytics.cohort_engine import CohortEngine
 
 class ReportGenerator:
     def __init__(self, output_dir="reports"):
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
+        self.catalog = QueryCatalog(db.get_engine())
+        self.batch = BatchQueryExecutor(db.get_engine(), catalog=self.catalog)
+        self.navigator = AggregateNavigator(db.get_engine())
+        self.cohorts = CohortEngine(db.get_engine())
         
         # Set style
         plt.style.use('seaborn-v0_8-darkgrid')
@@ -44,81 +52,29 @@ class ReportGenerator:
         print(f"📊 Generating executive summary for {start_date.date()} to {end_date.date()}...")
         
         try:
-            # Query key metrics
-            # Prefer SQLAlchemy engine for pandas compatibility; fall back to DBAPI connection
-            engine = db.get_engine() if hasattr(db, 'get_engine') else None
-            if engine:
-                conn_ctx = engine.connect()
-            else:
-                conn_ctx = db.get_connection()
-
-            with conn_ctx as conn:
-                # Revenue metrics
-                revenue_query = """
-                SELECT 
-                    COALESCE(SUM(total_amount), 0) as total_revenue,
-                    COUNT(DISTINCT order_id) as total_orders,
-                    COALESCE(AVG(total_amount), 0) as avg_order_value,
-                    COUNT(DISTINCT user_id) as active_customers
-                FROM orders
-                WHERE order_date BETWEEN %s AND %s
-                AND status = 'completed'
-                """
-                
-                revenue_df = pd.read_sql_query(revenue_query, conn, params=(start_date, end_date))
-                
-                # Category performance
-                category_query = """
-                SELECT 
-                    p.category,
-                    COALESCE(SUM(o.total_amount), 0) as revenue,
-                    COUNT(DISTINCT o.order_id) as orders,
-                    COALESCE(SUM(oi.quantity), 0) as units_sold
-                FROM orders o
-                JOIN order_items oi ON o.order_id = oi.order_id
-                JOIN products p ON oi.product_id = p.product_id
-                WHERE o.order_date BETWEEN %s AND %s
-                AND o.status = 'completed'
-                GROUP BY p.category
-                ORDER BY revenue DESC
-                """
-                
-                category_df = pd.read_sql_query(category_query, conn, params=(start_date, end_date))
-                
-                # Daily trends
-                daily_query = """
-                SELECT 
-                    DATE(order_date) as date,
-                    COALESCE(SUM(total_amount), 0) as daily_revenue,
-                    COUNT(*) as daily_orders
-                FROM orders
-                WHERE order_date BETWEEN %s AND %s
-                AND status = 'completed'
-                GROUP BY DATE(order_date)
-                ORDER BY date
-                """
-                
-                daily_df = pd.read_sql_query(daily_query, conn, params=(start_date, end_date))
-                
-                # Top products
-                top_products_query = """
-                SELECT 
-                    p.name,
-                    p.category,
-                    COALESCE(SUM(oi.quantity * oi.price_at_time), 0) as revenue,
-                    COALESCE(SUM(oi.quantity), 0) as units_sold,
-                    ROUND(COALESCE(AVG(oi.price_at_time), 0), 2) as avg_price
-                FROM order_items oi
-                JOIN products p ON oi.product_id = p.product_id
-                JOIN orders o ON oi.order_id = o.order_id
-                WHERE o.order_date BETWEEN %s AND %s
-                AND o.status = 'completed'
-                GROUP BY p.product_id, p.name, p.category
-                ORDER BY revenue DESC
-                LIMIT 10
-                """
-                
-                top_products_df = pd.read_sql_query(top_products_query, conn, params=(start_date, end_date))
+            # Revenue, category and daily figures are routed to the cheapest
+            # pre-aggregate that answers them exactly (whole days)
+            metric = dict(start_date=start_date.date(), end_date=end_date.date(),
+                          filters={'status': 'completed'})
+            period = {'start_ts': start_date, 'end_ts': end_date}
+            
+            # Independent queries, run concurrently on pooled connections
+            results = self.batch.run_tasks({
+                'revenue': lambda: self.navigator.query(
+                    ['revenue', 'orders', 'aov', 'active_customers'], **metric),
+                'category': lambda: self.navigator.query(
+                    ['revenue', 'orders', 'units_sold'], dimensions=['category'], **metric),
+                'daily': lambda: self.navigator.query(['revenue', 'orders'], grain='day', **metric),
+                'top_products': lambda: self.catalog.execute('report_top_products', {**period, 'limit': 10})
+            })
+            revenue_df = results['revenue'].rename(columns={
+                'revenue': 'total_revenue', 'orders': 'total_orders', 'aov': 'avg_order_value'
+            })
+            category_df = results['category'].sort_values('revenue', ascending=False)
+            daily_df = results['daily'].rename(columns={
+                'period': 'date', 'revenue': 'daily_revenue', 'orders': 'daily_orders'
+            })
+            top_products_df = results['top_products']
         
         except Exception as e:
             print(f"❌ Database error: {e}")
@@ -325,75 +281,11 @@ class ReportGenerator:
         print("👥 Generating cohort analysis...")
         
         try:
-            # First check if signup_date column exists
-            # Prefer SQLAlchemy engine for pandas compatibility; fall back to DBAPI connection
-            engine = db.get_engine() if hasattr(db, 'get_engine') else None
-            if engine:
-                conn_ctx = engine.connect()
-            else:
-                conn_ctx = db.get_connection()
-
-            with conn_ctx as conn:
-                # Check column exists
-                check_query = """
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'users' AND column_name = 'signup_date'
-                """
-                
-                check_result = pd.read_sql_query(check_query, conn)
-                
-                if check_result.empty:
-                    print("⚠️ 'signup_date' column not found, using 'created_at' instead")
-                    date_column = 'created_at'
-                else:
-                    date_column = 'signup_date'
-                
-                # Use the appropriate date column
-                cohort_query = f"""
-                WITH user_cohorts AS (
-                    SELECT 
-                        user_id,
-                        DATE_TRUNC('month', {date_column}) as cohort_month
-                    FROM users
-                ),
-                monthly_activity AS (
-                    SELECT 
-                        uc.cohort_month,
-                        DATE_TRUNC('month', o.order_date) as activity_month,
-                        COUNT(DISTINCT uc.user_id) as active_users
-                    FROM user_cohorts uc
-                    LEFT JOIN orders o ON uc.user_id = o.user_id
-                    AND o.status = 'completed'
-                    AND o.order_date >= uc.cohort_month
-                    AND o.order_date < uc.cohort_month + INTERVAL '6 months'
-                    GROUP BY uc.cohort_month, DATE_TRUNC('month', o.order_date)
-                ),
-                cohort_sizes AS (
-                    SELECT 
-                        cohort_month,
-                        COUNT(DISTINCT user_id) as cohort_size
-                    FROM user_cohorts
-                    GROUP BY cohort_month
-                )
-                SELECT 
-                    ma.cohort_month,
-                    ma.activity_month,
-                    cs.cohort_size,
-                    ma.active_users,
-                    CASE 
-                        WHEN cs.cohort_size > 0 
-                        THEN ROUND(ma.active_users * 100.0 / cs.cohort_size, 1)
-                        ELSE 0 
-                    END as retention_rate
-                FROM monthly_activity ma
-                JOIN cohort_sizes cs ON ma.cohort_month = cs.cohort_month
-                WHERE ma.activity_month IS NOT NULL
-                ORDER BY ma.cohort_month, ma.activity_month
-                """
-                
-                cohort_df = pd.read_sql_query(cohort_query, conn)
-                
+            # Signup cohorts, completed orders, first six months
+            cohort_df = self.cohorts.retention(cohort='signup', periods=6, status='completed')
+            cohort_df = cohort_df[cohort_df['retained_users'] > 0].rename(columns={'retained_users': 'active_users'})
+            cohort_df['retention_rate'] = (cohort_df['retention_rate'] * 100).round(1)
+        
         except Exception as e:
             print(f"❌ Database error in cohort analysis: {e}")
             return None
@@ -402,10 +294,6 @@ class ReportGenerator:
             print("⚠️ No data for cohort analysis – skipping")
             return None
         
-        # Convert to datetime
-        cohort_df['cohort_month'] = pd.to_datetime(cohort_df['cohort_month'])
-        cohort_df['activity_month'] = pd.to_datetime(cohort_df['activity_month'])
-        
         # Create heatmap
         try:
             pivot_df = cohort_df.pivot_table(
@@ -457,26 +345,10 @@ class ReportGenerator:
         
         # Get historical data first
         try:
-            # Prefer SQLAlchemy engine for pandas compatibility; fall back to DBAPI connection
-            engine = db.get_engine() if hasattr(db, 'get_engine') else None
-            if engine:
-                conn_ctx = engine.connect()
-            else:
-                conn_ctx = db.get_connection()
-
-            with conn_ctx as conn:
-                historical_query = """
-                SELECT 
-                    DATE(order_date) as date,
-                    COALESCE(SUM(total_amount), 0) as revenue
-                FROM orders
-                WHERE order_date >= CURRENT_DATE - INTERVAL '90 days'
-                AND status = 'completed'
-                GROUP BY DATE(order_date)
-                ORDER BY date
-                """
-                
-                historical_df = pd.read_sql_query(historical_query, conn)
+            historical_df = self.navigator.query(
+                ['revenue'], grain='day', start_date=datetime.now().date() - timedelta(days=90),
+                filters={'status': 'completed'}
+            ).rename(columns={'period': 'date'})
                 
         except Exception as e:
             print(f"❌ Database error in forecast: {e}")
@@ -0,0 +1,24 @@
+# tests/test_aggregate_navigator.py
+"""Routing rules of the aggregate navigator (src/database/aggregate_navigator.py)"""
+from src.database.aggregate_navigator import AGGREGATE_SOURCES, AggregateNavigator, source_rollups
+
+SOURCES = {source['name']: source for source in AGGREGATE_SOURCES}
+
+
+def test_source_rollups():
+    assert {name: source_rollups(source) for name, source in SOURCES.items()} == {
+        'weekly_kpis': {'sales'},
+        'daily_kpis': {'sales'},
+        'daily_sales_rollup': {'sales'},
+        'daily_category_sales_rollup': {'sales'},
+    }
+    assert source_rollups({'reads': ('daily_event_counts',)}) == {'events'}
+    assert source_rollups({'reads': ('events',)}) == {'events'}
+
+
+def test_weekly_kpis_not_exact_for_active_customers():
+    navigator = AggregateNavigator(engine=None)
+    assert navigator._answers(SOURCES['weekly_kpis'], 'revenue', set(), 'week')
+    assert not navigator._answers(SOURCES['weekly_kpis'], 'active_customers', set(), 'week')
+    assert navigator._answers(SOURCES['daily_kpis'], 'active_customers', set(), 'day')
+    assert not navigator._answers(SOURCES['daily_kpis'], 'active_customers', set(), 'week')
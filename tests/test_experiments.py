@@ -0,0 +1,113 @@
+# tests/test_experiments.py
+"""
+Tests for the A/B test statistics (src/analytics/experiments.py).
+
+Simulated per-user outcomes are collapsed into the outcome distribution the
+database query returns, analyzed, and compared with scipy on the raw
+per-user arrays.
+"""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from src.analytics.experiments import (
+    ExperimentAnalyzer, RESULT_COLUMN_TYPES, proportion_ztest, variant_stats, welch_ttest,
+)
+from src.etl.pgcopy import encode_binary_copy
+
+
+def simulate(rng, experiment_id: str, variants: dict) -> pd.DataFrame:
+    """Per-user outcomes: variant -> (users, conversion rate, mean order value)"""
+    frames = []
+    for variant, (users, rate, order_value) in variants.items():
+        converted = rng.random(users) < rate
+        # Whole-dollar revenue so many users share an outcome, as real totals do
+        revenue = np.where(converted, np.round(rng.gamma(2.0, order_value / 2.0, users)), 0.0)
+        frames.append(pd.DataFrame({'experiment_id': experiment_id, 'variant': variant,
+                                    'converted': converted, 'revenue': revenue}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def distribution_of(users: pd.DataFrame) -> pd.DataFrame:
+    """The (experiment, variant, converted, revenue) -> users rows of the outcome query"""
+    return users.groupby(['experiment_id', 'variant', 'converted', 'revenue']).size().rename('users').reset_index()
+
+
+def test_variant_stats():
+    users = simulate(np.random.default_rng(1), 'exp_a',
+                     {'control': (5_000, 0.1, 80.0), 'treatment': (4_000, 0.12, 90.0)})
+    groups = variant_stats(distribution_of(users))
+    for (experiment_id, variant), row in groups.iterrows():
+        raw = users[(users['experiment_id'] == experiment_id) & (users['variant'] == variant)]
+        assert row['users'] == len(raw)
+        assert row['conversions'] == raw['converted'].sum()
+        assert np.isclose(row['revenue'], raw['revenue'].sum())
+        assert np.isclose(row['revenue_sq'], (raw['revenue'] ** 2).sum())
+
+
+def test_statistics_match_scipy():
+    rng = np.random.default_rng(2)
+    users = pd.concat([
+        simulate(rng, 'exp_a', {'control': (20_000, 0.10, 80.0), 'b': (20_000, 0.11, 85.0)}),
+        simulate(rng, 'exp_b', {'old': (3_000, 0.05, 40.0), 'new': (2_500, 0.05, 40.0), 'newer': (2_000, 0.08, 30.0)}),
+    ], ignore_index=True)
+    experiments = pd.DataFrame({'experiment_id': ['exp_a', 'exp_b'], 'name': ['Checkout', 'Banner'],
+                                'variants': [['control', 'b'], ['old', 'new', 'newer']]})
+    results = ExperimentAnalyzer(engine=None, n_bootstrap=200).analyze(experiments, distribution_of(users))
+
+    assert list(results.columns) == list(RESULT_COLUMN_TYPES)
+    assert sorted(zip(results['experiment_id'], results['variant'], results['control_variant'])) == [
+        ('exp_a', 'b', 'control'), ('exp_b', 'new', 'old'), ('exp_b', 'newer', 'old')]
+
+    for row in results.itertuples():
+        mask = users['experiment_id'] == row.experiment_id
+        treated = users[mask & (users['variant'] == row.variant)]
+        control = users[mask & (users['variant'] == row.control_variant)]
+
+        welch = stats.ttest_ind(treated['revenue'], control['revenue'], equal_var=False)
+        assert np.isclose(row.t_stat, welch.statistic)
+        assert np.isclose(row.revenue_p_value, welch.pvalue)
+
+        x1, n1, x2, n2 = treated['converted'].sum(), len(treated), control['converted'].sum(), len(control)
+        pooled = (x1 + x2) / (n1 + n2)
+        z = (x1 / n1 - x2 / n2) / np.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+        assert np.isclose(row.z_stat, z)
+        assert np.isclose(row.p_value, 2 * stats.norm.sf(abs(z)))
+
+        # The bootstrap interval brackets the observed difference
+        assert row.conversion_diff_low <= row.conversion_diff <= row.conversion_diff_high
+        assert row.revenue_diff_low <= row.revenue_diff <= row.revenue_diff_high
+
+
+def test_null_experiments():
+    """With no real effect about alpha of comparisons are significant"""
+    rng = np.random.default_rng(3)
+    n_experiments = 400
+    ids = [f'exp_{i:03d}' for i in range(n_experiments)]
+    users = pd.concat([simulate(rng, i, {'a': (2_000, 0.1, 50.0), 'b': (2_000, 0.1, 50.0)}) for i in ids],
+                      ignore_index=True)
+    experiments = pd.DataFrame({'experiment_id': ids, 'name': 'null', 'variants': [['a', 'b']] * n_experiments})
+    results = ExperimentAnalyzer(engine=None, n_bootstrap=200).analyze(experiments, distribution_of(users))
+    assert len(results) == n_experiments
+    # Binomial(400, 0.05): mean 20, sd 4.4
+    assert 0.01 <= results['significant'].mean() <= 0.10
+    covered = (results['conversion_diff_low'] <= 0) & (results['conversion_diff_high'] >= 0)
+    assert 0.90 <= covered.mean() <= 0.99
+
+
+def test_vectorized_helpers():
+    z, p = proportion_ztest(np.array([120.0]), np.array([1000.0]), np.array([100.0]), np.array([1000.0]))
+    assert np.isclose(p[0], 2 * stats.norm.sf(abs(z[0])))
+    t, df, p = welch_ttest(np.array([1.0, 0.0]), np.array([4.0, 1.0]), np.array([50.0, 30.0]),
+                           np.array([0.0, 0.0]), np.array([1.0, 1.0]), np.array([40.0, 30.0]))
+    # Equal variances and sizes reduce Welch's df to n1 + n2 - 2
+    assert np.isclose(df[1], 58.0) and t[1] == 0.0 and np.isclose(p[1], 1.0)
+
+
+def test_results_encode_for_copy():
+    users = simulate(np.random.default_rng(4), 'exp_a', {'control': (1_000, 0.1, 80.0), 'b': (1_000, 0.1, 80.0)})
+    experiments = pd.DataFrame({'experiment_id': ['exp_a'], 'name': ['Checkout'], 'variants': [['control', 'b']]})
+    analyzer = ExperimentAnalyzer(engine=None, n_bootstrap=50)
+    results = analyzer.analyze(experiments, distribution_of(users))
+    assert len(encode_binary_copy(results, RESULT_COLUMN_TYPES)) > 100
+    assert analyzer.analyze(experiments, distribution_of(users).iloc[:0]).empty
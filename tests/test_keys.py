@@ -0,0 +1,58 @@
+# tests/test_keys.py
+"""Tests for UUIDv7 key generation (src/etl/keys.py)"""
+import uuid
+
+import pandas as pd
+import pytest
+
+from src.etl.data_generator import EcommerceDataGenerator
+from src.etl.keys import uuid7, new_key
+
+
+def unix_ms(key: str) -> int:
+    """The 48-bit millisecond timestamp a UUIDv7 starts with"""
+    return uuid.UUID(key).int >> 80
+
+
+def test_layout():
+    ts = pd.Timestamp('2024-02-29 12:34:56.789')
+    for _ in range(1000):
+        key = uuid.UUID(uuid7(ts))
+        assert key.version == 7
+        assert key.variant == uuid.RFC_4122
+        assert unix_ms(str(key)) == ts.value // 1_000_000
+
+
+def test_time_ordered():
+    times = pd.date_range('2020-01-01', periods=2000, freq='37min') + pd.to_timedelta(range(2000), unit='ms')
+    keys = [uuid7(ts) for ts in times]
+    assert keys == sorted(keys)
+    assert [uuid.UUID(k) for k in keys] == sorted(uuid.UUID(k) for k in keys)
+    assert [unix_ms(k) for k in keys] == [ts.value // 1_000_000 for ts in times]
+
+
+def test_unique_within_millisecond():
+    ts = pd.Timestamp('2024-01-01')
+    assert len({uuid7(ts) for _ in range(10_000)}) == 10_000
+
+
+def test_default_timestamp_is_now():
+    before = pd.Timestamp.now().value // 1_000_000
+    key = uuid7()
+    after = pd.Timestamp.now().value // 1_000_000
+    assert before <= unix_ms(key) <= after
+
+
+def test_new_key():
+    assert uuid.UUID(new_key('uuid7')).version == 7
+    assert uuid.UUID(new_key('uuid4')).version == 4
+    with pytest.raises(ValueError):
+        new_key('uuid1')
+
+
+def test_generator_defaults_to_uuid4(monkeypatch):
+    monkeypatch.delenv('ETL_KEY_FORMAT', raising=False)
+    assert EcommerceDataGenerator().key_format == 'uuid4'
+    monkeypatch.setenv('ETL_KEY_FORMAT', 'uuid7')
+    assert EcommerceDataGenerator().key_format == 'uuid7'
+    assert EcommerceDataGenerator(key_format='uuid4').key_format == 'uuid4'
@@ -0,0 +1,103 @@
+# tests/test_preload_validation.py
+"""Tests for pre-load key deduplication and its Bloom filter (src/etl/preload_validation.py)"""
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from src.etl.preload_validation import KeyBloomFilter, PreloadValidator
+
+
+def make_keys(n: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.array([str(uuid.UUID(int=int(x))) for x in rng.integers(0, 2 ** 63, n)], dtype=object)
+
+
+def test_no_false_negatives():
+    bloom = KeyBloomFilter(capacity=50_000, error_rate=0.01)
+    keys = make_keys(50_000, seed=1)
+    for chunk in np.array_split(keys, 7):
+        bloom.add(chunk)
+    assert bloom.count == len(keys)
+    assert bloom.might_contain(keys).all()
+
+
+def test_false_positive_rate_at_capacity():
+    bloom = KeyBloomFilter(capacity=50_000, error_rate=0.01)
+    bloom.add(make_keys(50_000, seed=2))
+    assert bloom.might_contain(make_keys(50_000, seed=3)).mean() < 0.02
+
+
+def test_sizing():
+    bloom = KeyBloomFilter(capacity=1_000_000, error_rate=0.01)
+    # m = -n ln p / ln^2 2 = 9.59 bits per key, k = m / n ln 2 = 7
+    assert 9_500_000 < bloom.n_bits < 9_700_000
+    assert bloom.n_hashes == 7
+    assert len(bloom.bits) == (bloom.n_bits + 7) // 8
+
+
+def test_empty_filter():
+    bloom = KeyBloomFilter(capacity=1_000)
+    assert not bloom.might_contain(make_keys(100, seed=4)).any()
+    assert bloom.might_contain(np.array([], dtype=object)).shape == (0,)
+
+
+class FakeTableValidator(PreloadValidator):
+    """Validator over in-memory tables that records each key lookup"""
+
+    def __init__(self, tables: dict):
+        super().__init__(engine=None, bloom_capacity=10_000)
+        self.tables = tables
+        self.lookups = []
+
+    def _stream_keys(self, table_name, column):
+        raise AssertionError(f"full scan of {table_name}.{column}")
+
+    def _confirm_existing(self, table_name, column, candidates):
+        self.lookups.append((column, sorted(candidates)))
+        return set(candidates) & set(self.tables[table_name][column])
+
+
+def users_frame(user_ids, emails):
+    return pd.DataFrame({'user_id': user_ids, 'email': emails, 'signup_date': pd.Timestamp('2024-01-01')})
+
+
+def test_email_uniqueness_is_case_sensitive():
+    ids = [str(uuid.UUID(int=i + 1)) for i in range(4)]
+    validator = FakeTableValidator({'users': {'user_id': [ids[3]], 'email': ['Old@example.com']}})
+    df = users_frame([ids[0], ids[1], ids[2].upper(), ids[3].upper()],
+                     ['a@example.com', 'A@example.com', 'old@example.com', 'b@example.com'])
+    clean, rejects = validator.validate(df, 'users')
+    # Emails differing only by case load, as UNIQUE(email) allows; UUIDs match in any case
+    assert clean['email'].tolist() == ['a@example.com', 'A@example.com', 'old@example.com']
+    assert rejects['reject_reason'].tolist() == ['existing_user_id']
+
+
+def test_existing_keys_looked_up_without_scan():
+    ids = [str(uuid.UUID(int=i + 1)) for i in range(3)]
+    validator = FakeTableValidator({'users': {'user_id': [ids[0]], 'email': []}})
+    clean, rejects = validator.validate(users_frame(ids, ['a@x.io', 'b@x.io', 'c@x.io']), 'users')
+    assert rejects['reject_reason'].tolist() == ['existing_user_id']
+    # Only this frame's keys are checked against the table
+    assert validator.lookups == [('user_id', ids), ('email', ['b@x.io', 'c@x.io'])]
+
+
+def test_truncated_table_skips_lookups():
+    ids = [str(uuid.UUID(int=i + 1)) for i in range(4)]
+    validator = FakeTableValidator({'users': {'user_id': ids[:2], 'email': ['a@x.io', 'b@x.io']}})
+    validator.truncated('users')
+    first = users_frame(ids[:2], ['a@x.io', 'b@x.io'])
+    clean, rejects = validator.validate(first, 'users')
+    assert rejects.empty and validator.lookups == [('user_id', []), ('email', [])]
+    validator.register_loaded(clean, 'users')
+
+    # A later chunk: only keys the filter has seen are confirmed in the table
+    validator.lookups.clear()
+    clean, rejects = validator.validate(users_frame([ids[1], ids[2]], ['c@x.io', 'a@x.io']), 'users')
+    assert rejects['reject_reason'].tolist() == ['existing_user_id', 'existing_email']
+    assert validator.lookups == [('user_id', [ids[1]]), ('email', ['a@x.io'])]
+
+    validator.reset('users')
+    validator.lookups.clear()
+    validator.validate(users_frame([ids[3]], ['d@x.io']), 'users')
+    assert validator.lookups == [('user_id', [ids[3]]), ('email', ['d@x.io'])]
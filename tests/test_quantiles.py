@@ -0,0 +1,74 @@
+# tests/test_quantiles.py
+"""
+Tests for the log-bucketed quantile sketches (src/database/quantiles.py).
+
+Values are bucketed with the formula the sales rollup runs in SQL,
+CEIL(LN(x) / LOG_GAMMA), and read back through QuantileSketches with its
+database read replaced by the in-memory merge.
+"""
+import numpy as np
+
+from src.database.quantiles import LOG_GAMMA, RELATIVE_ACCURACY, QuantileSketches, bucket_value
+
+TOLERANCE = RELATIVE_ACCURACY * (1 + 1e-9)
+
+
+def bucket(values: np.ndarray) -> np.ndarray:
+    return np.ceil(np.log(values) / LOG_GAMMA).astype(np.int64)
+
+
+def merged_sketch(values: np.ndarray) -> tuple:
+    """(representatives, counts) as QuantileSketches.load returns them"""
+    buckets, counts = np.unique(bucket(values[values > 0]), return_counts=True)
+    representatives = bucket_value(buckets)
+    zero_count = int((values <= 0).sum())
+    if zero_count:
+        representatives = np.concatenate(([0.0], representatives))
+        counts = np.concatenate(([zero_count], counts))
+    return representatives, counts.astype(np.int64)
+
+
+def sketches_over(values: np.ndarray) -> QuantileSketches:
+    sketches = QuantileSketches(engine=None)
+    sketches.load = lambda *args, **kwargs: merged_sketch(values)
+    return sketches
+
+
+def test_bucket_relative_error():
+    values = np.geomspace(1e-3, 1e7, 200_000)
+    assert (np.abs(bucket_value(bucket(values)) - values) / values).max() <= TOLERANCE
+
+
+def test_quantiles_match_exact():
+    values = np.round(np.random.default_rng(7).lognormal(4, 1.2, 200_000), 2)
+    quantiles = (0, 0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999, 1)
+    result = sketches_over(values).quantiles('order_value', quantiles)
+    assert result['count'] == len(values)
+    ordered = np.sort(values)
+    for q in quantiles:
+        # Lower rank convention, as QuantileSketches.quantiles documents
+        exact = ordered[int(np.floor(q * (len(values) - 1)))]
+        assert abs(result[q] - exact) / exact <= TOLERANCE, q
+
+
+def test_merge_adds_counts():
+    rng = np.random.default_rng(11)
+    day1, day2 = rng.lognormal(3, 1, 50_000), rng.lognormal(5, 0.5, 30_000)
+    merged = {}
+    for values, counts in (merged_sketch(day1), merged_sketch(day2)):
+        for value, count in zip(values, counts):
+            merged[value] = merged.get(value, 0) + count
+    values, counts = merged_sketch(np.concatenate([day1, day2]))
+    assert sorted(merged) == list(values)
+    assert [merged[v] for v in values] == list(counts)
+
+
+def test_zero_and_negative_values_rank_first():
+    result = sketches_over(np.array([-5.0, 0.0, 0.0, 10.0, 20.0, 30.0])).quantiles('order_value', (0, 0.4, 0.6, 1))
+    assert result[0] == 0.0 and result[0.4] == 0.0
+    assert abs(result[0.6] - 10.0) / 10.0 <= TOLERANCE
+    assert abs(result[1] - 30.0) / 30.0 <= TOLERANCE
+
+
+def test_empty_range():
+    assert sketches_over(np.array([])).quantiles('order_value', (0.5,)) == {'count': 0, 0.5: None}
@@ -0,0 +1,72 @@
+# tests/test_sketches.py
+"""Tests for the HyperLogLog distinct-count sketches (src/database/sketches.py)"""
+import uuid
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.database.sketches import (
+    REGISTERS, RELATIVE_ERROR, build_sketches, estimate, hash_values, register_updates,
+)
+
+
+def make_ids(n: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    return [str(uuid.UUID(int=int(x))) for x in rng.integers(0, 2 ** 63, n)]
+
+
+def sketch_of(ids) -> np.ndarray:
+    registers = np.zeros(REGISTERS, dtype=np.uint8)
+    index, rank = register_updates(hash_values(pd.Series(ids)))
+    np.maximum.at(registers, index, rank)
+    return registers
+
+
+@pytest.mark.parametrize('n', [10, 1_000, 5_000, 50_000, 1_000_000])
+def test_estimate_accuracy(n):
+    ids = make_ids(n, seed=n)
+    # Repeated ids must not count twice
+    got = float(estimate(sketch_of(ids + ids[:n // 2]))[0])
+    assert abs(got - n) / n < 4 * RELATIVE_ERROR
+
+
+def test_merge_is_union():
+    ids = make_ids(20_000, seed=1)
+    assert np.array_equal(np.maximum(sketch_of(ids[:12_000]), sketch_of(ids[8_000:])), sketch_of(ids))
+
+
+def test_register_index_and_rank():
+    hashes = np.array([0, 1, (1 << 63) | 1, (1 << 52) - 1, 1 << 51], dtype=np.uint64)
+    index, rank = register_updates(hashes)
+    assert index.tolist() == [0, 0, 1 << 11, 0, 0]
+    # all-zero rest -> 53, lowest bit only -> 52, top rest bit set -> 1
+    assert rank.tolist() == [53, 52, 52, 1, 1]
+
+
+def test_build_sketches():
+    users = make_ids(3_000, seed=2)
+    df = pd.DataFrame({
+        # Ids match case-insensitively; the NULL id is skipped
+        'user_id': users + [u.upper() for u in users[:1_000]] + [None],
+        'order_date': pd.to_datetime(['2024-01-01'] * 2_000 + ['2024-01-02'] * 1_000
+                                     + ['2024-01-01'] * 1_000 + ['2024-01-02']),
+        'status': ['completed', 'cancelled'] * 2_000 + ['completed'],
+        'shipping_country': [None] * 4_001,
+    })
+    sketches = build_sketches(df, 'orders')
+    day1, day2 = pd.Timestamp('2024-01-01').date(), pd.Timestamp('2024-01-02').date()
+    assert set(sketches) == {
+        ('customers', '', '', day1), ('customers', '', '', day2),
+        ('customers', 'status', 'completed', day1), ('customers', 'status', 'cancelled', day1),
+        ('customers', 'status', 'completed', day2), ('customers', 'status', 'cancelled', day2),
+    }
+    day1_count = float(estimate(sketches[('customers', '', '', day1)])[0])
+    assert abs(day1_count - 2_000) / 2_000 < 4 * RELATIVE_ERROR
+    both = np.maximum(sketches[('customers', '', '', day1)], sketches[('customers', '', '', day2)])
+    assert abs(float(estimate(both)[0]) - 3_000) / 3_000 < 4 * RELATIVE_ERROR
+    assert build_sketches(df, 'products') == {}
+
+
+def test_empty_sketch():
+    assert float(estimate(np.zeros(REGISTERS, dtype=np.uint8))[0]) == 0.0